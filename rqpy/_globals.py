@@ -10,6 +10,20 @@ if spec is None:
 else:
     HAS_SCDMSPYTOOLS = True
 
+spec = find_spec('pyarrow')
+
+if spec is None:
+    HAS_PYARROW = False
+else:
+    HAS_PYARROW = True
+
+spec = find_spec('pyfftw')
+
+if spec is None:
+    HAS_PYFFTW = False
+else:
+    HAS_PYFFTW = True
+
 del find_spec
 del sys
 del package_req
@@ -2,3 +2,4 @@ from ._cut import *
 from ._pulse import *
 from ._fitting import *
 from ._rrq import *
+from ._fft import *
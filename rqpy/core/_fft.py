@@ -0,0 +1,242 @@
+import os
+import numpy as np
+import scipy.fft
+from rqpy import HAS_PYFFTW
+
+if HAS_PYFFTW:
+    import pyfftw
+
+
+__all__ = ["set_fft_backend", "get_fft_backend"]
+
+
+class _FFTBackend(object):
+    """
+    Hidden class for the FFT backend that is used by the FFTs in RQpy (e.g. the optimum filters of
+    rqpy.process.OptimumFilt and the RQ processing, and rqpy.ds_trunc). Use set_fft_backend to
+    change the backend.
+
+    Attributes
+    ----------
+    name : str
+        The name of the backend, either "pyfftw", "scipy", or "numpy".
+    workers : int, NoneType
+        The number of threads used by each FFT. If None, then a single thread is used.
+    planner_effort : str
+        The FFTW planner effort used when making the pyFFTW plans.
+    maxplans : int
+        The maximum number of pyFFTW plans that are kept.
+
+    """
+
+    def __init__(self, name="auto", workers=None, planner_effort="FFTW_ESTIMATE", maxplans=32):
+        """
+        Initialization of the _FFTBackend class. See set_fft_backend for the parameters.
+
+        """
+
+        if name == "auto":
+            name = "scipy"
+
+        if name not in ["pyfftw", "scipy", "numpy"]:
+            raise ValueError("backend should be set to 'auto', 'pyfftw', 'scipy', or 'numpy'")
+
+        if name == "pyfftw" and not HAS_PYFFTW:
+            raise ImportError("Cannot use the pyfftw FFT backend because pyFFTW is not installed.")
+
+        self.name = name
+        self.workers = workers
+        self.planner_effort = planner_effort
+        self.maxplans = maxplans
+
+        self._plans = {}
+
+    def transform(self, kind, x, n=None, axis=-1):
+        """
+        Method for calculating an FFT with the backend.
+
+        Parameters
+        ----------
+        kind : str
+            The type of FFT, either "fft", "ifft", "rfft", or "irfft".
+        x : ndarray
+            The array to transform.
+        n : int, NoneType, optional
+            The length of the transform along axis, as for numpy.fft. If left as None, then the
+            length of x along axis is used (or the corresponding length for "irfft").
+        axis : int, optional
+            The axis to transform along. Default is -1.
+
+        Returns
+        -------
+        out : ndarray
+            The transformed array. Single precision inputs give single precision outputs.
+
+        """
+
+        x = np.asarray(x)
+
+        if self.name == "scipy":
+            # scipy caches its own plans for each length
+            return getattr(scipy.fft, kind)(x, n=n, axis=axis, workers=self.workers)
+
+        if self.name == "numpy":
+            out = getattr(np.fft, kind)(x, n=n, axis=axis)
+            if x.dtype in [np.float32, np.complex64]:
+                out = out.astype(np.float32 if kind == "irfft" else np.complex64)
+            return out
+
+        return self._pyfftw_transform(kind, x, n, axis)
+
+    def _pyfftw_transform(self, kind, x, n, axis):
+        """
+        Hidden method for calculating an FFT with pyFFTW. The plans are built the first time that each
+        combination of transform, shape, and dtype is used, and then reused.
+
+        """
+
+        if not np.issubdtype(x.dtype, np.inexact) or x.dtype == np.float16:
+            x = x.astype(float)
+
+        # the input is zero-padded or truncated here, such that it is copied straight into the plan
+        if kind == "irfft":
+            if n is None:
+                n = 2*(x.shape[axis] - 1)
+            x = _fit_length(x, n//2 + 1, axis)
+        elif n is not None:
+            x = _fit_length(x, n, axis)
+            n = None
+
+        key = (kind, x.shape, x.dtype.str, n, axis)
+
+        if key not in self._plans:
+            if len(self._plans) >= self.maxplans:
+                # remove the oldest plan
+                self._plans.pop(next(iter(self._plans)))
+
+            if self.workers is None:
+                threads = 1
+            elif self.workers < 0:
+                threads = max(os.cpu_count() + 1 + self.workers, 1)
+            else:
+                threads = self.workers
+
+            builder = getattr(pyfftw.builders, kind)
+            self._plans[key] = builder(pyfftw.empty_aligned(x.shape, dtype=x.dtype), n=n, axis=axis,
+                                       threads=threads, planner_effort=self.planner_effort, avoid_copy=False)
+
+        # the input array of a plan is reused each time that it is called, but each call gets a new
+        # output array, as it is returned
+        plan = self._plans[key]
+        plan.input_array[...] = x
+        out = pyfftw.empty_aligned(plan.output_shape, dtype=plan.output_dtype)
+
+        return plan(output_array=out)
+
+
+def _fit_length(x, length, axis):
+    """
+    Hidden helper function for zero-padding or truncating an array to a length along an axis.
+
+    """
+
+    nbins = x.shape[axis]
+
+    if nbins == length:
+        return x
+
+    if nbins > length:
+        return np.take(x, np.arange(length), axis=axis)
+
+    pad = [(0, 0)]*x.ndim
+    pad[axis] = (0, length - nbins)
+
+    return np.pad(x, pad)
+
+
+_backend = _FFTBackend()
+
+
+def set_fft_backend(backend="auto", workers=None, planner_effort="FFTW_ESTIMATE"):
+    """
+    Function for setting the FFT backend used by RQpy, which is used by the optimum filters of
+    rqpy.process.OptimumFilt and the RQ processing, and by rqpy.ds_trunc.
+
+    Parameters
+    ----------
+    backend : str, optional
+        The FFT backend to use. Supports the following:
+            "pyfftw" : Use pyFFTW, where the plan of each transform is made once (and kept) for each
+                       combination of shape and dtype, which pays off for repeated fixed-length FFTs.
+            "scipy" : Use scipy.fft, which can use multiple threads and keeps single precision.
+            "numpy" : Use numpy.fft, which always calculates in double precision.
+            "auto" : Use "scipy", which is as fast as "pyfftw" for the batched transforms in RQpy
+                     without the cost of planning each new shape.
+        Default is "auto".
+    workers : int, NoneType, optional
+        The number of threads to use for each FFT with the "pyfftw" and "scipy" backends. Negative values
+        count back from the number of CPUs, e.g. -1 uses all of them. If left as None, then a single thread
+        is used, which is recommended when using multiprocessing.
+    planner_effort : str, optional
+        The FFTW planner effort used when making each plan with the "pyfftw" backend, e.g. "FFTW_ESTIMATE"
+        or "FFTW_MEASURE". A plan is made for each shape of array that is transformed, so "FFTW_MEASURE"
+        only pays off if the same shapes are transformed many times (e.g. fixed length traces processed in
+        fixed size chunks). Default is "FFTW_ESTIMATE".
+
+    """
+
+    global _backend
+
+    _backend = _FFTBackend(backend, workers=workers, planner_effort=planner_effort)
+
+
+def get_fft_backend():
+    """
+    Function for getting the FFT backend used by RQpy.
+
+    Returns
+    -------
+    backend : str
+        The name of the FFT backend, either "pyfftw", "scipy", or "numpy".
+    workers : int, NoneType
+        The number of threads used for each FFT.
+
+    """
+
+    return _backend.name, _backend.workers
+
+
+def fft(x, n=None, axis=-1):
+    """
+    Function for calculating the FFT of an array with the FFT backend, see numpy.fft.fft.
+
+    """
+
+    return _backend.transform("fft", x, n=n, axis=axis)
+
+
+def ifft(x, n=None, axis=-1):
+    """
+    Function for calculating the inverse FFT of an array with the FFT backend, see numpy.fft.ifft.
+
+    """
+
+    return _backend.transform("ifft", x, n=n, axis=axis)
+
+
+def rfft(x, n=None, axis=-1):
+    """
+    Function for calculating the FFT of a real array with the FFT backend, see numpy.fft.rfft.
+
+    """
+
+    return _backend.transform("rfft", x, n=n, axis=axis)
+
+
+def irfft(x, n=None, axis=-1):
+    """
+    Function for calculating the inverse of rfft with the FFT backend, see numpy.fft.irfft.
+
+    """
+
+    return _backend.transform("irfft", x, n=n, axis=axis)
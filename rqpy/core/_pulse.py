@@ -1,5 +1,6 @@
 import numpy as np
 from scipy.signal import decimate
+from ._fft import fft
 
 
 __all__ = ["shift", "make_ideal_template", "ds_trunc"]
@@ -116,9 +117,12 @@ def ds_trunc(traces, fs, trunc, ds, template = None):
         template_ds = decimate(template_trunc, ds, zero_phase=True)
     traces_ds = decimate(traces_trunc, ds, zero_phase=True)
     
-    fs_ds = len(traces_ds)/trunc_time
+    fs_ds = traces_ds.shape[-1]/trunc_time
     
-    f_ds, psd_ds = calc_psd(traces_ds, fs=fs_ds, folded_over=False)
+    # two-sided psd of the downsampled traces, using the FFT backend
+    psd_ds = np.abs(fft(traces_ds, axis=-1))**2/(fs_ds*traces_ds.shape[-1])
+    if traces_ds.ndim > 1:
+        psd_ds = np.mean(psd_ds, axis=0)
     if template is not None:
         return traces_ds, template_ds, psd_ds, fs_ds
     else:
@@ -1 +1,3 @@
 from ._io import *
+from ._rq_store import *
+from ._event_index import *
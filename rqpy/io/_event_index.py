@@ -0,0 +1,243 @@
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+
+from ._io import _npz_member_offset
+
+
+__all__ = ["EventIndex"]
+
+
+class EventIndex(object):
+    """
+    Class for a persistent index of the events in a dataset saved by rqpy.process.acquire_pulses or
+    rqpy.process.acquire_randoms, which maps each (series number, event number) pair to the file that
+    the event is in, its row in that file, and the byte offset of that row. The index is built once per
+    dataset, after which any event can be read by touching only its own record on disk.
+
+    Attributes
+    ----------
+    filetype : str
+        The file type of the dataset, either "npz" or "npy".
+    files : ndarray
+        The path to the traces of each file in the dataset.
+    offsets : ndarray
+        The byte offset of the first row of the traces in each file. This is -1 for files where
+        the traces cannot be memory-mapped (e.g. compressed .npz files).
+    dtypes : ndarray
+        The dtype string of the traces in each file.
+    shapes : ndarray
+        The shape of the traces in each file, with dimensions (number of files, 3).
+    seriesnumber : ndarray
+        The series number of each event.
+    eventnumber : ndarray
+        The event number of each event.
+    fileind : ndarray
+        The index in `files` of the file that each event is in.
+    row : ndarray
+        The row of each event in the traces of its file.
+
+    """
+
+    _keys = ["filetype", "files", "offsets", "dtypes", "shapes",
+             "seriesnumber", "eventnumber", "fileind", "row"]
+
+    def __init__(self, filetype, files, offsets, dtypes, shapes, seriesnumber, eventnumber, fileind, row):
+        """
+        Initialization of the EventIndex class. Use EventIndex.build or EventIndex.load
+        to create an index.
+
+        """
+
+        self.filetype = str(filetype)
+        self.files = np.asarray(files)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.dtypes = np.asarray(dtypes)
+        self.shapes = np.asarray(shapes, dtype=np.int64).reshape(-1, 3)
+        self.seriesnumber = np.asarray(seriesnumber)
+        self.eventnumber = np.asarray(eventnumber, dtype=np.int64)
+        self.fileind = np.asarray(fileind, dtype=np.int64)
+        self.row = np.asarray(row, dtype=np.int64)
+
+        self._lookup = pd.MultiIndex.from_arrays([self.seriesnumber.astype(str), self.eventnumber])
+
+    def __len__(self):
+        return len(self.eventnumber)
+
+    @classmethod
+    def build(cls, basepath, filetype="npz"):
+        """
+        Method for building the event index of a dataset by reading only the headers of its files.
+
+        Parameters
+        ----------
+        basepath : str
+            The path to the directory that contains the dumps of the dataset, in the same
+            format as is passed to rqpy.io.getrandevents.
+        filetype : str, optional
+            The file type of the dumps, either "npz" or "npy". Default is "npz".
+
+        Returns
+        -------
+        index : EventIndex
+            The event index of the dataset.
+
+        """
+
+        if filetype == "npz":
+            paths = sorted(glob.glob(os.path.join(basepath, "*.npz")))
+        elif filetype == "npy":
+            paths = sorted(os.path.dirname(f) for f in glob.glob(os.path.join(basepath, "*", "index.json")))
+        else:
+            raise ValueError("filetype must be 'npz' or 'npy', mid.gz files cannot be indexed")
+
+        if len(paths) == 0:
+            raise ValueError(f"No {filetype} dumps were found in {basepath}")
+
+        files = []
+        offsets = []
+        dtypes = []
+        shapes = []
+        seriesnumber = []
+        eventnumber = []
+        fileind = []
+        row = []
+
+        for ii, path in enumerate(paths):
+            if filetype == "npz":
+                seriesnum = os.path.basename(path).split('.')[0]
+                dumpnum = int(seriesnum.split('_')[-1])
+                file = path
+                offset, shape, dtype = _npz_member_offset(path, "traces")
+            else:
+                with open(os.path.join(path, "index.json"), "r") as f:
+                    dumpindex = json.load(f)
+                seriesnum = f"{dumpindex['seriesnumber']}"
+                dumpnum = int(dumpindex["dumpnum"])
+                file = os.path.join(path, "traces.npy")
+                traces = np.load(file, mmap_mode="r")
+                offset, shape, dtype = traces.offset, traces.shape, traces.dtype
+                del traces
+
+            nevts = shape[0]
+
+            files.append(file)
+            offsets.append(offset)
+            dtypes.append(dtype.str)
+            shapes.append(shape)
+            seriesnumber.append(np.full(nevts, seriesnum))
+            eventnumber.append(10000*dumpnum + 1 + np.arange(nevts))
+            fileind.append(np.full(nevts, ii))
+            row.append(np.arange(nevts))
+
+        return cls(filetype, files, offsets, dtypes, shapes, np.concatenate(seriesnumber),
+                   np.concatenate(eventnumber), np.concatenate(fileind), np.concatenate(row))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Method for loading an event index that was saved with EventIndex.save.
+
+        Parameters
+        ----------
+        filename : str
+            The path to the saved event index.
+
+        Returns
+        -------
+        index : EventIndex
+            The loaded event index.
+
+        """
+
+        with np.load(filename) as data:
+            return cls(**{key: data[key] for key in cls._keys})
+
+    def save(self, filename):
+        """
+        Method for saving the event index to disk. The index should not be saved in the same
+        folder as the dumps of the dataset, as it is itself saved as a .npz file.
+
+        Parameters
+        ----------
+        filename : str
+            The path to save the event index to.
+
+        """
+
+        with open(filename, "wb") as f:
+            np.savez(f, **{key: getattr(self, key) for key in self._keys})
+
+    def locate(self, evtnums, seriesnums):
+        """
+        Method for finding the positions in the index of the specified events.
+
+        Parameters
+        ----------
+        evtnums : array_like
+            The event numbers of the events.
+        seriesnums : array_like
+            The corresponding series numbers of the events.
+
+        Returns
+        -------
+        locs : ndarray
+            The position in the index of each event.
+
+        """
+
+        keys = pd.MultiIndex.from_arrays([np.asarray(seriesnums).astype(str),
+                                          np.asarray(evtnums).astype(np.int64)])
+        locs = self._lookup.get_indexer(keys)
+
+        if np.any(locs < 0):
+            missing = keys[locs < 0][0]
+            raise ValueError(f"Event {missing[1]} of series {missing[0]} is not in the event index")
+
+        return locs
+
+    def read_traces(self, evtnums, seriesnums):
+        """
+        Method for reading the traces of the specified events. For files that can be memory-mapped,
+        only the rows of the requested events are read from disk.
+
+        Parameters
+        ----------
+        evtnums : array_like
+            The event numbers of the events.
+        seriesnums : array_like
+            The corresponding series numbers of the events.
+
+        Returns
+        -------
+        traces : ndarray
+            The traces of the requested events, in the same order as evtnums. Dimensions are
+            (number of events, number of channels, bins in each trace).
+
+        """
+
+        locs = self.locate(evtnums, seriesnums)
+        fileinds = self.fileind[locs]
+        rows = self.row[locs]
+
+        shapes = self.shapes[np.unique(fileinds)]
+        if np.any(shapes[:, 1:] != shapes[0, 1:]):
+            raise ValueError("The requested events do not all have the same trace shape")
+
+        traces = np.empty((len(locs),) + tuple(shapes[0, 1:]), dtype=self.dtypes[fileinds[0]])
+
+        for ii in np.unique(fileinds):
+            cfile = fileinds == ii
+            if self.offsets[ii] >= 0:
+                arr = np.memmap(self.files[ii], dtype=self.dtypes[ii], mode="r",
+                                offset=self.offsets[ii], shape=tuple(self.shapes[ii]))
+                traces[cfile] = arr[rows[cfile]]
+                del arr
+            else:
+                with np.load(self.files[ii]) as data:
+                    traces[cfile] = data["traces"][rows[cfile]]
+
+        return traces
+
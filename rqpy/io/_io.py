@@ -1,6 +1,13 @@
 import numpy as np
 import pandas as pd
-from scipy.io import loadmat
+import os
+import json
+import struct
+import zipfile
+import operator
+import warnings
+from scipy.io import loadmat, whosmat
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
 from rqpy import HAS_SCDMSPYTOOLS
 
@@ -8,12 +15,13 @@ if HAS_SCDMSPYTOOLS:
     from scdmsPyTools.BatTools.IO import getRawEvents, getDetectorSettings
 
 
-__all__ = ["getrandevents", "get_trace_gain", "get_traces_midgz", "get_traces_npz", "loadstanfordfile"]
+__all__ = ["getrandevents", "get_trace_gain", "get_traces_midgz", "get_traces_npz", "get_traces_npy", 
+           "iter_traces_midgz", "iter_traces_npz", "iter_traces_npy", "loadstanfordfile"]
 
 
 def getrandevents(basepath, evtnums, seriesnums, cut=None, channels=["PDS1"], det="Z1", sumchans=False, 
                   convtoamps=1, fs=625e3, lgcplot=False, ntraces=1, nplot=20, seed=None, indbasepre=None,
-                  filetype="mid.gz"):
+                  filetype="mid.gz", eventindex=None):
     """
     Function for loading (and plotting) random events from a datasets. Has functionality to pull 
     randomly from a specified cut. For use with scdmsPyTools.BatTools.IO.getRawEvents
@@ -58,8 +66,14 @@ def getrandevents(basepath, evtnums, seriesnums, cut=None, channels=["PDS1"], de
         This baseline will then be subtracted from the traces when plotting. If left as None, no
         baseline subtraction will be done.
     filetype : str, optional
-        The string that corresponds to the file type that will be opened. Supports two 
-        types -"mid.gz" and ".npz". "mid.gz" is the default.
+        The string that corresponds to the file type that will be opened. Supports three 
+        types -"mid.gz", "npz", and "npy". "mid.gz" is the default. For "npy", the traces are
+        memory-mapped, so only the requested events are read from disk.
+    eventindex : NoneType, str, rqpy.io.EventIndex, optional
+        The event index of the dataset (or the path to a saved one), see rqpy.io.EventIndex. Only
+        used if filetype is "npz" or "npy". If passed, then the traces of the random events are looked
+        up in the index and only their records are read from disk, rather than opening every series
+        that they are in. If left as None, then the index is not used.
         
     Returns
     -------
@@ -105,8 +119,18 @@ def getrandevents(basepath, evtnums, seriesnums, cut=None, channels=["PDS1"], de
     crand = np.zeros(len(evtnums), dtype=bool)
     crand[inds] = True
     
-    arrs = list()
-    for snum in seriesnums[crand].unique():
+    if filetype in ["npz", "npy"] and eventindex is not None:
+        if isinstance(eventindex, str):
+            # imported here, as the event index module uses the npz helpers of this module
+            from ._event_index import EventIndex
+            eventindex = EventIndex.load(eventindex)
+        arrs = [eventindex.read_traces(evtnums[crand], seriesnums[crand])]
+        snums = []
+    else:
+        arrs = list()
+        snums = seriesnums[crand].unique()
+    
+    for snum in snums:
         cseries = crand & (seriesnums == snum)
         
         if filetype == "mid.gz":
@@ -131,6 +155,10 @@ def getrandevents(basepath, evtnums, seriesnums, cut=None, channels=["PDS1"], de
             inds = np.mod(evtnums[cseries], 10000) - 1
             with np.load(f"{basepath}/{snum}.npz") as f:
                 arr = f["traces"][inds]
+        elif filetype == "npy":
+            # only the rows of the requested events are read from the memory-mapped traces
+            inds = np.mod(evtnums[cseries], 10000) - 1
+            arr = np.load(f"{basepath}/{snum}/traces.npy", mmap_mode="r")[inds]
     
         arrs.append(arr)
         
@@ -146,7 +174,7 @@ def getrandevents(basepath, evtnums, seriesnums, cut=None, channels=["PDS1"], de
             x = [arr[d]["p"][:, ch].astype(float) for d, ch in zip(det, chans)]
             x = np.stack(x, axis=1)
         
-    elif filetype == "npz":
+    elif filetype in ["npz", "npy"]:
         x = np.vstack(arrs).astype(float)
         chans = list(range(x.shape[1]))
         
@@ -175,7 +203,7 @@ def getrandevents(basepath, evtnums, seriesnums, cut=None, channels=["PDS1"], de
                 for jj, chan in enumerate(channels):
                     if filetype == "mid.gz":
                         label = f"Channel {chan}"
-                    elif filetype == "npz":
+                    elif filetype in ["npz", "npy"]:
                         label = f"Channel {chan}"
                     
                     if indbasepre is not None:
@@ -234,7 +262,7 @@ def get_trace_gain(path, chan, det, gainfactors = {'rfb': 5000, 'loopgain' : 2.4
     
     return convtoamps, drivergain, qetbias
 
-def get_traces_midgz(path, channels, det, convtoamps=1, lgcskip_empty=True, lgcreturndict=False):
+def get_traces_midgz(path, channels, det, convtoamps=1, lgcskip_empty=True, lgcreturndict=False, dtype=float):
     """
     Function to return raw traces and event information for a single channel for mid.gz files.
     
@@ -260,6 +288,11 @@ def get_traces_midgz(path, channels, det, convtoamps=1, lgcskip_empty=True, lgcr
     lgcreturndict : bool, optional
         Boolean flag on whether or not to return the info_dict that has extra information on every event.
         By default, this is True, but the user may wish to set this to False for faster I/O.
+    dtype : data-type, optional
+        The dtype to return the traces as. If a floating point type, then the traces are converted to
+        that type and multiplied by convtoamps, e.g. np.float32 halves the memory of the traces compared
+        to the default of float (float64). If an integer type (e.g. np.int16), then the raw traces are
+        returned in units of ADC bins as stored, without applying convtoamps or upcasting.
     
     Returns
     -------
@@ -288,6 +321,103 @@ def get_traces_midgz(path, channels, det, convtoamps=1, lgcskip_empty=True, lgcr
     if not HAS_SCDMSPYTOOLS:
         raise ImportError("Cannot use get_traces_midgz because scdmsPyTools is not installed.")
     
+    events, x, convtoamps_arr, det = _load_midgz(path, channels, det, convtoamps, lgcskip_empty)
+    
+    x = _convert_midgz(x, convtoamps_arr, dtype)
+    
+    if lgcreturndict:
+        info_dict = _get_info_dict_midgz(events, det)
+        return x, info_dict
+    else:
+        return x
+
+def iter_traces_midgz(path, channels, det, convtoamps=1, lgcskip_empty=False, chunksize=None, dtype=float):
+    """
+    Generator version of get_traces_midgz, which yields the traces and event information 
+    in chunks of events. Only the chunk that is being yielded is converted to Amps, such that
+    the converted traces for the whole dump are never held in memory at once. Note that the raw
+    traces (in ADC bins) of the whole dump are still read at once, as scdmsPyTools does not support 
+    reading part of a dump, so only the memory of the converted traces is bounded by chunksize.
+    
+    Parameters
+    ----------
+    path : str, list of str
+        Absolute path, or list of paths, to the dump to open.
+    channels : str, list of str
+        Channel name(s), i.e. 'PDS1'. See get_traces_midgz for details.
+    det : str, list of str
+        Detector name, i.e. 'Z1'. If a list of strings, then should each value should directly correspond to 
+        the channel names. If a string is inputted and there are multiple channels, then it 
+        is assumed that the detector name is the same for each channel.
+    convtoamps : float, list of floats, optional
+        Conversion factor from ADC bins to TES current in Amps (units are [Amps]/[ADC bins]). Default is to 
+        keep in units of ADC bins (i.e. the traces are left in units of ADC bins)
+    lgcskip_empty : bool, optional
+        Boolean flag on whether or not to skip empty events. Default is False.
+    chunksize : int, NoneType, optional
+        The maximum number of events to yield at a time. If left as None, then all of the events are 
+        yielded at once.
+    dtype : data-type, optional
+        The dtype to yield the traces as. If an integer type (e.g. np.int16), then the raw traces are
+        yielded in units of ADC bins, without applying convtoamps. See get_traces_midgz for details.
+        
+    Yields
+    ------
+    x : ndarray
+        Array of traces in the chunk. Dimensions are (number of traces, number of channels, bins in each trace)
+    info_dict : dict
+        Dictionary that contains extra information on each event in the chunk. See get_traces_midgz for
+        the keys.
+    
+    """
+    
+    if not HAS_SCDMSPYTOOLS:
+        raise ImportError("Cannot use iter_traces_midgz because scdmsPyTools is not installed.")
+    
+    events, x_raw, convtoamps_arr, det = _load_midgz(path, channels, det, convtoamps, lgcskip_empty)
+    info_dict = _get_info_dict_midgz(events, det)
+    del events
+    
+    nevts = len(x_raw)
+    if chunksize is None:
+        chunksize = max(nevts, 1)
+    
+    for start in range(0, nevts, chunksize):
+        stop = min(start + chunksize, nevts)
+        x = _convert_midgz(x_raw[start:stop], convtoamps_arr, dtype)
+        yield x, {key: val[start:stop] for key, val in info_dict.items()}
+
+def _load_midgz(path, channels, det, convtoamps, lgcskip_empty):
+    """
+    Helper function for reading the raw traces in the specified channels from mid.gz files, 
+    leaving them in units of ADC bins.
+    
+    Parameters
+    ----------
+    path : str, list of str
+        Absolute path, or list of paths, to the dump to open.
+    channels : str, list of str
+        Channel name(s), i.e. 'PDS1'.
+    det : str, list of str
+        Detector name, i.e. 'Z1'.
+    convtoamps : float, list of floats
+        Conversion factor from ADC bins to TES current in Amps.
+    lgcskip_empty : bool
+        Boolean flag on whether or not to skip empty events.
+    
+    Returns
+    -------
+    events : dict
+        The events as returned by getRawEvents.
+    x : ndarray
+        Array of raw traces in the specified channels, in units of ADC bins.
+    convtoamps_arr : ndarray
+        The conversion factors to Amps, broadcastable to the shape of x.
+    det : list of str
+        The detector name for each channel.
+    
+    """
+    
     if not isinstance(path, list):
         path = [path]
         
@@ -313,82 +443,159 @@ def get_traces_midgz(path, channels, det, convtoamps=1, lgcskip_empty=True, lgcr
     if len(set(dets))==1:
         if channels != events[det[0]]["pChan"]:
             chans = [events[det[0]]["pChan"].index(ch) for ch in channels]
-            x = events[det[0]]["p"][:, chans].astype(float)
+            x = events[det[0]]["p"][:, chans]
         else:
-            x = events[det[0]]["p"].astype(float)
+            x = events[det[0]]["p"]
     else:
         chans = [events[d]["pChan"].index(ch) for d, ch in zip(det, channels)]
-        x = [events[d]["p"][:, ch].astype(float) for d, ch in zip(det, chans)]
+        x = [events[d]["p"][:, ch] for d, ch in zip(det, chans)]
         x = np.stack(x, axis=1)
         
-    x*=convtoamps_arr
+    return events, x, convtoamps_arr, det
+
+def _convert_midgz(x, convtoamps_arr, dtype):
+    """
+    Helper function for converting raw traces from mid.gz files to the requested dtype. Floating
+    point types are converted to Amps, while integer types are left in units of ADC bins.
     
-    if lgcreturndict:
+    Parameters
+    ----------
+    x : ndarray
+        Array of raw traces, in units of ADC bins.
+    convtoamps_arr : ndarray
+        The conversion factors to Amps, broadcastable to the shape of x.
+    dtype : data-type
+        The dtype to convert the traces to.
     
-        columns = ["eventnumber", "seriesnumber", "eventtime", "triggertype", "pollingendtime", 
-                   "triggertime", "triggeramp"]
-
-        columns_trigveto = ["readoutstatus", "deadtime", "livetime", 
-                            "triggervetoreadouttime", "seriestime", "waveformreadendtime", 
-                            "waveformreadstarttime"]
-
-        for item in columns_trigveto:
-            for d in set(det):
-                columns.append(f"{item}{d}")
-
-        info_dict = {}
-        for item in columns:
-            info_dict[item] = []
-
-        for ev, trig, trigv in zip(events["event"], events["trigger"], events["trigger_veto"]):
-            info_dict["eventnumber"].append(ev["EventNumber"])
-            info_dict["seriesnumber"].append(ev["SeriesNumber"])
-            info_dict["eventtime"].append(ev["EventTime"])
-            info_dict["triggertype"].append(ev["TriggerType"])
-            info_dict["triggeramp"].append(trig['TriggerAmplitude'])
-            info_dict["pollingendtime"].append(ev["PollingEndTime"])
-
-            info_dict["triggertime"].append(trig["TriggerTime"])
-
-            for d in set(det):
-                try:
-                    info_dict[f"readoutstatus{d}"].append(trigv[d]["ReadoutStatus"])
-                except:
-                    info_dict[f"readoutstatus{d}"].append(-999999.0)
-
-                try:
-                    info_dict[f"deadtime{d}"].append(trigv[d]["DeadTime0"])
-                except:
-                    info_dict[f"deadtime{d}"].append(-999999.0)
-
-                try:
-                    info_dict[f"livetime{d}"].append(trigv[d]["LiveTime0"])
-                except:
-                    info_dict[f"livetime{d}"].append(-999999.0)
-
-                try:
-                    info_dict[f"triggervetoreadouttime{d}"].append(trigv[d]["TriggerVetoReadoutTime0"])
-                except:
-                    info_dict[f"triggervetoreadouttime{d}"].append(-999999.0)
-
-                try:
-                    info_dict[f"seriestime{d}"].append(trigv[d]["SeriesTime"])
-                except:
-                    info_dict[f"seriestime{d}"].append(-999999.0)
-
-                try:
-                    info_dict[f"waveformreadendtime{d}"].append(trigv[d]["WaveformReadEndTime"])
-                except:
-                    info_dict[f"waveformreadendtime{d}"].append(-999999.0)
-
-                try:
-                    info_dict[f"waveformreadstarttime{d}"].append(trigv[d]["WaveformReadStartTime"])
-                except:
-                    info_dict[f"waveformreadstarttime{d}"].append(-999999.0)
-        
-        return x, info_dict
-    else:
-        return x
+    Returns
+    -------
+    x : ndarray
+        The converted traces.
+    
+    """
+    
+    dtype = np.dtype(dtype)
+    
+    if not np.issubdtype(dtype, np.floating):
+        return x.astype(dtype, copy=False)
+    
+    x = x.astype(dtype)
+    x *= convtoamps_arr.astype(dtype)
+    
+    return x
+
+def _get_record(record, key, missing):
+    """
+    Helper function for getting a value from a record, returning the missing value if the
+    record does not have it (or is not a record at all).
+    
+    """
+    
+    try:
+        return record[key]
+    except (KeyError, IndexError, TypeError):
+        return missing
+
+def _records_to_columns(records, fields, missing=-999999.0):
+    """
+    Helper function for converting a list of records (e.g. dicts) to typed columns. Each record is
+    read with a single lookup of all of the fields, and the values of each field for all of the records
+    are then converted to an array at once. As the records are Python objects, this is still a loop over
+    the records in Python, which is only faster than looking up each field of each record separately by
+    a constant factor. Fields that are missing from a record are set to the missing value.
+    
+    Parameters
+    ----------
+    records : list
+        The records to convert.
+    fields : list of str
+        The fields to extract from the records.
+    missing : float, optional
+        The value to set for fields that are missing from a record. Default is -999999.0.
+    
+    Returns
+    -------
+    columns : list of ndarray
+        The values of each field for every record, in the same order as fields.
+    
+    """
+    
+    getter = operator.itemgetter(*fields)
+    missing_row = (missing,)*len(fields)
+    
+    rows = []
+    for record in records:
+        try:
+            rows.append(getter(record))
+        except (KeyError, IndexError, TypeError):
+            if record:
+                rows.append(tuple(_get_record(record, field, missing) for field in fields))
+            else:
+                rows.append(missing_row)
+    
+    if len(rows) == 0:
+        return [np.array([]) for field in fields]
+    
+    if len(fields) == 1:
+        rows = [(row,) for row in rows]
+    
+    return [np.array(column) for column in zip(*rows)]
+
+def _get_info_dict_midgz(events, det):
+    """
+    Helper function for extracting the extra information on each event from the events 
+    returned by getRawEvents. See get_traces_midgz for the keys of the returned dictionary.
+    
+    Parameters
+    ----------
+    events : dict
+        The events as returned by getRawEvents.
+    det : list of str
+        The detector name for each channel.
+    
+    Returns
+    -------
+    info_dict : dict
+        Dictionary that contains extra information on each event. Includes timing and trigger information.
+        Each value is an ndarray with one entry per event.
+    
+    """
+    
+    fields_event = {"eventnumber" : "EventNumber", 
+                    "seriesnumber" : "SeriesNumber", 
+                    "eventtime" : "EventTime", 
+                    "triggertype" : "TriggerType", 
+                    "pollingendtime" : "PollingEndTime"}
+    
+    fields_trig = {"triggertime" : "TriggerTime", 
+                   "triggeramp" : "TriggerAmplitude"}
+    
+    fields_trigveto = {"readoutstatus" : "ReadoutStatus", 
+                       "deadtime" : "DeadTime0", 
+                       "livetime" : "LiveTime0", 
+                       "triggervetoreadouttime" : "TriggerVetoReadoutTime0", 
+                       "seriestime" : "SeriesTime", 
+                       "waveformreadendtime" : "WaveformReadEndTime", 
+                       "waveformreadstarttime" : "WaveformReadStartTime"}
+    
+    info_dict = {}
+    
+    for fields, records in [(fields_event, events["event"]), (fields_trig, events["trigger"])]:
+        columns = _records_to_columns(records, list(fields.values()))
+        info_dict.update(zip(fields.keys(), columns))
+    
+    dets = sorted(set(det))
+    trigveto = {}
+    
+    for d in dets:
+        records = [_get_record(trigv, d, None) for trigv in events["trigger_veto"]]
+        trigveto[d] = _records_to_columns(records, list(fields_trigveto.values()))
+    
+    for ii, item in enumerate(fields_trigveto):
+        for d in dets:
+            info_dict[f"{item}{d}"] = trigveto[d][ii]
+    
+    return info_dict
 
 
 def get_traces_npz(path):
@@ -473,7 +680,333 @@ def get_traces_npz(path):
     return traces, info_dict
 
 
-def loadstanfordfile(f, convtoamps=1/1024, lgcfullrtn=False):
+def iter_traces_npz(path, chunksize=None):
+    """
+    Generator version of get_traces_npz, which yields the traces and event information 
+    in chunks of events. The traces are streamed from each file, such that only the chunk
+    that is being yielded is decompressed and held in memory.
+    
+    Parameters
+    ----------
+    path : str, list of str
+        Absolute path, or list of paths, to the dump to open.
+    chunksize : int, NoneType, optional
+        The maximum number of events to yield at a time. If left as None, then all of the events
+        in each file are yielded at once.
+        
+    Yields
+    ------
+    traces : ndarray
+        Array of traces in the chunk. Dimensions are (number of traces, number of channels, bins in each trace)
+    info_dict : dict
+        Dictionary that contains extra information on each event in the chunk. See get_traces_npz for
+        the keys.
+    
+    """
+    
+    if not isinstance(path, list):
+        path = [path]
+    
+    for file in path:
+        seriesnum = file.split('/')[-1].split('.')[0]
+        dumpnum = int(seriesnum.split('_')[-1])
+        
+        with np.load(file) as npz:
+            data = {key: npz[key] for key in npz.files if key != "traces"}
+        
+        nevts = len(data["trigtypes"])
+        
+        if chunksize is None:
+            chunksize_file = max(nevts, 1)
+        else:
+            chunksize_file = chunksize
+        
+        start = 0
+        for traces in _iter_npz_array(file, "traces", chunksize_file):
+            stop = start + len(traces)
+            
+            yield traces, _get_info_dict_npz(data, seriesnum, dumpnum, start, stop)
+            
+            start = stop
+
+def get_traces_npy(path, evtinds=None):
+    """
+    Function to return raw traces and event information for dumps saved in the uncompressed 
+    `npy` format (a folder per dump with one .npy file per array, see 
+    rqpy.process.acquire_pulses). The arrays are memory-mapped, such that only the requested 
+    events are read from disk.
+    
+    Parameters
+    ----------
+    path : str, list of str
+        Absolute path, or list of paths, to the dump folder(s) to open.
+    evtinds : ndarray, NoneType, optional
+        The indices of the events in each dump to return. If left as None, then all of the
+        events are returned. Can only be set if a single dump is opened.
+    
+    Returns
+    -------
+    traces : ndarray
+        Array of traces in the specified dump. Dimensions are (number of traces, number of channels, bins in each trace)
+    info_dict : dict
+        Dictionary that contains extra information on each event. See get_traces_npz for the keys.
+    
+    """
+    
+    if not isinstance(path, list):
+        path = [path]
+        
+    if evtinds is not None and len(path) > 1:
+        raise ValueError("evtinds can only be set when opening a single dump")
+    
+    traces = []
+    info_dicts = []
+    
+    for file in path:
+        data, index = _load_npy_dump(file)
+        
+        if evtinds is None:
+            traces.append(np.array(data["traces"]))
+            info_dicts.append(_get_info_dict_npz(data, index["seriesnumber"], index["dumpnum"], 
+                                                 0, index["nevents"]))
+        else:
+            traces.append(data["traces"][evtinds])
+            info_dict = _get_info_dict_npz(data, index["seriesnumber"], index["dumpnum"], 0, index["nevents"])
+            info_dicts.append({key: np.asarray(val)[evtinds] for key, val in info_dict.items()})
+    
+    info_dict = {}
+    for key in info_dicts[0]:
+        info_dict[key] = np.concatenate([d[key] for d in info_dicts])
+    info_dict["seriesnumber"] = info_dict["seriesnumber"].tolist()
+    
+    traces = np.concatenate(traces)
+    
+    return traces, info_dict
+
+def iter_traces_npy(path, chunksize=None):
+    """
+    Generator version of get_traces_npy, which yields the traces and event information in chunks 
+    of events. Each chunk is a view of the memory-mapped traces.
+    
+    Parameters
+    ----------
+    path : str, list of str
+        Absolute path, or list of paths, to the dump folder(s) to open.
+    chunksize : int, NoneType, optional
+        The maximum number of events to yield at a time. If left as None, then all of the events
+        in each dump are yielded at once.
+        
+    Yields
+    ------
+    traces : ndarray
+        Array of traces in the chunk. Dimensions are (number of traces, number of channels, bins in each trace)
+    info_dict : dict
+        Dictionary that contains extra information on each event in the chunk. See get_traces_npz for
+        the keys.
+    
+    """
+    
+    if not isinstance(path, list):
+        path = [path]
+    
+    for file in path:
+        data, index = _load_npy_dump(file)
+        nevts = index["nevents"]
+        
+        if chunksize is None:
+            chunksize_file = max(nevts, 1)
+        else:
+            chunksize_file = chunksize
+        
+        for start in range(0, nevts, chunksize_file):
+            stop = min(start + chunksize_file, nevts)
+            # the traces are a view of the memory-mapped file, so no copy is made here
+            yield data["traces"][start:stop], _get_info_dict_npz(data, index["seriesnumber"], 
+                                                                index["dumpnum"], start, stop)
+
+def _load_npy_dump(path):
+    """
+    Helper function for memory-mapping all of the arrays in a dump saved in the `npy` format.
+    
+    Parameters
+    ----------
+    path : str
+        Absolute path to the dump folder.
+    
+    Returns
+    -------
+    data : dict
+        Dictionary of the memory-mapped arrays in the dump, keyed by name.
+    index : dict
+        The index of the dump, which contains the series number, dump number, number of events,
+        and the names of the arrays.
+    
+    """
+    
+    with open(os.path.join(path, "index.json"), "r") as f:
+        index = json.load(f)
+    
+    data = {}
+    for key in index["arrays"]:
+        data[key] = np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+        
+    return data, index
+
+def _get_info_dict_npz(data, seriesnum, dumpnum, start, stop):
+    """
+    Helper function for making the dictionary of extra information for a range of events 
+    in a dump saved by rqpy.process.acquire_pulses or rqpy.process.acquire_randoms.
+    
+    Parameters
+    ----------
+    data : dict
+        Dictionary of the arrays saved in the dump, keyed by name.
+    seriesnum : str
+        The series number of the dump.
+    dumpnum : int
+        The dump number of the dump.
+    start : int
+        The index of the first event in the range.
+    stop : int
+        The index after the last event in the range.
+    
+    Returns
+    -------
+    info_dict : dict
+        Dictionary that contains extra information on each event. See get_traces_npz for the keys.
+    
+    """
+    
+    trigtypes = np.asarray(data["trigtypes"][start:stop])
+    
+    info_dict = {}
+    info_dict["eventnumber"] = 10000*dumpnum + 1 + np.arange(start, stop)
+    info_dict["seriesnumber"] = [seriesnum] * (stop - start)
+    info_dict["ttltimes"] = np.asarray(data["trigtimes"][start:stop])
+    info_dict["ttlamps"] = np.asarray(data["trigamps"][start:stop])
+    info_dict["pulsetimes"] = np.asarray(data["pulsetimes"][start:stop])
+    info_dict["pulseamps"] = np.asarray(data["pulseamps"][start:stop])
+    info_dict["randomstimes"] = np.asarray(data["randomstimes"][start:stop])
+    info_dict["randomstrigger"] = trigtypes[:, 0]
+    info_dict["pulsestrigger"] = trigtypes[:, 1]
+    info_dict["ttltrigger"] = trigtypes[:, 2]
+    
+    return info_dict
+
+def _iter_npz_array(file, key, chunksize):
+    """
+    Helper function for reading an array from a .npz file in chunks along its first axis, 
+    without loading (and decompressing) the whole array at once.
+    
+    Parameters
+    ----------
+    file : str
+        The path to the .npz file.
+    key : str
+        The name of the array in the .npz file.
+    chunksize : int
+        The maximum number of rows to read at a time.
+    
+    Yields
+    ------
+    arr : ndarray
+        The next chunk of rows of the array.
+    
+    """
+    
+    with zipfile.ZipFile(file) as zf:
+        with zf.open(f"{key}.npy") as fp:
+            shape, fortran_order, dtype = _read_npy_header(fp)
+            
+            if fortran_order or dtype.hasobject:
+                # cannot be read row by row, fall back to loading the whole array
+                with np.load(file) as data:
+                    arr = data[key]
+                for start in range(0, len(arr), chunksize):
+                    yield arr[start:start + chunksize]
+                return
+            
+            rowsize = int(np.prod(shape[1:], dtype=int))
+            nbytes = rowsize * dtype.itemsize
+            
+            for start in range(0, shape[0], chunksize):
+                nrows = min(chunksize, shape[0] - start)
+                buf = fp.read(nrows * nbytes)
+                yield np.frombuffer(buf, dtype=dtype).reshape((nrows,) + tuple(shape[1:]))
+
+def _read_npy_header(fp):
+    """
+    Helper function for reading the header of an array in the .npy format, leaving the file
+    positioned at the start of the data of the array.
+    
+    Parameters
+    ----------
+    fp : file-like object
+        The open .npy file, or the open member of a .npz file, positioned at the start of the file.
+    
+    Returns
+    -------
+    shape : tuple
+        The shape of the array.
+    fortran_order : bool
+        Whether or not the array is stored in Fortran order.
+    dtype : numpy.dtype
+        The dtype of the array.
+    
+    """
+    
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(fp)
+    
+    return np.lib.format.read_array_header_2_0(fp)
+
+def _npz_member_offset(file, key):
+    """
+    Helper function for finding the byte offset of the data of an array in a .npz file. The offset
+    is only defined if the array is stored without compression in C order.
+    
+    Parameters
+    ----------
+    file : str
+        The path to the .npz file.
+    key : str
+        The name of the array in the .npz file.
+    
+    Returns
+    -------
+    offset : int
+        The byte offset of the data of the array in the file, or -1 if the array
+        cannot be memory-mapped.
+    shape : tuple
+        The shape of the array.
+    dtype : numpy.dtype
+        The dtype of the array.
+    
+    """
+    
+    with zipfile.ZipFile(file) as zf:
+        info = zf.getinfo(f"{key}.npy")
+        with zf.open(info) as fp:
+            shape, fortran_order, dtype = _read_npy_header(fp)
+            headerlen = fp.tell()
+    
+    if info.compress_type != zipfile.ZIP_STORED or fortran_order or dtype.hasobject:
+        return -1, shape, dtype
+    
+    # the local file header can have a different extra field than the central directory
+    with open(file, "rb") as f:
+        f.seek(info.header_offset)
+        localheader = f.read(30)
+    namelen, extralen = struct.unpack("<HH", localheader[26:30])
+    
+    offset = info.header_offset + 30 + namelen + extralen + headerlen
+    
+    return offset, shape, dtype
+
+
+def loadstanfordfile(f, convtoamps=1/1024, lgcfullrtn=False, channels=["A", "B"], lgcttl=True, evtrange=None, 
+                     nthreads=None):
     """
     Function that opens a Stanford .mat file and extracts the useful parameters. 
     There is an option to return a dictionary that includes all of the data.
@@ -488,7 +1021,24 @@ def loadstanfordfile(f, convtoamps=1/1024, lgcfullrtn=False):
         factor, as is the TTL channel (if it exists). Default is 1/1024.
     lgcfullrtn : bool, optional
         Boolean flag that also returns a dict of all extracted data from the file(s).
-        Set to False by default.
+        Set to False by default. If True, then the whole file is loaded, and channels, 
+        lgcttl, and evtrange are not used.
+    channels : list of str, optional
+        The channels to load, where "A" and "B" are the first and second channels of the DAQ. 
+        Only these channels are converted and returned. Default is ["A", "B"].
+    lgcttl : bool, optional
+        Boolean flag for whether or not to load the TTL channel. If False, then ttl is returned
+        as None. Default is True.
+    evtrange : NoneType, tuple of int, optional
+        The range of traces (start, stop) to return from the file. Only supported when f is a single
+        file. If left as None, then all of the traces are returned. Note that scipy.io.loadmat cannot 
+        read part of a variable, so the data of every channel and trace in the file is still read and
+        decoded, and only the conversion and the output are limited to the requested channels and traces.
+    nthreads : NoneType, int, optional
+        The number of threads to use when loading a list of files. The shapes of the files are read
+        first, such that each thread decodes its files straight into the combined output. Files that
+        cannot be loaded are left out of the output, and a warning that lists them is raised. If left as None, then the default
+        number of threads of concurrent.futures.ThreadPoolExecutor is used.
             
     Returns
     -------
@@ -509,20 +1059,208 @@ def loadstanfordfile(f, convtoamps=1/1024, lgcfullrtn=False):
     
     """
     
-    data = _getchannels(f)
-    fs = data["prop"]["sample_rate"][0][0][0][0]
-    times = data["time"]
-    traces = np.stack((data["A"], data["B"]), axis=1)*convtoamps
-    try:
-        ttl = data["T"]*convtoamps
-    except:
-        ttl = None
-        
     if lgcfullrtn:
+        data = _getchannels(f)
+        fs = data["prop"]["sample_rate"][0][0][0][0]
+        times = data["time"]
+        traces = np.stack((data["A"], data["B"]), axis=1)*convtoamps
+        try:
+            ttl = data["T"]*convtoamps
+        except:
+            ttl = None
+        
         return traces, times, fs, ttl, data
+    
+    if isinstance(f, str):
+        return _loadstanford_singlefile(f, convtoamps, channels, lgcttl, evtrange)
+    
+    if evtrange is not None:
+        raise ValueError("evtrange is only supported when loading a single file")
+    
+    return _loadstanford_files(f, convtoamps, channels, lgcttl, nthreads)
+
+def _loadstanford_files(filelist, convtoamps, channels, lgcttl, nthreads):
+    """
+    Helper function for loading many Stanford DAQ .mat files into one set of preallocated arrays, 
+    using a pool of threads. See loadstanfordfile for the parameters and returns. Files that cannot
+    be opened or that do not match the shape of the other files are left out, and a warning that lists 
+    them is raised.
+    
+    """
+    
+    failed = {}
+    shapes = {}
+    
+    # read the shapes from the file headers, so that the output can be preallocated
+    for filename in filelist:
+        try:
+            shapes[filename] = {name : shape for name, shape, _ in whosmat(filename)}["data_post"]
+        except Exception as e:
+            failed[filename] = repr(e)
+    
+    if len(shapes) == 0:
+        raise ValueError("None of the files could be loaded")
+    
+    # the data is (# of traces, # of bins, # of channels), where a single channel may be saved as 2-dimensional
+    nbins = next(iter(shapes.values()))[1]
+    nchan = _stanford_nchan(next(iter(shapes.values())))
+    
+    for filename in list(shapes):
+        if shapes[filename][1] != nbins or _stanford_nchan(shapes[filename]) != nchan:
+            failed[filename] = f"data shape {shapes[filename]} does not match the other files"
+            del shapes[filename]
+    
+    files = [filename for filename in filelist if filename in shapes]
+    nevts = np.array([shapes[filename][0] for filename in files])
+    ends = np.cumsum(nevts)
+    starts = ends - nevts
+    
+    traces = np.empty((ends[-1], len(channels), nbins))
+    times = np.empty(ends[-1])
+    if lgcttl and nchan > 2:
+        ttl = np.empty((ends[-1], nbins))
     else:
-        return traces, times, fs, ttl
+        ttl = None
+    
+    def _load(ii):
+        evtslice = slice(starts[ii], ends[ii])
+        out = (traces[evtslice], times[evtslice], None if ttl is None else ttl[evtslice])
+        try:
+            return _loadstanford_singlefile(files[ii], convtoamps, channels, lgcttl, None, out=out)[2], None
+        except Exception as e:
+            return None, repr(e)
+    
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        results = list(executor.map(_load, range(len(files))))
+    
+    fs = None
+    nok = 0
+    
+    for ii, (filefs, error) in enumerate(results):
+        if error is not None:
+            failed[files[ii]] = error
+            continue
         
+        fs = filefs if fs is None else fs
+        
+        # the files that loaded are moved down over the failed ones, such that they form a prefix of the output
+        if starts[ii] != nok:
+            traces[nok:nok + nevts[ii]] = traces[starts[ii]:ends[ii]]
+            times[nok:nok + nevts[ii]] = times[starts[ii]:ends[ii]]
+            if ttl is not None:
+                ttl[nok:nok + nevts[ii]] = ttl[starts[ii]:ends[ii]]
+        nok += nevts[ii]
+    
+    if fs is None:
+        raise ValueError("None of the files could be loaded")
+    
+    if len(failed) > 0:
+        warnings.warn(f"{len(failed)} of {len(filelist)} files failed to load and were skipped: " + 
+                      "; ".join(f"{filename}: {failed[filename]}" for filename in failed))
+        
+        traces = traces[:nok]
+        times = times[:nok]
+        if ttl is not None:
+            ttl = ttl[:nok]
+    
+    return traces, times, fs, ttl
+
+def _stanford_nchan(shape):
+    """
+    Helper function that returns the number of channels in the data of a Stanford DAQ .mat file 
+    with the specified shape, where 2-dimensional data has a single channel.
+    
+    """
+    
+    return shape[2] if len(shape) > 2 else 1
+
+_stanford_chaninds = {"A" : 0, "B" : 1}
+
+def _loadstanford_singlefile(filename, convtoamps, channels, lgcttl, evtrange, out=None):
+    """
+    Helper function for loading the requested channels and traces of a Stanford DAQ .mat file.
+    Only the variables that are needed are read from the file, but the whole data_post variable (with
+    every channel and trace) is decoded, as scipy.io.loadmat cannot read part of a variable. The requested
+    channels and traces are then converted to Amps in a single pass straight into the output array, so 
+    the memory of the output, but not of the read, is limited to the requested data.
+    
+    Parameters
+    ----------
+    filename : str
+        The Stanford DAQ .mat file to open.
+    convtoamps : float
+        Correction factor to convert the data to Amps.
+    channels : list of str
+        The channels to load, see loadstanfordfile.
+    lgcttl : bool
+        Boolean flag for whether or not to load the TTL channel.
+    evtrange : NoneType, tuple of int
+        The range of traces (start, stop) to load from the file. If None, then all traces are loaded.
+    out : NoneType, tuple of ndarray, optional
+        Preallocated arrays (traces, times, ttl) to write the data into, which must have the 
+        correct shapes. The ttl array should be None if the TTL channel is not loaded. If left
+        as None, then new arrays are created.
+            
+    Returns
+    -------
+    traces : ndarray
+        An array of shape (# of traces, # of channels, # of bins) that contains the traces.
+    times : ndarray
+        An array of shape (# of traces,) that contains the starting time (in s) for each trace.
+    fs : float
+        The digitization rate (in Hz) of the data.
+    ttl : ndarray, None
+        The TTL channel data, if it was requested and exists in the data. Otherwise None.
+    
+    """
+    
+    res = loadmat(filename, squeeze_me=False, 
+                  variable_names=["exp_prop", "data_post", "t_rel_trig", "t_abs_trig"])
+    prop = res['exp_prop']
+    data = res['data_post']
+    
+    # data with a single channel is saved as (# of traces, # of bins)
+    if data.ndim == 2:
+        data = data[:, :, np.newaxis]
+    
+    if evtrange is None:
+        evtrange = (0, data.shape[0])
+    evtslice = slice(*evtrange)
+    
+    gains = np.array(prop['SRS'][0][0][0], dtype = 'f')
+    rfbs = np.array(prop['Rfb'][0][0][0], dtype = 'f')
+    turns = np.array(prop['turn_ratio'][0][0][0], dtype = 'f')
+    fs = prop['sample_rate'][0][0][0][0]
+    minnum = min(len(gains), len(rfbs), len(turns))
+    
+    didv = 1.0/(turns[:minnum]*rfbs[:minnum]*gains[:minnum])
+    
+    nevts = len(range(*evtslice.indices(data.shape[0])))
+    
+    if out is None:
+        traces = np.empty((nevts, len(channels), data.shape[1]))
+        times = np.empty(nevts)
+        ttl = np.empty((nevts, data.shape[1])) if lgcttl and data.shape[2] > 2 else None
+    else:
+        traces, times, ttl = out
+    
+    for ii, chan in enumerate(channels):
+        ichan = _stanford_chaninds[chan]
+        np.multiply(data[evtslice, :, ichan], float(didv[ichan])*convtoamps, out=traces[:, ii])
+    
+    if ttl is not None:
+        np.multiply(data[evtslice, :, 2], convtoamps, out=ttl)
+    
+    try:
+        ttable  = np.array([24*3600.0, 3600.0, 60.0, 1.0])
+        reltime = res['t_rel_trig'].squeeze()
+        abstime = res['t_abs_trig'].squeeze()
+        times[:] = (abstime[:,2:].dot(ttable)+reltime)[evtslice]
+    except:
+        times[:] = np.arange(0, data.shape[0])[evtslice]
+    
+    return traces, times, fs, ttl
+
 def _getchannels_singlefile(filename):
     """
     Function for opening a .mat file from the Stanford DAQ and returns a dictionary
@@ -641,6 +1379,8 @@ def _getchannels(filelist):
         combined['prop']=res1['prop']
         combined['time']=[res1['time']]
 
+        failed = {}
+
         for i in range(1,len(filelist)):
             try:
                 res=_getchannels_singlefile(filelist[i])
@@ -649,8 +1389,12 @@ def _getchannels(filelist):
                 combined['Total'].append(res['Total'])
                 combined['T'].append(res['T'])
                 combined['time'].append(res['time'])
-            except:
-                pass
+            except Exception as e:
+                failed[filelist[i]] = repr(e)
+
+        if len(failed) > 0:
+            warnings.warn(f"{len(failed)} of {len(filelist)} files failed to load and were skipped: " + 
+                          "; ".join(f"{filename}: {failed[filename]}" for filename in failed))
 
         combined['A']=np.concatenate(combined['A'])
         combined['B']=np.concatenate(combined['B'])
@@ -0,0 +1,143 @@
+import os
+import glob
+from rqpy import HAS_PYARROW
+
+if HAS_PYARROW:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.dataset as ds
+
+
+__all__ = ["RQWriter", "load_rq"]
+
+
+class RQWriter(object):
+    """
+    Class for writing the RQs of a single dump to a columnar Parquet store. The store is partitioned
+    by series, with one folder per series and one file per dump, such that different processes never
+    write to the same file. Each call to `write` appends a row group to the dump's file.
+
+    Attributes
+    ----------
+    filename : str
+        The full path to the Parquet file that the RQs of the dump are written to.
+    schema : pyarrow.Schema, NoneType
+        The schema of the RQs, set by the first DataFrame that is written. Every subsequent
+        DataFrame is cast to this schema.
+    nrows : int
+        The number of rows that have been written so far.
+
+    """
+
+    def __init__(self, savepath, seriesnum, dump):
+        """
+        Initialization of the RQWriter class.
+
+        Parameters
+        ----------
+        savepath : str
+            The path to the base folder of the RQ store.
+        seriesnum : str, int
+            The series number of the dump, used as the name of the partition folder.
+        dump : str, int
+            The dump number, used as the name of the file in the partition folder.
+
+        """
+
+        if not HAS_PYARROW:
+            raise ImportError("Cannot use RQWriter because pyarrow is not installed.")
+
+        folder = os.path.join(savepath, f"{seriesnum}")
+        os.makedirs(folder, exist_ok=True)
+
+        self.filename = os.path.join(folder, f"rq_d{dump}.parquet")
+        self.schema = None
+        self.nrows = 0
+
+        self._tmpname = self.filename + ".tmp"
+        self._writer = None
+
+    def write(self, rq_df):
+        """
+        Method for appending a DataFrame of RQs to the dump's file as a new row group.
+
+        Parameters
+        ----------
+        rq_df : pandas.DataFrame
+            The RQs to write.
+
+        """
+
+        table = pa.Table.from_pandas(rq_df, schema=self.schema, preserve_index=False)
+
+        if self._writer is None:
+            self.schema = table.schema
+            self._writer = pq.ParquetWriter(self._tmpname, self.schema)
+
+        self._writer.write_table(table)
+        self.nrows += len(rq_df)
+
+    def close(self):
+        """
+        Method for finishing the dump's file. The file is written to a temporary name and
+        only moved to its final name here, so that partially written dumps are never read.
+
+        """
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(self._tmpname, self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.remove(self._tmpname)
+
+
+def load_rq(path, columns=None, series=None):
+    """
+    Function for loading RQs from a Parquet store written by RQWriter (e.g. by rqpy.process.rq). Only
+    the requested columns are read from disk.
+
+    Parameters
+    ----------
+    path : str
+        The path to the base folder of the RQ store.
+    columns : list of str, NoneType, optional
+        The RQs to load. If left as None, then all of the RQs are loaded.
+    series : str, int, list, NoneType, optional
+        The series number(s) to load. If left as None, then all of the series in the store are loaded.
+
+    Returns
+    -------
+    rq_df : pandas.DataFrame
+        A pandas DataFrame object that contains the requested RQs.
+
+    """
+
+    if not HAS_PYARROW:
+        raise ImportError("Cannot use load_rq because pyarrow is not installed.")
+
+    if series is None:
+        files = glob.glob(os.path.join(path, "*", "rq_d*.parquet"))
+    else:
+        if not isinstance(series, list):
+            series = [series]
+        files = []
+        for snum in series:
+            files.extend(glob.glob(os.path.join(path, f"{snum}", "rq_d*.parquet")))
+
+    if len(files) == 0:
+        raise ValueError(f"No RQ files were found in {path}")
+
+    dataset = ds.dataset(sorted(files), format="parquet")
+    rq_df = dataset.to_table(columns=columns).to_pandas()
+
+    return rq_df
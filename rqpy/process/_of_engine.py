@@ -0,0 +1,705 @@
+import numpy as np
+from numpy.fft import rfftfreq
+from rqpy.core._fft import rfft, irfft
+
+
+__all__ = ["OFKernel", "SpectralContext", "ofamp_batch", "ofamp_shifted_batch", "ofamp_pileup_batch",
+           "chi2_nopulse_batch", "chi2lowfreq_batch"]
+
+
+# the real and complex dtypes used for the spectral calculations at each precision
+_PRECISIONS = {"float64": (np.float64, np.complex128), 
+               "float32": (np.float32, np.complex64)}
+
+
+def _get_dtypes(precision):
+    """
+    Helper function for getting the real and complex dtypes that correspond to a precision.
+
+    Parameters
+    ----------
+    precision : str
+        The precision of the spectral calculations, either "float64" or "float32".
+
+    Returns
+    -------
+    dtype : numpy.dtype
+        The real dtype of the precision.
+    cdtype : numpy.dtype
+        The complex dtype of the precision.
+
+    """
+
+    if precision not in _PRECISIONS:
+        raise ValueError("precision should be set to 'float64' or 'float32'")
+
+    dtype, cdtype = _PRECISIONS[precision]
+
+    return np.dtype(dtype), np.dtype(cdtype)
+
+
+def _rfft_weights(nbins):
+    """
+    Helper function for getting the weight of each frequency bin of a real FFT when summing over the
+    full two-sided spectrum, i.e. two for the bins that have a negative frequency counterpart, and one
+    for the zero frequency bin (and the Nyquist frequency bin, if there is one).
+
+    Parameters
+    ----------
+    nbins : int
+        The length of the traces (in bins).
+
+    Returns
+    -------
+    weights : ndarray
+        The weight of each frequency bin of the real FFT.
+
+    """
+
+    weights = np.full(nbins//2 + 1, 2.0)
+    weights[0] = 1.0
+    if nbins % 2 == 0:
+        weights[-1] = 1.0
+
+    return weights
+
+
+def _onesided_invpsd(psd, nbins):
+    """
+    Helper function for getting the inverse of the two-sided PSD at the frequencies of a real FFT,
+    such that sums over the full two-sided spectrum can be done with only the positive frequencies.
+
+    Parameters
+    ----------
+    psd : ndarray
+        Either the two-sided psd (with length nbins), or the folded over one-sided psd (with length
+        nbins//2 + 1, e.g. from qetpy.calc_psd with folded_over=True), in units of Amps^2/Hz.
+    nbins : int
+        The length of the traces (in bins).
+
+    Returns
+    -------
+    invpsd : ndarray
+        The inverse of the two-sided psd at each frequency of the real FFT. For a two-sided psd, this
+        is averaged over each positive and negative frequency pair, which gives the same results as the
+        full spectrum for any psd.
+
+    """
+
+    psd = np.asarray(psd, dtype=float)
+    nfreqs = nbins//2 + 1
+
+    if len(psd) == nbins:
+        with np.errstate(divide="ignore"):
+            invpsd = 1/psd
+        invpsd = (invpsd[:nfreqs] + invpsd[-np.arange(nfreqs) % nbins])/2
+    elif len(psd) == nfreqs:
+        # the folded over psd has the power of the negative frequencies added to the positive frequencies
+        with np.errstate(divide="ignore"):
+            invpsd = _rfft_weights(nbins)/psd
+    else:
+        raise ValueError("psd should either be two-sided with the same length as the template, "+\
+                         "or folded over with length len(template)//2 + 1")
+
+    return invpsd
+
+
+def _argmin_chi2(chi, nconstrain=None, lgcoutsidewindow=False):
+    """
+    Helper function for finding the index of the minimum of the chi^2 along the last axis,
+    with the option of constraining the window that is searched over.
+
+    Parameters
+    ----------
+    chi : ndarray
+        Array of chi^2 values, of shape (number of traces, length of trace). The zero delay
+        bin is assumed to be in the center of the trace.
+    nconstrain : int, NoneType, optional
+        The length of the window (in bins), centered on the middle of the trace, to constrain
+        the minimization to. If left as None, then the chi^2 is unconstrained.
+    lgcoutsidewindow : bool, optional
+        If True, then the minimization is done outside of the window specified by nconstrain,
+        rather than inside of it. Default is False.
+
+    Returns
+    -------
+    bestind : ndarray
+        The index of the minimum chi^2 for each trace.
+
+    """
+
+    nbins = chi.shape[-1]
+
+    if nconstrain is None:
+        return np.argmin(chi, axis=-1)
+
+    if nconstrain > nbins:
+        nconstrain = nbins
+
+    win_start = nbins//2 - nconstrain//2
+    win_end = nbins//2 + nconstrain//2 + nconstrain%2
+
+    if lgcoutsidewindow:
+        inds = np.r_[0:win_start, win_end:nbins]
+    else:
+        inds = np.arange(win_start, win_end)
+
+    bestind = inds[np.argmin(chi[..., inds], axis=-1)]
+
+    return bestind
+
+
+class OFKernel(object):
+    """
+    Class for storing the frequency domain optimum filter for a single template and noise PSD,
+    such that it only has to be built once and can then be applied to many traces at once.
+
+    Attributes
+    ----------
+    fs : float
+        The digitization rate of the data in Hz.
+    nbins : int
+        The length of the traces (in bins) that the optimum filter can be applied to.
+    df : float
+        The frequency spacing of the FFTs (in Hz).
+    f : ndarray
+        The frequencies (in Hz) of the real FFT.
+    invpsd : ndarray
+        The inverse of the two-sided PSD used to make the optimum filter at each frequency of the
+        real FFT, with units of Hz/A^2. If AC coupled, the zero frequency bin is set to zero.
+    weights : ndarray
+        The weight of each frequency bin of the real FFT in sums over the full two-sided spectrum.
+    chi2weights : ndarray
+        The weight of each frequency bin of the real FFT in the chi^2, equal to weights*invpsd.
+    s : ndarray
+        The real FFT of the template, using the same normalization convention as QETpy.
+    phi : ndarray
+        The optimum filter in frequency domain at each frequency of the real FFT, equal to the 
+        complex conjugate of the FFT of the template divided by the PSD.
+    norm : float
+        The normalization of the optimum filter.
+    templatefilt : ndarray
+        The optimum filter applied to the template as a function of time delay, where the zero delay
+        bin is the first bin (the value of which is equal to norm). This is used to subtract an
+        already fitted pulse at any time delay from the filtered traces.
+    resolution : float
+        The expected energy resolution in Amps given by the template and the psd.
+    precision : str
+        The precision of the FFTs, filtering, and chi^2 calculations, either "float64" or "float32".
+    dtype : numpy.dtype
+        The real dtype corresponding to the precision.
+    cdtype : numpy.dtype
+        The complex dtype corresponding to the precision.
+    lowfreq_cache : dict
+        The frequency masks and masked template FFT and chi^2 weights used for the low frequency chi^2,
+        keyed by the cutoff frequency. These are built the first time each cutoff frequency is
+        used.
+
+    """
+
+    def __init__(self, template, psd, fs, coupling="AC", precision="float64"):
+        """
+        Initialization of the OFKernel class.
+
+        Parameters
+        ----------
+        template : ndarray
+            The pulse template to be used for the optimum filter (should be normalized beforehand).
+        psd : ndarray
+            The psd that will be used to describe the noise in the signal (in Amps^2/Hz). Either the
+            two-sided psd, with the same length as the template, or the folded over one-sided psd, with 
+            length len(template)//2 + 1.
+        fs : float
+            The digitization rate of the data in Hz.
+        coupling : str, optional
+            String that determines if the zero frequency bin of the psd should be ignored (i.e. set
+            to infinity) when calculating the optimum amplitude. If set to 'AC', then the zero
+            frequency bin is ignored. If set to anything else, then the zero frequency bin is kept.
+            Default is 'AC'.
+        precision : str, optional
+            The precision of the FFTs, filtering, and chi^2 calculations that use this kernel. If set to
+            "float32", then traces are transformed and filtered in float32/complex64, which halves the
+            memory traffic. The kernel itself is always built in float64. Default is "float64".
+
+        """
+
+        self.fs = fs
+        self.nbins = len(template)
+        # python floats, such that multiplying by them keeps the precision of the arrays
+        self.df = float(fs/self.nbins)
+        self.precision = precision
+        self.dtype, self.cdtype = _get_dtypes(precision)
+        self.f = rfftfreq(self.nbins, d=1/fs)
+
+        # the traces are real, so only the positive frequencies are used
+        invpsd = _onesided_invpsd(psd, self.nbins)
+        if coupling == "AC":
+            invpsd[0] = 0.0
+
+        weights = _rfft_weights(self.nbins)
+
+        s = rfft(np.asarray(template, dtype=float))/self.nbins/self.df
+        phi = s.conjugate()*invpsd
+        self.norm = float(np.sum(weights*np.real(phi*s))*self.df)
+        self.resolution = 1/self.norm**0.5
+
+        self.invpsd = invpsd.astype(self.dtype)
+        self.weights = weights.astype(self.dtype)
+        self.chi2weights = (weights*invpsd).astype(self.dtype)
+        self.s = s.astype(self.cdtype)
+        self.phi = phi.astype(self.cdtype)
+        # correct for fft convention by multiplying by nbins
+        self.templatefilt = (irfft(phi*s, n=self.nbins)*self.nbins*self.df).astype(self.dtype)
+
+        self.lowfreq_cache = {}
+
+    def get_lowfreq(self, fcutoff):
+        """
+        Method for getting the quantities needed for the low frequency chi^2 with the specified
+        cutoff frequency. These are only calculated once for each cutoff frequency.
+
+        Parameters
+        ----------
+        fcutoff : float
+            The frequency (in Hz) that the chi^2 should be cut off at.
+
+        Returns
+        -------
+        chi2inds : ndarray
+            Boolean mask of the frequencies that are included in the low frequency chi^2.
+        f : ndarray
+            The frequencies (in Hz) included in the low frequency chi^2.
+        s : ndarray
+            The FFT of the template at the frequencies included in the low frequency chi^2.
+        chi2weights : ndarray
+            The weight in the chi^2 of the frequencies included in the low frequency chi^2.
+
+        """
+
+        if fcutoff not in self.lowfreq_cache:
+            chi2inds = self.f <= fcutoff
+            self.lowfreq_cache[fcutoff] = (chi2inds, self.f[chi2inds], self.s[chi2inds], self.chi2weights[chi2inds])
+
+        return self.lowfreq_cache[fcutoff]
+
+    def signal_fft(self, signal):
+        """
+        Method for calculating the real FFT of an array of traces, using the same normalization
+        convention as the template. The traces are transformed at the precision of the kernel.
+
+        Parameters
+        ----------
+        signal : ndarray
+            Array of traces of shape (number of traces, length of trace).
+
+        Returns
+        -------
+        v : ndarray
+            The real FFT of each trace.
+
+        """
+
+        signal = np.atleast_2d(np.asarray(signal, dtype=self.dtype))
+
+        if signal.shape[-1] != self.nbins:
+            raise ValueError("PSD length incompatible with signal size")
+
+        return rfft(signal, axis=-1)/self.nbins/self.df
+
+
+class SpectralContext(object):
+    """
+    Class for storing the spectral quantities of an array of traces for a single channel. These
+    are computed once per array of traces and then shared by every RQ that is calculated for
+    that channel, such that each trace is only FFT'd once.
+
+    Attributes
+    ----------
+    kernel : OFKernel
+        The optimum filter kernel that is applied to the traces.
+    v : ndarray
+        The real FFT of each trace, using the same normalization convention as the template. This is
+        calculated at the precision of the kernel, as are the quantities derived from it.
+    chi0 : ndarray
+        The signal part of the chi^2 for each trace, which is also the chi^2 for no pulse.
+    amps_td : ndarray, NoneType
+        The optimum filter amplitude of each trace as a function of time delay, where the zero delay
+        bin is in the center of the trace. Set to None until a fit with a time delay is done.
+    chi_td : ndarray, NoneType
+        The chi^2 of each trace as a function of time delay, corresponding to amps_td. Set to None
+        until a fit with a time delay is done.
+
+    """
+
+    def __init__(self, signal, kernel):
+        """
+        Initialization of the SpectralContext class.
+
+        Parameters
+        ----------
+        signal : ndarray
+            Array of traces of shape (number of traces, length of trace), in units of Amps.
+        kernel : OFKernel
+            The optimum filter kernel to apply to the traces.
+
+        """
+
+        self.kernel = kernel
+        self.v = kernel.signal_fft(signal)
+        self.chi0 = (self.v.real**2 + self.v.imag**2) @ kernel.chi2weights*kernel.df
+
+        # these are only calculated if a fit with a time delay is done
+        self.amps_td = None
+        self.chi_td = None
+
+    def _calc_timedomain(self):
+        """
+        Hidden method for calculating the optimum filter amplitude and chi^2 of each trace
+        as a function of time delay. These are only calculated once.
+
+        """
+
+        if self.amps_td is not None:
+            return
+
+        kernel = self.kernel
+        nbins = kernel.nbins
+
+        # correct for fft convention by multiplying by nbins
+        amps = irfft(kernel.phi*self.v, n=nbins, axis=-1)*(nbins*kernel.df/kernel.norm)
+        chi = self.chi0[:, np.newaxis] - amps**2*kernel.norm
+
+        self.amps_td = np.roll(amps, nbins//2, axis=-1)
+        self.chi_td = np.roll(chi, nbins//2, axis=-1)
+
+    def chi2_nopulse(self):
+        """
+        Method for calculating the chi^2 of each trace with the assumption that there is no pulse.
+
+        Returns
+        -------
+        chi0 : ndarray
+            The chi^2 for no pulse for each trace.
+
+        """
+
+        return self.chi0
+
+    def ofamp(self, withdelay=True, nconstrain=None):
+        """
+        Method for calculating the optimum amplitude of a pulse in each trace. Equivalent to
+        running qetpy.ofamp on each trace.
+
+        Parameters
+        ----------
+        withdelay : bool, optional
+            Determines whether or not the optimum amplitude should be calculate with (True) or
+            without (False) using a time delay. Default is True.
+        nconstrain : int, NoneType, optional
+            The length of the window (in bins), centered on the middle of the trace, to constrain
+            the possible t0 values to. If left as None, then t0 is uncontrained. Only used if
+            withdelay is True.
+
+        Returns
+        -------
+        amp : ndarray
+            The optimum amplitude calculated for each trace (in Amps).
+        t0 : ndarray
+            The time shift calculated for each pulse (in s). Set to zero if withdelay is False.
+        chi2 : ndarray
+            The chi^2 value calculated from the optimum filter for each trace.
+
+        """
+
+        kernel = self.kernel
+
+        if withdelay:
+            self._calc_timedomain()
+
+            bestind = _argmin_chi2(self.chi_td, nconstrain=nconstrain)
+            rows = np.arange(len(self.chi_td))
+
+            amp = self.amps_td[rows, bestind]
+            chi2 = self.chi_td[rows, bestind]
+            t0 = (bestind - kernel.nbins//2)/kernel.fs
+        else:
+            amp = np.real(self.v @ (kernel.weights*kernel.phi))/kernel.norm*kernel.df
+            chi2 = self.chi0 - amp**2*kernel.norm
+            t0 = np.zeros(len(amp))
+
+        return amp, t0, chi2
+
+    def ofamp_shifted(self, t0):
+        """
+        Method for calculating the optimum amplitude of a pulse in each trace, with the template
+        shifted to a specified time for each trace (e.g. the time of the pulse in the trigger
+        channel). The shift is applied as a phase ramp on the FFT of the template, such that the 
+        template is shifted circularly, as is done for the fits with a time delay.
+
+        Parameters
+        ----------
+        t0 : ndarray
+            The time shift of the template for each trace (in s).
+
+        Returns
+        -------
+        amp : ndarray
+            The optimum amplitude calculated for each trace (in Amps).
+        chi2 : ndarray
+            The chi^2 value calculated from the optimum filter for each trace.
+
+        """
+
+        kernel = self.kernel
+
+        t0 = np.asarray(t0)
+
+        # shifting the template by t0 multiplies the optimum filter by exp(2j*pi*f*t0)
+        ramp = np.exp(2.0j*np.pi*t0[:, np.newaxis]*kernel.f).astype(kernel.cdtype)
+
+        amp = np.real((self.v*ramp) @ (kernel.weights*kernel.phi))/kernel.norm*kernel.df
+        chi2 = self.chi0 - amp**2*kernel.norm
+
+        return amp, chi2
+
+    def ofamp_pileup(self, amp1, t01, nconstrain2=None, lgcoutsidewindow=True):
+        """
+        Method for calculating the optimum amplitude of a pileup pulse in each trace, given the
+        amplitude and time shift of the first pulse in each trace. Equivalent to running
+        qetpy.ofamp_pileup on each trace.
+
+        Parameters
+        ----------
+        amp1 : ndarray
+            The optimum amplitude of the first pulse in each trace (in Amps).
+        t01 : ndarray
+            The time shift of the first pulse in each trace (in s). These should be integer
+            multiples of the sampling period, e.g. from the ofamp method.
+        nconstrain2 : int, NoneType, optional
+            The length of the window (in bins), centered on the middle of the trace, to constrain
+            the possible t0 values of the pileup pulse to. If left as None, then t0 is uncontrained.
+        lgcoutsidewindow : bool, optional
+            If True, then the pileup pulse is searched for outside of the window specified by
+            nconstrain2, rather than inside of it. Default is True.
+
+        Returns
+        -------
+        amp2 : ndarray
+            The optimum amplitude calculated for the pileup pulse in each trace (in Amps).
+        t02 : ndarray
+            The time shift calculated for the pileup pulse in each trace (in s).
+        chi2 : ndarray
+            The chi^2 value calculated for the pileup fit of each trace.
+
+        """
+
+        self._calc_timedomain()
+
+        kernel = self.kernel
+        nbins = kernel.nbins
+        norm = kernel.norm
+
+        amp1 = np.asarray(amp1, dtype=self.amps_td.dtype)[:, np.newaxis]
+        shift1 = np.rint(np.asarray(t01)*kernel.fs).astype(int)
+        rows = np.arange(len(self.amps_td))
+
+        # the filtered first pulse of each trace, with the zero delay bin in the center as for amps_td
+        templatefilt = kernel.templatefilt[(np.arange(nbins) - nbins//2 - shift1[:, np.newaxis]) % nbins]
+        # the filtered trace at the time shift of the first pulse
+        amps_t01 = self.amps_td[rows, (shift1 + nbins//2) % nbins][:, np.newaxis]
+
+        # the amplitude of the pileup pulse at each time delay, with the first pulse held fixed
+        amps2 = self.amps_td - amp1*templatefilt/norm
+
+        chi = (amp1**2 + amps2**2)*norm + 2*amp1*amps2*templatefilt
+        chi -= 2*(amp1*amps_t01 + amps2*self.amps_td)*norm
+        chi += self.chi0[:, np.newaxis]
+
+        bestind = _argmin_chi2(chi, nconstrain=nconstrain2, lgcoutsidewindow=lgcoutsidewindow)
+
+        amp2 = amps2[rows, bestind]
+        chi2 = chi[rows, bestind]
+        t02 = (bestind - nbins//2)/kernel.fs
+
+        return amp2, t02, chi2
+
+    def chi2lowfreq(self, amp, t0, fcutoff=10000):
+        """
+        Method for calculating the low frequency chi^2 of the optimum filter for each trace, 
+        given some cut off frequency. Equivalent to running qetpy.chi2lowfreq on each trace.
+
+        Parameters
+        ----------
+        amp : ndarray
+            The optimum amplitude calculated for each trace (in Amps).
+        t0 : ndarray
+            The time shift calculated for each pulse (in s).
+        fcutoff : float, optional
+            The frequency (in Hz) that we should cut off the chi^2 when calculating the low
+            frequency chi^2. Default is 10 kHz.
+
+        Returns
+        -------
+        chi2low : ndarray
+            The low frequency chi^2 value (cut off at fcutoff) for each trace.
+
+        """
+
+        chi2inds, f, s, chi2weights = self.kernel.get_lowfreq(fcutoff)
+
+        amp = np.asarray(amp)
+        t0 = np.asarray(t0)
+
+        resid = self.v[:, chi2inds] - amp[:, np.newaxis]*np.exp(-2.0j*np.pi*t0[:, np.newaxis]*f)*s
+        chi2low = (resid.real**2 + resid.imag**2) @ chi2weights*self.kernel.df
+
+        return chi2low
+
+
+def chi2_nopulse_batch(signal, kernel):
+    """
+    Function for calculating the chi^2 of an array of traces with the assumption that there
+    is no pulse.
+
+    Parameters
+    ----------
+    signal : ndarray
+        Array of traces of shape (number of traces, length of trace), in units of Amps.
+    kernel : OFKernel
+        The optimum filter kernel that contains the PSD to use.
+
+    Returns
+    -------
+    chi0 : ndarray
+        The chi^2 for no pulse for each trace.
+
+    """
+
+    return SpectralContext(signal, kernel).chi2_nopulse()
+
+
+def ofamp_batch(signal, kernel, withdelay=True, nconstrain=None):
+    """
+    Function for calculating the optimum amplitude of a pulse in each trace of an array of traces,
+    using a single FFT of the whole array. Equivalent to running qetpy.ofamp on each trace.
+
+    Parameters
+    ----------
+    signal : ndarray
+        Array of traces of shape (number of traces, length of trace), in units of Amps.
+    kernel : OFKernel
+        The optimum filter kernel to apply to the traces.
+    withdelay : bool, optional
+        Determines whether or not the optimum amplitude should be calculate with (True) or
+        without (False) using a time delay. Default is True.
+    nconstrain : int, NoneType, optional
+        The length of the window (in bins), centered on the middle of the trace, to constrain
+        the possible t0 values to. If left as None, then t0 is uncontrained. Only used if
+        withdelay is True.
+
+    Returns
+    -------
+    amp : ndarray
+        The optimum amplitude calculated for each trace (in Amps).
+    t0 : ndarray
+        The time shift calculated for each pulse (in s). Set to zero if withdelay is False.
+    chi2 : ndarray
+        The chi^2 value calculated from the optimum filter for each trace.
+
+    """
+
+    return SpectralContext(signal, kernel).ofamp(withdelay=withdelay, nconstrain=nconstrain)
+
+
+def ofamp_shifted_batch(signal, kernel, t0):
+    """
+    Function for calculating the optimum amplitude of a pulse in each trace of an array of traces,
+    with the template shifted to a specified time for each trace. The template is shifted with a
+    phase ramp on its FFT, such that the shift is circular.
+
+    Parameters
+    ----------
+    signal : ndarray
+        Array of traces of shape (number of traces, length of trace), in units of Amps.
+    kernel : OFKernel
+        The optimum filter kernel to apply to the traces.
+    t0 : ndarray
+        The time shift of the template for each trace (in s).
+
+    Returns
+    -------
+    amp : ndarray
+        The optimum amplitude calculated for each trace (in Amps).
+    chi2 : ndarray
+        The chi^2 value calculated from the optimum filter for each trace.
+
+    """
+
+    return SpectralContext(signal, kernel).ofamp_shifted(t0)
+
+
+def ofamp_pileup_batch(signal, kernel, amp1, t01, nconstrain2=None, lgcoutsidewindow=True):
+    """
+    Function for calculating the optimum amplitude of a pileup pulse in each trace of an array of
+    traces, given the amplitude and time shift of the first pulse in each trace. Equivalent to
+    running qetpy.ofamp_pileup on each trace.
+
+    Parameters
+    ----------
+    signal : ndarray
+        Array of traces of shape (number of traces, length of trace), in units of Amps.
+    kernel : OFKernel
+        The optimum filter kernel to apply to the traces.
+    amp1 : ndarray
+        The optimum amplitude of the first pulse in each trace (in Amps).
+    t01 : ndarray
+        The time shift of the first pulse in each trace (in s).
+    nconstrain2 : int, NoneType, optional
+        The length of the window (in bins), centered on the middle of the trace, to constrain
+        the possible t0 values of the pileup pulse to. If left as None, then t0 is uncontrained.
+    lgcoutsidewindow : bool, optional
+        If True, then the pileup pulse is searched for outside of the window specified by
+        nconstrain2, rather than inside of it. Default is True.
+
+    Returns
+    -------
+    amp2 : ndarray
+        The optimum amplitude calculated for the pileup pulse in each trace (in Amps).
+    t02 : ndarray
+        The time shift calculated for the pileup pulse in each trace (in s).
+    chi2 : ndarray
+        The chi^2 value calculated for the pileup fit of each trace.
+
+    """
+
+    return SpectralContext(signal, kernel).ofamp_pileup(amp1, t01, nconstrain2=nconstrain2,
+                                                        lgcoutsidewindow=lgcoutsidewindow)
+
+
+def chi2lowfreq_batch(signal, kernel, amp, t0, fcutoff=10000):
+    """
+    Function for calculating the low frequency chi^2 of the optimum filter for an array of traces,
+    given some cut off frequency. Equivalent to running qetpy.chi2lowfreq on each trace.
+
+    Parameters
+    ----------
+    signal : ndarray
+        Array of traces of shape (number of traces, length of trace), in units of Amps.
+    kernel : OFKernel
+        The optimum filter kernel that was used to fit the traces.
+    amp : ndarray
+        The optimum amplitude calculated for each trace (in Amps).
+    t0 : ndarray
+        The time shift calculated for each pulse (in s).
+    fcutoff : float, optional
+        The frequency (in Hz) that we should cut off the chi^2 when calculating the low
+        frequency chi^2. Default is 10 kHz.
+
+    Returns
+    -------
+    chi2low : ndarray
+        The low frequency chi^2 value (cut off at fcutoff) for each trace.
+
+    """
+
+    return SpectralContext(signal, kernel).chi2lowfreq(amp, t0, fcutoff=fcutoff)
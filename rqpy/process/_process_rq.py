@@ -1,17 +1,20 @@
 import numpy as np
 import pandas as pd
 import os
+import json
+import hashlib
+import time
+import copy
+import contextlib
 import multiprocessing
-from itertools import repeat
-import rqpy as rp
 from rqpy import io
-import qetpy as qp
-from rqpy import HAS_SCDMSPYTOOLS
+from rqpy import HAS_SCDMSPYTOOLS, HAS_PYARROW
+from rqpy.process._of_engine import OFKernel, SpectralContext, _get_dtypes
 
 if HAS_SCDMSPYTOOLS:
     from scdmsPyTools.BatTools.IO import getRawEvents, getDetectorSettings
 
-__all__ = ["SetupRQ", "rq"]
+__all__ = ["SetupRQ", "rq", "validate_precision"]
 
 class SetupRQ(object):
     """
@@ -92,9 +95,14 @@ class SetupRQ(object):
         optimum filter fit will be calculated. Should be "nodelay", "constrained", or "unconstrained",
         referring the the no delay OF, constrained OF, and unconstrained OF, respectively. Default
         is "constrained".
-    t0_shifted : ndarray
-        Attribute used to save the times to shift the non-trigger channels. Only used if `do_ofamp_shifted`
-        is True.
+    precision : str
+        The precision of the FFTs, filtering, and chi^2 calculations of the optimum filter based RQs, 
+        either "float64" or "float32".
+    kernels : dict
+        The frequency domain optimum filters (OFKernel objects), keyed by the channel number (or 
+        "sum" for the sum of the channels) and the trace length. These are built when they are first
+        needed, and are kept when the SetupRQ object is pickled, so that they are not rebuilt by
+        each process when multiprocessing.
     
     """
     
@@ -136,6 +144,8 @@ class SetupRQ(object):
         self.summed_template = summed_template
         self.summed_psd = summed_psd
         
+        self.kernels = {}
+        
         if trigger is None or trigger in list(range(self.nchan)):
             self.trigger = trigger
         else:
@@ -174,7 +184,8 @@ class SetupRQ(object):
         
         self.do_ofamp_shifted = False
         self.which_fit = "constrained"
-        self.t0_shifted = None
+        
+        self.precision = "float64"
         
     def adjust_calc(self, lgcchans=True, lgcsum=True):
         """
@@ -394,6 +405,8 @@ class SetupRQ(object):
         lgcrun : bool, optional
             Boolean flag for whether or not the shifted optimum filter fit should be calculated for
             the non-trigger channels. If set to True, then self.trigger must have been set to a value.
+            The fit is only calculated if the individual channels are calculated, as the times are 
+            taken from the trigger channel.
         which_fit : str, optional
             String specifying which fit that the time shift should be pulled from if the shifted
             optimum filter fit will be calculated. Should be "nodelay", "constrained", or "unconstrained",
@@ -419,8 +432,95 @@ class SetupRQ(object):
             
         self.shifted_fit = which_fit
         
+    def adjust_precision(self, precision="float64"):
+        """
+        Method for adjusting the precision of the optimum filter based RQs.
+        
+        Parameters
+        ----------
+        precision : str, optional
+            The precision of the FFTs, filtering, and chi^2 calculations of the optimum filter based RQs. 
+            Should be "float64" or "float32". With "float32", the traces are transformed and filtered in 
+            float32/complex64 (see rqpy.process.OFKernel), at the cost of a small deviation from the
+            float64 results, which can be checked with rqpy.process.validate_precision. The RQs are always
+            returned as float64. Default is "float64".
+            
+        """
+        
+        _get_dtypes(precision)
+        
+        if precision != self.precision:
+            # the kernels are built for a single precision
+            self.kernels = {}
+        
+        self.precision = precision
+        
+    def get_kernel(self, chan_num, nbins):
+        """
+        Method for getting the optimum filter kernel for a channel and trace length. The kernel is
+        built the first time that it is requested, and then reused for every subsequent call.
+        
+        Parameters
+        ----------
+        chan_num : int, str
+            The index of the channel in the list of templates and psds, or "sum" for the sum
+            of the channels.
+        nbins : int
+            The length of the traces (in bins) that the kernel will be applied to.
+            
+        Returns
+        -------
+        kernel : OFKernel
+            The frequency domain optimum filter for the specified channel and trace length.
+            
+        """
+        
+        key = (chan_num, nbins)
+        
+        if key not in self.kernels:
+            if chan_num == "sum":
+                template = self.summed_template
+                psd = self.summed_psd
+            else:
+                template = self.templates[chan_num]
+                psd = self.psds[chan_num]
+            
+            if len(template) != nbins:
+                raise ValueError(f"The traces have length {nbins}, but the template for channel "+\
+                                 f"{chan_num} has length {len(template)}")
+            
+            self.kernels[key] = OFKernel(template, psd, self.fs, precision=self.precision)
+        
+        return self.kernels[key]
+        
+    def build_kernels(self, nbins=None):
+        """
+        Method for building all of the optimum filter kernels (and low frequency chi^2 masks) that
+        will be needed when calculating the RQs. This is useful to call before the SetupRQ object is 
+        sent to other processes, so that each process does not have to build them itself.
+        
+        Parameters
+        ----------
+        nbins : int, NoneType, optional
+            The length of the traces (in bins) that will be processed. If left as None, then the 
+            length of the templates is used.
+            
+        """
+        
+        chans = []
+        if self.calcchans:
+            chans.extend(zip(range(self.nchan), self.templates, self.chi2_lowfreq_fcutoff))
+        if self.calcsum:
+            chans.append(("sum", self.summed_template, self.chi2_lowfreq_fcutoff[0]))
+        
+        for chan_num, template, fcutoff in chans:
+            kernel = self.get_kernel(chan_num, len(template) if nbins is None else nbins)
+            if self.do_chi2_lowfreq:
+                kernel.get_lowfreq(fcutoff)
+        
         
-def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, chan_num, det):
+def _calc_rq_single_channel(signal, template, psd, kernel, setup, readout_inds, chan, chan_num, det, 
+                            t0_shifted=None):
     """
     Helper function for calculating RQs for an array of traces corresponding to a single channel.
     
@@ -433,6 +533,9 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
         The pulse template to be used for the optimum filter (should be normalized beforehand).
     psd : ndarray
         The two-sided psd that will be used to describe the noise in the signal (in Amps^2/Hz)
+    kernel : OFKernel
+        The frequency domain optimum filter built from template and psd, which is applied to all 
+        of the traces at once.
     setup : SetupRQ
         A SetupRQ class object. This object defines all of the different RQs that should be calculated 
         and specifies relevant parameters.
@@ -445,6 +548,10 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
         The corresponding number for the channel being processed.
     det : str
         Name of the detector corresponding to the channel that is being processed.
+    t0_shifted : ndarray, NoneType, optional
+        The time shift (in s) of each trace in the trigger channel, which the template is shifted
+        to for the shifted optimum filter fit. Only used if the shifted fit is calculated and the
+        channel is not the trigger channel. If left as None, then the shifted fit is not calculated.
     
     Returns
     -------
@@ -457,6 +564,9 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
     
     fs = setup.fs
     
+    # the FFT of the traces is done once here and shared by all of the OF based RQs
+    spec = SpectralContext(signal, kernel)
+    
     if setup.do_baseline:
         baseline = np.mean(signal[:, :setup.baseline_indbasepre[chan_num]], axis=-1)
         rq_dict[f'baseline_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
@@ -471,18 +581,13 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
         rq_dict[f'integral_{chan}{det}'][readout_inds] = integral
 
     if setup.do_chi2_nopulse:
-        chi0 = np.zeros(len(signal))
-        for jj, s in enumerate(signal):
-            chi0[jj] = qp.chi2_nopulse(s, psd, fs)
+        chi0 = spec.chi2_nopulse()
 
         rq_dict[f'chi2_nopulse_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
         rq_dict[f'chi2_nopulse_{chan}{det}'][readout_inds] = chi0
 
     if setup.do_ofamp_nodelay:
-        amp_nodelay = np.zeros(len(signal))
-        chi2_nodelay = np.zeros(len(signal))
-        for jj, s in enumerate(signal):
-            amp_nodelay[jj], _, chi2_nodelay[jj] = qp.ofamp(s, template, psd, fs, withdelay=False)
+        amp_nodelay, _, chi2_nodelay = spec.ofamp(withdelay=False)
 
         rq_dict[f'ofamp_nodelay_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
         rq_dict[f'ofamp_nodelay_{chan}{det}'][readout_inds] = amp_nodelay
@@ -490,21 +595,14 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
         rq_dict[f'chi2_nodelay_{chan}{det}'][readout_inds] = chi2_nodelay
 
         if setup.ofamp_nodelay_lowfreqchi2 and setup.do_chi2_lowfreq:
-            chi2low = np.zeros(len(signal))
-            for jj, s in enumerate(signal):
-                chi2low[jj] = qp.chi2lowfreq(s, template, amp_nodelay[jj], 
-                                                  0, psd, fs, fcutoff=setup.chi2_lowfreq_fcutoff[chan_num])
+            chi2low = spec.chi2lowfreq(amp_nodelay, np.zeros(len(signal)), 
+                                       fcutoff=setup.chi2_lowfreq_fcutoff[chan_num])
 
-            rq_dict[f'chi2_nodelay_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
+            rq_dict[f'chi2lowfreq_nodelay_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
             rq_dict[f'chi2lowfreq_nodelay_{chan}{det}'][readout_inds] = chi2low
 
     if setup.do_ofamp_unconstrained:
-        amp_noconstrain = np.zeros(len(signal))
-        t0_noconstrain = np.zeros(len(signal))
-        chi2_noconstrain = np.zeros(len(signal))
-        for jj, s in enumerate(signal):
-            amp_noconstrain[jj], t0_noconstrain[jj], chi2_noconstrain[jj] = qp.ofamp(s, template, 
-                                                                                      psd, fs, withdelay=True)
+        amp_noconstrain, t0_noconstrain, chi2_noconstrain = spec.ofamp(withdelay=True)
 
         rq_dict[f'ofamp_unconstrain_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
         rq_dict[f'ofamp_unconstrain_{chan}{det}'][readout_inds] = amp_noconstrain
@@ -514,22 +612,15 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
         rq_dict[f'chi2_unconstrain_{chan}{det}'][readout_inds] = chi2_noconstrain
 
         if setup.ofamp_unconstrained_lowfreqchi2 and setup.do_chi2_lowfreq:
-            chi2low = np.zeros(len(signal))
-            for jj, s in enumerate(signal):
-                chi2low[jj] = qp.chi2lowfreq(s, template, amp_noconstrain[jj], t0_noconstrain[jj], 
-                                                  psd, fs, fcutoff=setup.chi2_lowfreq_fcutoff[chan_num])
+            chi2low = spec.chi2lowfreq(amp_noconstrain, t0_noconstrain, 
+                                       fcutoff=setup.chi2_lowfreq_fcutoff[chan_num])
 
             rq_dict[f'chi2lowfreq_unconstrain_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
             rq_dict[f'chi2lowfreq_unconstrain_{chan}{det}'][readout_inds] = chi2low
 
     if setup.do_ofamp_constrained:
-        amp_constrain = np.zeros(len(signal))
-        t0_constrain = np.zeros(len(signal))
-        chi2_constrain = np.zeros(len(signal))
-        for jj, s in enumerate(signal):
-            amp_constrain[jj], t0_constrain[jj], chi2_constrain[jj] = qp.ofamp(s, template, 
-                                                               psd, fs, withdelay=True,
-                                                               nconstrain=setup.ofamp_constrained_nconstrain[chan_num])
+        amp_constrain, t0_constrain, chi2_constrain = spec.ofamp(withdelay=True, 
+                                                       nconstrain=setup.ofamp_constrained_nconstrain[chan_num])
 
         rq_dict[f'ofamp_constrain_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
         rq_dict[f'ofamp_constrain_{chan}{det}'][readout_inds] = amp_constrain
@@ -539,22 +630,15 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
         rq_dict[f'chi2_constrain_{chan}{det}'][readout_inds] = chi2_constrain
 
         if setup.ofamp_constrained_lowfreqchi2 and setup.do_chi2_lowfreq:
-            chi2low = np.zeros(len(signal))
-            for jj, s in enumerate(signal):
-                chi2low[jj] = qp.chi2lowfreq(s, template, amp_constrain[jj], t0_constrain[jj], 
-                                                  psd, fs, fcutoff=setup.chi2_lowfreq_fcutoff[chan_num])
+            chi2low = spec.chi2lowfreq(amp_constrain, t0_constrain, 
+                                       fcutoff=setup.chi2_lowfreq_fcutoff[chan_num])
 
             rq_dict[f'chi2lowfreq_constrain_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
             rq_dict[f'chi2lowfreq_constrain_{chan}{det}'][readout_inds] = chi2low
 
     if setup.do_ofamp_pileup:
-        amp_pileup = np.zeros(len(signal))
-        t0_pileup = np.zeros(len(signal))
-        chi2_pileup = np.zeros(len(signal))
-        for jj, s in enumerate(signal):
-            _,_,amp_pileup[jj], t0_pileup[jj], chi2_pileup[jj] = qp.ofamp_pileup(s, template, 
-                                                               psd, fs, a1=amp_constrain[jj], t1=t0_constrain[jj],
-                                                               nconstrain2=setup.ofamp_pileup_nconstrain[chan_num])
+        amp_pileup, t0_pileup, chi2_pileup = spec.ofamp_pileup(amp_constrain, t0_constrain, 
+                                                    nconstrain2=setup.ofamp_pileup_nconstrain[chan_num])
 
         rq_dict[f'ofamp_pileup_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
         rq_dict[f'ofamp_pileup_{chan}{det}'][readout_inds] = amp_pileup
@@ -563,34 +647,91 @@ def _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ch
         rq_dict[f'chi2_pileup_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
         rq_dict[f'chi2_pileup_{chan}{det}'][readout_inds] = chi2_pileup
         
-    if setup.do_ofamp_shifted and setup.trigger is not None:
-        
-        if chan_num==setup.trigger:
-            if setup.shifted_fit=="nodelay" and setup.do_ofamp_nodelay:
-                setup.t0_shifted = np.zeros(len(signal))
-            elif setup.shifted_fit=="constrained" and setup.do_ofamp_constrained:
-                setup.t0_shifted = t0_constrain
-            elif setup.shifted_fit=="unconstrained" and setup.do_ofamp_unconstrained:
-                setup.t0_shifted = t0_unconstrain
-        else:
-            amp_shifted = np.zeros(len(signal))
-            chi2_shifted = np.zeros(len(signal))
-
-            for jj, s in enumerate(signal):
-                amp_shifted[jj], _, chi2_shifted[jj] = qp.ofamp(s, rp.shift(template, int(setup.t0_shifted[jj]*fs)), 
-                                                                            psd, fs, withdelay=False)
-
-            rq_dict[f'ofamp_shifted_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
-            rq_dict[f'ofamp_shifted_{chan}{det}'][readout_inds] = amp_shifted
-            rq_dict[f't0_shifted_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
-            rq_dict[f't0_shifted_{chan}{det}'][readout_inds] = setup.t0_shifted
-            rq_dict[f'chi2_shifted_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
-            rq_dict[f'chi2_shifted_{chan}{det}'][readout_inds] = chi2_shifted
-            
+    # the times of the trigger channel are only available if the individual channels are calculated
+    if setup.do_ofamp_shifted and setup.trigger is not None and chan_num!=setup.trigger \
+       and t0_shifted is not None:
+        amp_shifted, chi2_shifted = spec.ofamp_shifted(t0_shifted)
+
+        rq_dict[f'ofamp_shifted_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
+        rq_dict[f'ofamp_shifted_{chan}{det}'][readout_inds] = amp_shifted
+        rq_dict[f't0_shifted_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
+        rq_dict[f't0_shifted_{chan}{det}'][readout_inds] = t0_shifted
+        rq_dict[f'chi2_shifted_{chan}{det}'] = np.ones(len(readout_inds))*(-999999.0)
+        rq_dict[f'chi2_shifted_{chan}{det}'][readout_inds] = chi2_shifted
         
     return rq_dict
+
+def _get_t0_shifted(chan_dict, setup, chan, det, readout_inds):
+    """
+    Helper function for getting the times to shift the templates of the non-trigger channels to
+    for the shifted optimum filter fit, from the RQs of the trigger channel.
+    
+    Parameters
+    ----------
+    chan_dict : dict
+        The RQs that were calculated for the trigger channel.
+    setup : SetupRQ
+        A SetupRQ class object, which specifies which fit the times should be taken from.
+    chan : str
+        The name of the trigger channel.
+    det : str
+        The detector ID of the trigger channel.
+    readout_inds : ndarray of bool
+        Boolean mask that specifies which traces were used.
+    
+    Returns
+    -------
+    t0_shifted : ndarray
+        The time shift (in s) of each trace that was used.
+    
+    """
+    
+    if setup.shifted_fit=="nodelay":
+        return np.zeros(np.sum(readout_inds))
+    
+    fit = {"constrained" : "constrain", "unconstrained" : "unconstrain"}[setup.shifted_fit]
+    
+    if f't0_{fit}_{chan}{det}' not in chan_dict:
+        raise ValueError(f"The shifted fit uses the {setup.shifted_fit} fit, but it was not calculated")
+    
+    return chan_dict[f't0_{fit}_{chan}{det}'][readout_inds]
+    
+def _get_signal(traces, readout_inds, ii, convtoamps, dtype=float):
+    """
+    Helper function for getting the traces of a single channel that should be processed, converting
+    them to Amps if the traces are raw.
+    
+    Parameters
+    ----------
+    traces : ndarray
+        Array of traces of shape (number of traces, number of channels, length of trace).
+    readout_inds : ndarray of bool
+        Boolean mask that specifies which traces should be used.
+    ii : int
+        The index of the channel.
+    convtoamps : list, NoneType
+        List of the factors for each channel that convert the traces to Amps. If None, then the
+        traces are returned as they are.
+    dtype : data-type, optional
+        The dtype to convert the traces to, if convtoamps is passed. Should be the real dtype of
+        the kernels (i.e. of the precision of the setup). Default is float.
+    
+    Returns
+    -------
+    signal : ndarray
+        The traces of the channel, of shape (number of traces, length of trace).
     
-def _calc_rq(traces, channels, det, setup, readout_inds=None):
+    """
+    
+    signal = traces[readout_inds, ii]
+    
+    if convtoamps is not None:
+        signal = signal.astype(dtype)
+        signal *= convtoamps[ii]
+    
+    return signal
+
+def _calc_rq(traces, channels, det, setup, readout_inds=None, convtoamps=None):
     """
     Helper function for calculating RQs for arrays of traces.
     
@@ -609,6 +750,11 @@ def _calc_rq(traces, channels, det, setup, readout_inds=None):
     readout_inds : ndarray of bool, optional
         Boolean mask that specifies which traces should be used to calculate the RQs. RQs for the 
         excluded traces are set to -999999.0. 
+    convtoamps : list, NoneType, optional
+        List of the factors for each channel that convert the traces to Amps. If passed, then the traces
+        are assumed to be raw (e.g. int16 ADC bins), and each channel is converted to Amps (at the 
+        precision of the setup) only when its RQs are calculated. If left as None, then the traces are assumed to already be 
+        in units of Amps.
     
     Returns
     -------
@@ -621,6 +767,7 @@ def _calc_rq(traces, channels, det, setup, readout_inds=None):
         readout_inds = np.ones(len(traces), dtype=bool)
     
     rq_dict = {}
+    t0_shifted = None
     
     if setup.calcchans:
         vals = list(enumerate(zip(channels, det)))
@@ -631,27 +778,290 @@ def _calc_rq(traces, channels, det, setup, readout_inds=None):
             vals[setup.trigger], vals[0] = vals[0], vals[setup.trigger]
         
         for ii, (chan, d) in vals:
-            signal = traces[readout_inds, ii]
             template = setup.templates[ii]
             psd = setup.psds[ii]
+            kernel = setup.get_kernel(ii, traces.shape[-1])
+            signal = _get_signal(traces, readout_inds, ii, convtoamps, dtype=kernel.dtype)
 
-            chan_dict = _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, ii, d)
+            chan_dict = _calc_rq_single_channel(signal, template, psd, kernel, setup, readout_inds, chan, ii, d, 
+                                                t0_shifted=t0_shifted)
+            
+            if setup.do_ofamp_shifted and ii==setup.trigger:
+                t0_shifted = _get_t0_shifted(chan_dict, setup, chan, d, readout_inds)
 
             rq_dict.update(chan_dict)
             
     if setup.calcsum:
-        signal = traces[readout_inds].sum(axis=1)
         template = setup.summed_template
         psd = setup.summed_psd
+        kernel = setup.get_kernel("sum", traces.shape[-1])
+        if convtoamps is None:
+            signal = traces[readout_inds].sum(axis=1)
+        else:
+            signal = sum(_get_signal(traces, readout_inds, ii, convtoamps, dtype=kernel.dtype) 
+                         for ii in range(traces.shape[1]))
         chan = "sum"
 
-        sum_dict = _calc_rq_single_channel(signal, template, psd, setup, readout_inds, chan, 0, "")
+        sum_dict = _calc_rq_single_channel(signal, template, psd, kernel, setup, readout_inds, chan, 0, "", 
+                                           t0_shifted=t0_shifted)
 
         rq_dict.update(sum_dict)
     
     return rq_dict
 
-def _rq(file, channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype):
+def validate_precision(traces, channels, setup, det="Z1", precision="float32", readout_inds=None):
+    """
+    Function for validating a reduced precision calculation of the RQs on a reference dataset, by 
+    calculating the RQs at both float64 and the specified precision and reporting the worst-case
+    deviation of each RQ from its float64 value.
+    
+    Parameters
+    ----------
+    traces : ndarray
+        Array of reference traces, in units of Amps. Should be of shape (number of traces,
+        number of channels, length of trace).
+    channels : str, list of str
+        List of the channel names that will be processed. Used when naming RQs.
+    setup : SetupRQ
+        A SetupRQ class object. This object defines all of the different RQs that should be calculated 
+        and specifies relevant parameters. The object is not modified.
+    det : str, list of str, optional
+        The detector ID that corresponds to the channels that will be processed. Set to "Z1" by default.
+    precision : str, optional
+        The precision to validate against float64. Default is "float32".
+    readout_inds : ndarray of bool, optional
+        Boolean mask that specifies which traces should be used to calculate the RQs. If left as None,
+        then all of the traces are used.
+    
+    Returns
+    -------
+    deviations : pandas.DataFrame
+        A pandas DataFrame indexed by the name of each RQ, sorted by the worst relative deviation. The 
+        columns are "max_abs_dev", the maximum absolute deviation from the float64 value, "max_rel_dev", 
+        this deviation relative to the largest absolute float64 value of the RQ, and "frac_dev", the 
+        fraction of the traces whose value differs from the float64 value by more than 1e-4 relative to
+        that largest value (e.g. time shifts that moved to a different bin).
+    
+    """
+    
+    if isinstance(channels, str):
+        channels = [channels]
+        
+    if isinstance(det, str):
+        det = [det]*len(channels)
+    
+    setup_ref = copy.deepcopy(setup)
+    setup_ref.adjust_precision("float64")
+    
+    setup_test = copy.deepcopy(setup)
+    setup_test.adjust_precision(precision)
+    
+    rq_ref = _calc_rq(traces, channels, det, setup_ref, readout_inds=readout_inds)
+    rq_test = _calc_rq(traces, channels, det, setup_test, readout_inds=readout_inds)
+    
+    deviations = {"max_abs_dev" : [], "max_rel_dev" : [], "frac_dev" : []}
+    
+    if readout_inds is None:
+        readout_inds = np.ones(len(traces), dtype=bool)
+    
+    for key in rq_ref:
+        # only the traces that were processed are compared, rather than the placeholder values
+        ref = np.asarray(rq_ref[key], dtype=float)[readout_inds]
+        dev = np.abs(np.asarray(rq_test[key], dtype=float)[readout_inds] - ref)
+        
+        scale = np.max(np.abs(ref), initial=0)
+        if scale == 0:
+            scale = 1
+        
+        deviations["max_abs_dev"].append(np.max(dev, initial=0))
+        deviations["max_rel_dev"].append(np.max(dev, initial=0)/scale)
+        deviations["frac_dev"].append(np.mean(dev > 1e-4*scale) if len(dev) > 0 else 0)
+    
+    deviations = pd.DataFrame(deviations, index=list(rq_ref.keys()))
+    
+    return deviations.sort_values("max_rel_dev", ascending=False)
+
+def _get_series_dump(file, filetype):
+    """
+    Helper function for getting the series number and dump number of a file from its path.
+    
+    Parameters
+    ----------
+    file : str
+        Path to the file.
+    filetype : str
+        The string that corresponds to the file type. Supports three types -"mid.gz", "npz", and "npy".
+    
+    Returns
+    -------
+    seriesnum : str
+        The series number of the file.
+    dump : str, int
+        The dump number of the file.
+    
+    """
+    
+    if filetype == "mid.gz":
+        seriesnum = file.split('/')[-2]
+        dump = file.split('/')[-1].split('_')[-1].split('.')[0]
+    elif filetype == "npz":
+        seriesnum = file.split('/')[-1].split('.')[0]
+        dump = int(seriesnum.split('_')[-1])
+    elif filetype == "npy":
+        seriesnum = os.path.basename(os.path.normpath(file))
+        dump = int(seriesnum.split('_')[-1])
+    else:
+        raise ValueError("filetype should be set to 'mid.gz', 'npz', or 'npy'")
+    
+    return seriesnum, dump
+
+def _get_savename(file, filetype, savepath, saveformat):
+    """
+    Helper function for getting the path that the RQs of a file are saved to.
+    
+    Parameters
+    ----------
+    file : str
+        Path to the file that is processed.
+    filetype : str
+        The string that corresponds to the file type. Supports three types -"mid.gz", "npz", and "npy".
+    savepath : str
+        The path to where each dump is saved.
+    saveformat : str
+        The format that each dump is saved in, either "parquet" or "pkl".
+    
+    Returns
+    -------
+    savename : str
+        The path to the saved RQs of the file.
+    
+    """
+    
+    seriesnum, dump = _get_series_dump(file, filetype)
+    
+    if saveformat == "parquet":
+        savename = os.path.join(savepath, f"{seriesnum}", f"rq_d{dump}.parquet")
+    else:
+        savename = f'{savepath}rq_df_{seriesnum}_d{dump}.pkl'
+    
+    return savename
+
+def _hash_value(h, val):
+    """
+    Helper function for updating a hash object with a value, which can be an array, a list, 
+    or any object with a deterministic repr.
+    
+    """
+    
+    if isinstance(val, np.ndarray):
+        h.update(f"{val.dtype}{val.shape}".encode())
+        h.update(np.ascontiguousarray(val).tobytes())
+    elif isinstance(val, (list, tuple)):
+        h.update(b"[")
+        for v in val:
+            _hash_value(h, v)
+        h.update(b"]")
+    else:
+        h.update(repr(val).encode())
+
+def _config_hash(setup, channels, det, convtoamps, filetype, dtype, saveformat):
+    """
+    Helper function for calculating a hash of the configuration used to process a dump, such
+    that dumps that were processed with a different configuration can be identified.
+    
+    Parameters
+    ----------
+    setup : SetupRQ
+        A SetupRQ class object that defines all of the different RQs that are calculated.
+    channels : list of str
+        List of the channels that are processed.
+    det : list of str
+        The detector ID that corresponds to the channels that are processed.
+    convtoamps : list
+        List of the factors for each channel that convert the units to Amps.
+    filetype : str
+        The string that corresponds to the file type that is processed.
+    dtype : data-type
+        The dtype that the traces are read as.
+    saveformat : str
+        The format that each dump is saved in. Dumps saved in a different format cannot be loaded
+        with the reader of this format, so they count as a different configuration.
+    
+    Returns
+    -------
+    config : str
+        The hexadecimal SHA-1 hash of the configuration.
+    
+    """
+    
+    # the kernels are a cache, not configuration
+    config = {key: val for key, val in vars(setup).items() if key != "kernels"}
+    config["channels"] = channels
+    config["det"] = det
+    config["convtoamps"] = convtoamps
+    config["filetype"] = filetype
+    config["dtype"] = np.dtype(dtype).str
+    config["saveformat"] = saveformat
+    
+    h = hashlib.sha1()
+    for key in sorted(config):
+        h.update(key.encode())
+        _hash_value(h, config[key])
+    
+    return h.hexdigest()
+
+def _load_manifest(savepath):
+    """
+    Helper function for loading the manifest of processed dumps in savepath. If there
+    is no manifest, then an empty one is returned.
+    
+    Parameters
+    ----------
+    savepath : str
+        The path to where each dump is saved.
+    
+    Returns
+    -------
+    manifest : dict
+        Dictionary keyed by the absolute path of each file that has been processed, with values that 
+        are dictionaries containing the configuration hash, the status ("done" or "failed"), and either
+        the path to the saved RQs or the error that was raised.
+    
+    """
+    
+    filename = os.path.join(savepath, "rq_manifest.json")
+    
+    if not os.path.exists(filename):
+        return {}
+    
+    with open(filename, "r") as f:
+        manifest = json.load(f)
+    
+    return manifest
+
+def _save_manifest(manifest, savepath):
+    """
+    Helper function for saving the manifest of processed dumps to savepath. The manifest is 
+    written to a temporary file first, so that an interrupted run never leaves a corrupt manifest.
+    
+    Parameters
+    ----------
+    manifest : dict
+        The manifest of processed dumps, see _load_manifest.
+    savepath : str
+        The path to where each dump is saved.
+    
+    """
+    
+    filename = os.path.join(savepath, "rq_manifest.json")
+    
+    with open(filename + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    
+    os.replace(filename + ".tmp", filename)
+
+def _rq(file, channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype, chunksize=None, 
+        saveformat="pkl", dtype=float):
     """
     Helper function for processing raw data to calculate RQs for single files.
     
@@ -675,8 +1085,18 @@ def _rq(file, channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype
         Useful for saving data as the processing routine is run, allowing checks of the data during
         run time.
     filetype : str
-        The string that corresponds to the file type that will be opened. Supports two 
-        types -"mid.gz" and "npz".
+        The string that corresponds to the file type that will be opened. Supports three 
+        types -"mid.gz", "npz", and "npy".
+    chunksize : int, NoneType, optional
+        The number of events to read and process at a time. If left as None, then the whole 
+        file is processed at once.
+    saveformat : str, optional
+        The format to save each dump in, if lgcsavedumps is True. Supports "parquet", where each
+        chunk is appended to the dump's file in the Parquet RQ store, and "pkl", where the DataFrame
+        for the dump is pickled. Default is "pkl".
+    dtype : data-type, optional
+        The dtype that the traces of mid.gz files are read as. If an integer type, then the raw traces are
+        kept and each channel is converted to Amps when its RQs are calculated. Default is float.
     
     Returns
     -------
@@ -688,12 +1108,7 @@ def _rq(file, channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype
     if filetype == "mid.gz" and not HAS_SCDMSPYTOOLS:
         raise ImportError("Cannot use filetype mid.gz because scdmsPyTools is not installed.")
         
-    if filetype == "mid.gz":
-        seriesnum = file.split('/')[-2]
-        dump = file.split('/')[-1].split('_')[-1].split('.')[0]
-    elif filetype == "npz":
-        seriesnum = file.split('/')[-1].split('.')[0]
-        dump = int(seriesnum.split('_')[-1])
+    seriesnum, dump = _get_series_dump(file, filetype)
         
     print(f"On Series: {seriesnum},  dump: {dump}")
     
@@ -706,39 +1121,169 @@ def _rq(file, channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype
     if len(det)!=len(channels):
         raise ValueError("channels and det should have the same length")
     
+    # raw traces are converted to Amps channel by channel in _calc_rq
+    if filetype == "mid.gz" and not np.issubdtype(np.dtype(dtype), np.floating):
+        rawconvtoamps = convtoamps
+    else:
+        rawconvtoamps = None
+    
     if filetype == "mid.gz":
-        traces, info_dict = io.get_traces_midgz([file], channels=channels, det=det, convtoamps=convtoamps,
-                                                lgcskip_empty=False, lgcreturndict=True)
+        chunks = io.iter_traces_midgz([file], channels=channels, det=det, convtoamps=convtoamps,
+                                      lgcskip_empty=False, chunksize=chunksize, dtype=dtype)
     elif filetype == "npz":
-        traces, info_dict = io.get_traces_npz([file])
+        chunks = io.iter_traces_npz([file], chunksize=chunksize)
+    elif filetype == "npy":
+        chunks = io.iter_traces_npy([file], chunksize=chunksize)
     
-    data = {}
+    chunks = _read_chunks(chunks, file)
     
-    data.update(info_dict)
+    # the RQs are calculated chunk by chunk, such that only one chunk of converted traces (and of the 
+    # spectral quantities calculated from them) is in memory at a time. The RQs of every chunk are kept, 
+    # as they are returned for the whole dump, and the raw traces of mid.gz dumps are read all at once
+    rq_dfs = []
     
-    if filetype == "mid.gz":
-        readout_inds = []
-        for d in set(det):
-            readout_inds.append(np.array(data[f'readoutstatus{d}'])==1)
-        readout_inds = np.logical_and.reduce(readout_inds)
-    elif filetype == "npz":
-        readout_inds = None
+    with contextlib.ExitStack() as stack:
+        if lgcsavedumps and saveformat == "parquet":
+            # the writer removes its partially written file if any chunk raises an error
+            writer = stack.enter_context(io.RQWriter(savepath, seriesnum, dump))
+        else:
+            writer = None
+        
+        for traces, info_dict in chunks:
+            data = {}
+
+            data.update(info_dict)
+
+            if filetype == "mid.gz":
+                readout_inds = []
+                for d in set(det):
+                    readout_inds.append(np.array(data[f'readoutstatus{d}'])==1)
+                readout_inds = np.logical_and.reduce(readout_inds)
+            elif filetype in ["npz", "npy"]:
+                readout_inds = None
+
+            rq_dict = _calc_rq(traces, channels, det, setup, readout_inds=readout_inds, convtoamps=rawconvtoamps)
+            del traces
+
+            data.update(rq_dict)
+
+            rq_df_chunk = pd.DataFrame.from_dict(data)
+
+            if writer is not None:
+                writer.write(rq_df_chunk)
+
+            rq_dfs.append(rq_df_chunk)
     
-    rq_dict = _calc_rq(traces, channels, det, setup, readout_inds=readout_inds)
+    rq_df = pd.concat(rq_dfs, ignore_index=True)
     
-    data.update(rq_dict)
+    if lgcsavedumps and saveformat == "pkl":
+        rq_df.to_pickle(_get_savename(file, filetype, savepath, saveformat))
+
+    return rq_df
+
+
+class _DumpReadError(Exception):
+    """
+    Exception for any error that was raised while opening or reading a dump (e.g. a truncated or corrupted
+    file, or a file system hiccup), as opposed to an error from the arguments or the setup. The original
+    error is kept as the cause.
     
-    rq_df = pd.DataFrame.from_dict(data)
+    """
     
-    if lgcsavedumps:
-        rq_df.to_pickle(f'{savepath}rq_df_{seriesnum}_d{dump}.pkl')   
+    pass
 
-    return rq_df
+def _read_chunks(chunks, file):
+    """
+    Helper function for wrapping the chunks of a dump, such that any error raised while opening 
+    or reading the dump is raised as a _DumpReadError. The errors that are raised while processing
+    the yielded chunks are not changed.
+    
+    Parameters
+    ----------
+    chunks : iterator
+        The chunks of traces and event information of the dump, e.g. from rqpy.io.iter_traces_npz.
+    file : str
+        Path to the dump that is being read.
+    
+    Yields
+    ------
+    chunk : tuple
+        The next chunk of traces and event information of the dump.
+    
+    """
+    
+    chunks = iter(chunks)
+    
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        except Exception as e:
+            raise _DumpReadError(f"Failed to read {file}: {e!r}") from e
+        
+        yield chunk
 
+_rq_worker_args = {}
 
-def rq(filelist, channels, setup, det="Z1", savepath='', lgcsavedumps=False, nprocess=1, filetype="mid.gz"):
+def _init_rq_worker(channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype, chunksize, 
+                    saveformat, dtype, nretry):
     """
-    Function for processing raw data to calculate RQs. Supports multiprocessing.
+    Helper function for initializing a process that calculates RQs. The arguments that are 
+    the same for every file (most notably the setup object) are stored once per process, 
+    rather than being sent with every file. See _rq for the parameters.
+    
+    """
+    
+    _rq_worker_args.clear()
+    _rq_worker_args.update(channels=channels, det=det, setup=setup, convtoamps=convtoamps, 
+                           savepath=savepath, lgcsavedumps=lgcsavedumps, filetype=filetype, 
+                           chunksize=chunksize, saveformat=saveformat, dtype=dtype, nretry=nretry)
+
+def _rq_worker(file):
+    """
+    Helper function for calculating the RQs of a single file in a process that has been 
+    initialized with _init_rq_worker. Any error raised while opening or reading the file is caught, 
+    such that a bad file does not stop the processing of the other files, and the file is retried up 
+    to nretry times. Any other error (from the arguments, the setup, or saving the RQs) is raised, 
+    as it would fail for every file.
+    
+    Parameters
+    ----------
+    file : str
+        Path to a file that should be opened and processed.
+        
+    Returns
+    -------
+    file : str
+        Path to the file that was processed.
+    rq_df : pandas.DataFrame, NoneType
+        A pandas DataFrame object that contains all of the RQs for the file. Set to None if 
+        the file failed.
+    error : str, NoneType
+        The representation of the error raised by the last attempt, if the file failed. Set to 
+        None if the file was processed successfully.
+    
+    """
+    
+    args = dict(_rq_worker_args)
+    nretry = args.pop("nretry")
+    
+    for attempt in range(nretry + 1):
+        try:
+            rq_df = _rq(file, **args)
+            return file, rq_df, None
+        except _DumpReadError as e:
+            error = repr(e.__cause__)
+    
+    return file, None, error
+
+def rq(filelist, channels, setup, det="Z1", savepath='', lgcsavedumps=False, nprocess=1, filetype="mid.gz", 
+       chunksize=None, saveformat="pkl", lgcresume=False, nretry=1, dtype=float):
+    """
+    Function for processing raw data to calculate RQs. Supports multiprocessing, where each 
+    process takes the next file as soon as it is free, and the results of each dump are recorded 
+    as soon as it finishes.
     
     Parameters
     ----------
@@ -758,25 +1303,68 @@ def rq(filelist, channels, setup, det="Z1", savepath='', lgcsavedumps=False, npr
     savepath : str
         The path to where each dump should be saved, if lgcsavedumps is set to True.
     lgcsavedumps : bool
-        Boolean flag for whether or not the DataFrame for each dump should be saved individually.
+        Boolean flag for whether or not the RQs for each dump should be saved individually.
         Useful for saving data as the processing routine is run, allowing checks of the data during
         run time.
     nprocess : int, optional
         The number of processes that should be used when multiprocessing. The default is 1.
     filetype : str, optional
-        The string that corresponds to the file type that will be opened. Supports two 
-        types -"mid.gz" and "npz". "mid.gz" is the default.
+        The string that corresponds to the file type that will be opened. Supports three 
+        types -"mid.gz", "npz", and "npy". "npy" refers to the uncompressed format saved by 
+        acquire_pulses and acquire_randoms with saveformat="npy", which is memory-mapped when 
+        reading. "mid.gz" is the default.
+    chunksize : int, NoneType, optional
+        The number of events to read and process at a time from each file. Setting this bounds the
+        memory of the converted traces and of the optimum filter calculations in each process by the 
+        chunk size, rather than by the size of each file. The RQs of each file are still returned all at 
+        once, and the raw traces of each mid.gz file are still read all at once. If left as None, then 
+        each file is processed all at once.
+    saveformat : str, optional
+        The format to save each dump in, if lgcsavedumps is True. Supports two formats - "parquet"
+        and "pkl". With "parquet", the RQs are written to a columnar store in savepath, with one 
+        folder per series and one file per dump, which can be loaded column by column with 
+        rqpy.io.load_rq, and requires pyarrow. With "pkl", the DataFrame for each dump is pickled. "pkl" 
+        is the default.
+    lgcresume : bool, optional
+        Boolean flag for whether or not to skip the dumps that have already been processed. When saving 
+        dumps, a manifest (rq_manifest.json in savepath) records which dumps finished and the hash of the 
+        configuration (the setup object, channels, det, conversion factors, dtype, and saveformat) that they 
+        were processed with. If True, then dumps that finished with the same configuration are not reprocessed, 
+        and their RQs are instead loaded from savepath. Requires lgcsavedumps to be True. Default is False.
+    nretry : int, optional
+        The number of times to retry processing a dump that raised any error while being opened or read 
+        (e.g. a zipfile.BadZipFile from a truncated npz file). If a dump still fails, then it is skipped 
+        (and marked as failed in the manifest if saving dumps), rather than stopping the whole run. Errors 
+        from the arguments, the setup, or saving the RQs are raised. Default is 1.
+    dtype : data-type, optional
+        The dtype that the traces of mid.gz files are read as. The default of float converts each chunk
+        of traces to Amps in float64. Setting np.float32 halves the memory of the converted traces. Setting 
+        an integer type (e.g. np.int16) keeps the raw traces in units of ADC bins, and each channel is only
+        converted to Amps (at the precision of the setup) when its RQs are calculated, which gives the same
+        RQs as the default with a fraction of the memory. The npz and npy file types are saved in Amps, and 
+        are always read as they are stored.
     
     Returns
     -------
     rq_df : pandas.DataFrame
-        A pandas DataFrame object that contains all of the RQs for each dataset in filelist.
+        A pandas DataFrame object that contains all of the RQs for each dataset in filelist, excluding
+        any dumps that failed. This is returned in memory for either saveformat, to load only some of 
+        the RQs from a Parquet store, use rqpy.io.load_rq after the processing.
     
     """
     
     if filetype == "mid.gz" and not HAS_SCDMSPYTOOLS:
         raise ImportError("Cannot use filetype mid.gz because scdmsPyTools is not installed.")
     
+    if saveformat not in ["parquet", "pkl"]:
+        raise ValueError("saveformat should be set to 'parquet' or 'pkl'")
+    
+    if lgcsavedumps and saveformat == "parquet" and not HAS_PYARROW:
+        raise ImportError("Cannot use saveformat parquet because pyarrow is not installed.")
+    
+    if lgcresume and not lgcsavedumps:
+        raise ValueError("lgcresume requires lgcsavedumps to be True, as the RQs of skipped dumps are loaded from savepath")
+    
     if isinstance(filelist, str):
         filelist = [filelist]
         
@@ -795,20 +1383,88 @@ def rq(filelist, channels, setup, det="Z1", savepath='', lgcsavedumps=False, npr
         convtoamps = []
         for ch, d in zip(channels, det):
             convtoamps.append(io.get_trace_gain(folder, ch, d)[0])
-    elif filetype == "npz":
+    elif filetype in ["npz", "npy"]:
         convtoamps = [1]*len(channels)
     
-    if nprocess == 1:
-        results = []
-        for f in filelist:
-            results.append(_rq(f, channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype))
+    config = _config_hash(setup, channels, det, convtoamps, filetype, dtype, saveformat)
+    
+    if lgcsavedumps:
+        manifest = _load_manifest(savepath)
     else:
-        pool = multiprocessing.Pool(processes = nprocess)
-        results = pool.starmap(_rq, zip(filelist, repeat(channels), repeat(det), repeat(setup), 
-                                        repeat(convtoamps), repeat(savepath), repeat(lgcsavedumps),
-                                        repeat(filetype)))
-        pool.close()
-        pool.join()
+        manifest = None
+    
+    results = {}
+    
+    if lgcresume:
+        for f in filelist:
+            entry = manifest.get(os.path.abspath(f))
+            if entry is not None and entry["status"] == "done" and entry["config"] == config \
+               and os.path.exists(entry["output"]):
+                if saveformat == "parquet":
+                    results[f] = pd.read_parquet(entry["output"])
+                else:
+                    results[f] = pd.read_pickle(entry["output"])
+        
+        print(f"Skipping {len(results)} of {len(filelist)} dumps that have already been processed")
+    
+    todo = [f for f in filelist if f not in results]
+    
+    # build the optimum filters once, so that they are sent to each process rather than rebuilt
+    setup.build_kernels()
+    
+    workerargs = (channels, det, setup, convtoamps, savepath, lgcsavedumps, filetype, chunksize, saveformat, 
+                  dtype, nretry)
+    
+    failed = {}
+    pool = None
+    
+    try:
+        if nprocess == 1:
+            _init_rq_worker(*workerargs)
+            iresults = map(_rq_worker, todo)
+        else:
+            # the setup object is sent once to each process, and each process takes the next file when it is free
+            pool = multiprocessing.Pool(processes=nprocess, initializer=_init_rq_worker, initargs=workerargs)
+            iresults = pool.imap_unordered(_rq_worker, todo)
+        
+        start = time.time()
+        
+        for ii, (f, rq_df, error) in enumerate(iresults):
+            if error is None:
+                results[f] = rq_df
+                # absolute paths, such that the run can be resumed from a different working directory
+                output = os.path.abspath(_get_savename(f, filetype, savepath, saveformat))
+                entry = {"config": config, "status": "done", "output": output}
+            else:
+                failed[f] = error
+                entry = {"config": config, "status": "failed", "error": error}
+                print(f"Failed to process {f}: {error}")
+            
+            if manifest is not None:
+                manifest[os.path.abspath(f)] = entry
+                _save_manifest(manifest, savepath)
+            
+            elapsed = time.time() - start
+            print(f"Finished {ii+1} of {len(todo)} dumps ({(ii+1)/elapsed:.3f} dumps/s)")
+        
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        # the workers are stopped if the processing was interrupted by an error
+        if pool is not None:
+            pool.terminate()
+        _rq_worker_args.clear()
+    
+    if len(failed) > 0:
+        print(f"{len(failed)} of {len(todo)} dumps failed and were skipped:")
+        for f in failed:
+            print(f"    {f}")
+    
+    if len(results) == 0:
+        return pd.DataFrame()
+    
+    results = [results[f] for f in filelist if f in results]
     
     rq_df = pd.concat([df for df in results], ignore_index = True)
     
@@ -1,11 +1,14 @@
 import numpy as np
-from scipy.signal import correlate
-from numpy.fft import ifft, fft, fftfreq, rfft, rfftfreq
 from numpy.random import choice
-from collections import Counter
 from math import log10, floor
 from rqpy.io import loadstanfordfile
+from rqpy.core._fft import rfft, irfft
+from rqpy.process._of_engine import _get_dtypes, _onesided_invpsd
 import datetime
+import os
+import json
+import copy
+import multiprocessing
 
 
 __all__ = ["rand_sections", "OptimumFilt", "acquire_randoms", "acquire_pulses"]
@@ -54,6 +57,164 @@ def _getchangeslessthanthresh(x, threshold):
 
     return ranges, vals
 
+
+def _segmentargmax(vals, starts, ends):
+    """
+    Helper function that returns the index of the (first) maximum of each segment of an array.
+    
+    Parameters
+    ----------
+    vals : ndarray
+        1-dimensional array of values.
+    starts : ndarray
+        The starting index of each segment, in increasing order.
+    ends : ndarray
+        The ending index (exclusive) of each segment, where each segment is non-empty.
+        
+    Returns
+    -------
+    inds : ndarray
+        The index in vals of the maximum of each segment.
+    
+    """
+    
+    segmax = np.maximum.reduceat(vals, starts)
+    ismax = vals == np.repeat(segmax, ends - starts)
+    inds = np.minimum.reduceat(np.where(ismax, np.arange(len(vals)), len(vals)), starts)
+    
+    return inds
+
+
+def _fftblocksize(nkernel, blocksize=None):
+    """
+    Helper function that returns the length of the FFT blocks used by _fftcorrelate.
+    
+    Parameters
+    ----------
+    nkernel : int
+        The length of the kernel.
+    blocksize : NoneType, int, optional
+        The requested block length, which must be at least the length of the kernel. If left as None, 
+        then the smallest power of two that is at least 8 times the length of the kernel is used.
+    
+    Returns
+    -------
+    blocksize : int
+        The length of the FFT blocks.
+    
+    """
+    
+    if blocksize is None:
+        blocksize = 2**int(np.ceil(np.log2(8*nkernel)))
+    elif blocksize < nkernel:
+        raise ValueError("blocksize must be at least the length of the kernel")
+    
+    return blocksize
+
+def _fftcorrelate(x, kernel, blocksize=None, kernelfft=None, dtype=float):
+    """
+    Helper function that correlates each of the inputted traces with a kernel using FFT-based 
+    overlap-save filtering, which is equivalent to `scipy.signal.correlate(trace, kernel, mode="same")` 
+    for each trace. All traces are processed at once, in blocks of length blocksize.
+    
+    Parameters
+    ----------
+    x : ndarray
+        The traces to filter, with the time axis as the last axis.
+    kernel : ndarray
+        1-dimensional kernel to correlate the traces with.
+    blocksize : NoneType, int, optional
+        The length (in bins) of the FFT used for each block, which must be at least the length of
+        the kernel. Smaller blocks fit better in cache, larger blocks waste less computation on the
+        overlap between blocks. If left as None, then the smallest power of two that is at least 
+        8 times the length of the kernel is used.
+    kernelfft : NoneType, ndarray, optional
+        The precomputed real FFT of the reversed kernel with length blocksize, which only depends on
+        the kernel and the block length. If left as None, then it is calculated.
+    dtype : data-type, optional
+        The real dtype that the FFTs are calculated in, e.g. np.float32 to filter in single precision.
+        Default is float.
+    
+    Returns
+    -------
+    filts : ndarray
+        The correlation of each trace with the kernel, with the same shape as x.
+    
+    """
+    
+    nbins = x.shape[-1]
+    nkernel = len(kernel)
+    
+    blocksize = _fftblocksize(nkernel, blocksize)
+    
+    # correlation is convolution with the reversed kernel, the "same" mode output starts at this
+    # index of the full convolution
+    start = (nkernel - 1)//2
+    step = blocksize - nkernel + 1
+    nblocks = int(np.ceil((start + nbins)/step))
+    
+    if kernelfft is None:
+        kernelfft = rfft(np.asarray(kernel[::-1], dtype=dtype), n=blocksize)
+    
+    # pad with nkernel-1 zeros on the left so that every block has its full history
+    padded = np.zeros(x.shape[:-1] + (nblocks*step + nkernel - 1,), dtype=dtype)
+    padded[..., nkernel - 1:nkernel - 1 + nbins] = x
+    
+    blocks = np.lib.stride_tricks.sliding_window_view(padded, blocksize, axis=-1)[..., ::step, :]
+    filtblocks = irfft(rfft(blocks, axis=-1) * kernelfft, n=blocksize, axis=-1)[..., nkernel - 1:]
+    
+    filts = filtblocks.reshape(x.shape[:-1] + (nblocks*step,))[..., start:start + nbins]
+    
+    return filts
+
+def _randdistinct(sizes, counts):
+    """
+    Helper function that draws, for each group, the specified number of distinct random integers 
+    in the range [0, size) of the group, for all groups at once. Duplicates are redrawn until there
+    are none, which gives every subset of the range the same probability, as the procedure does not 
+    depend on the values themselves. Groups that need more than half of their range are drawn with
+    numpy.random.choice instead, as redrawing would converge slowly.
+    
+    Parameters
+    ----------
+    sizes : ndarray
+        The size of the range of each group.
+    counts : ndarray
+        The number of distinct integers to draw for each group, at most the size of the group.
+        
+    Returns
+    -------
+    groups : ndarray
+        The group of each drawn integer, in increasing order.
+    vals : ndarray
+        The drawn integers, in increasing order within each group.
+    
+    """
+    
+    groups = np.repeat(np.arange(len(counts)), counts)
+    vals = np.zeros(len(groups), dtype=int)
+    
+    lgcdense = np.repeat(2*counts > sizes, counts)
+    
+    for group in np.flatnonzero((2*counts > sizes) & (counts > 0)):
+        vals[groups==group] = choice(sizes[group], size=counts[group], replace=False)
+    
+    sparse = np.flatnonzero(~lgcdense)
+    vals[sparse] = np.random.randint(0, sizes[groups[sparse]])
+    
+    while True:
+        vals = vals[np.lexsort((vals, groups))]
+        dups = np.zeros(len(vals), dtype=bool)
+        dups[1:] = vals[1:] == vals[:-1]
+        dups[1:] &= groups[1:] == groups[:-1]
+        
+        if not np.any(dups):
+            break
+        
+        vals[dups] = np.random.randint(0, sizes[groups[dups]])
+    
+    return groups, vals
+
 def rand_sections(x, n, l, t=None, fs=1.0):
     """
     Return random, non-overlapping sections of a 1 or 2 dimensional array.
@@ -89,19 +250,14 @@ def rand_sections(x, n, l, t=None, fs=1.0):
             t = 0.0
         elif not np.isscalar(t):
             raise ValueError("x is 1-dimensional, t should be a scalar value")
-
-        res = np.zeros((n, l))
-        evttimes = np.zeros(n)
-        j=0
-        offset = 0
-        inds = np.arange(len(x) - (l-1)*n)
-
-        for ind in sorted(choice(inds, size=n, replace=False)):
-            ind += offset
-            res[j] = x[ind:ind + l]
-            evttimes[j] = t + (ind+l//2)/fs
-            j += 1
-            offset += l - 1
+        
+        # choosing n non-overlapping sections is the same as choosing n distinct values from the
+        # range that is left after removing the length of all of the sections but one bin each
+        inds = _randdistinct(np.array([len(x) - (l-1)*n]), np.array([n]))[1]
+        inds += np.arange(n)*(l-1)
+        
+        res = np.lib.stride_tricks.sliding_window_view(x, l)[inds]
+        evttimes = t + (inds+l//2)/fs
 
     else:
         if t is None:
@@ -110,35 +266,25 @@ def rand_sections(x, n, l, t=None, fs=1.0):
             raise ValueError(f"x is {len(x.shape)}-dimensional, t should be an array")
         elif len(x) != len(t):
             raise ValueError("x and t have different lengths")
-            
-        tup = ((n,),x.shape[1:-1],(l,))
-        sz = sum(tup,())
-        
-        res = np.zeros(sz)
-        evttimes = np.zeros(n)
-        j=0
         
+        t = np.asarray(t)
         nmax = int(x.shape[-1]/l)
         
         if x.shape[0]*nmax<n:
             raise ValueError("Either n or l is too large, trying to find more random sections than are possible.")
         
-        choicelist = list(range(len(x))) * nmax
-        np.random.shuffle(choicelist)
-        rows = np.array(choicelist[:n])
-        counts = Counter(rows)
-
-        for key in counts.keys():
-            offset = 0
-            ncounts = counts[key]
-            inds = np.arange(x.shape[-1] - (l-1)*ncounts)
-            
-            for ind in sorted(choice(inds, size=ncounts, replace=False)):
-                ind += offset
-                res[j] = x[key, ..., ind:ind + l]
-                evttimes[j] = t[key] + (ind+l//2)/fs
-                j += 1
-                offset += l - 1
+        # each row can hold nmax sections, so the rows are drawn as n distinct slots out of all of the slots
+        slots = choice(len(x)*nmax, size=n, replace=False)
+        counts = np.bincount(slots % len(x), minlength=len(x))
+        
+        rows, inds = _randdistinct(x.shape[-1] - (l-1)*counts, counts)
+        
+        # shift each start index by the length of the sections before it in the same row
+        rowstarts = np.cumsum(counts) - counts
+        inds += (np.arange(n) - rowstarts[rows])*(l-1)
+        
+        res = np.lib.stride_tricks.sliding_window_view(x, l, axis=-1)[rows, ..., inds, :]
+        evttimes = t[rows] + (inds+l//2)/fs
     
     return evttimes, res
 
@@ -161,13 +307,17 @@ class OptimumFilt(object):
     pulse_range : int
         If detected events are this far away from one another (in bins), 
         then they are to be treated as the same event.
+    blocksize : NoneType, int
+        The length (in bins) of the FFT blocks used when filtering the traces.
+    precision : str
+        The precision that the traces are filtered in, either "float64" or "float32".
     traces : ndarray
         All of the traces to be filtered, assumed to be an ndarray of 
         shape = (# of traces, # of channels, # of trace bins). Should be in units of Amps.
     template : ndarray
         The template that will be used for the Optimum Filter.
     noisepsd : ndarray
-        The two-sided noise PSD that will be used to create the Optimum Filter.
+        The noise PSD that will be used to create the Optimum Filter, either two-sided or folded over.
     filts : ndarray 
         The result of the FIR filter on each of the traces.
     resolution : float
@@ -188,10 +338,13 @@ class OptimumFilt(object):
     trigtypes: ndarray
         Array of boolean vectors each of length 3. The first value indicates if the trace is a random or not.
         The second value indicates if we had a pulse trigger. The third value indicates if we had a ttl trigger.
+    evtinds : ndarray
+        The index (in bins) of each detected event in the trace that it was detected in.
             
     """
 
-    def __init__(self, fs, template, noisepsd, tracelength, trigtemplate=None):
+    def __init__(self, fs, template, noisepsd, tracelength, trigtemplate=None, blocksize=None, 
+                 precision="float64"):
         """
         Initialization of the FIR filter.
         
@@ -202,22 +355,35 @@ class OptimumFilt(object):
         template : ndarray
             The pulse template to be used when creating the optimum filter (assumed to be normalized)
         noisepsd : ndarray
-            The two-sided power spectral density in units of A^2/Hz
+            The power spectral density in units of A^2/Hz. Either the two-sided psd, with the same length as
+            the template, or the folded over one-sided psd, with length len(template)//2 + 1.
         tracelength : int
             The desired trace length (in bins) to be saved when triggering on events.
         trigtemplate : NoneType, ndarray, optional
             The template for the trigger channel pulse. If left as None, then the trigger channel will not
             be analyzed.
+        blocksize : NoneType, int, optional
+            The length (in bins) of the FFT blocks used when filtering the traces, which must be at least the
+            length of the template. If left as None, then the smallest power of two that is at least 8 times the
+            length of the template is used.
+        precision : str, optional
+            The precision that the traces are filtered in. If set to "float32", then the FFTs of the filtering
+            are done in float32/complex64. The filters themselves are always built in float64. Default 
+            is "float64".
         
         """
         
+        _get_dtypes(precision)
+        
         self.tracelength = tracelength
+        self.blocksize = blocksize
+        self.precision = precision
         self.fs = fs
         self.template = template
         self.noisepsd = noisepsd
         
-        # calculate the time-domain optimum filter
-        self.phi = ifft(fft(self.template)/self.noisepsd).real
+        # calculate the time-domain optimum filter, using only the positive frequencies as the template is real
+        self.phi = irfft(rfft(self.template)*_onesided_invpsd(self.noisepsd, len(self.template)), n=len(self.template))
         # calculate the normalization of the optimum filter
         self.norm = np.dot(self.phi, self.template)
         
@@ -252,6 +418,16 @@ class OptimumFilt(object):
         self.trigamps = None
         self.evttraces = None
         self.trigtypes = None
+        self.evtinds = None
+        self._evttraceinds = None
+        
+        # the FFTs of the filters for each block length, which are kept between calls of filtertraces
+        self._kernelffts = {}
+        
+        # the state of the streaming trigger, see streamtrigger
+        self._streamtraces = None
+        self._streamtrig = None
+        self._streamtime = None
 
 
     def filtertraces(self, traces, times, trig=None):
@@ -280,8 +456,10 @@ class OptimumFilt(object):
         # calculate the total pulse by summing across channels for each trace
         pulsestot = np.sum(traces, axis=1)
         
-        # apply the FIR filter to each trace
-        self.filts = np.array([correlate(trace, self.phi, mode="same")/self.norm for trace in pulsestot])
+        # apply the FIR filter to all of the traces at once
+        blocksize, phifft = self._getkernelfft("phi", self.phi)
+        self.filts = _fftcorrelate(pulsestot, self.phi, blocksize=blocksize, kernelfft=phifft, 
+                                   dtype=phifft.real.dtype)/self.norm
         
         # set the filtered values to zero near the edges, so as not to use the padded values in the analysis
         # also so that the traces that will be saved will be equal to the tracelength
@@ -293,15 +471,36 @@ class OptimumFilt(object):
         if self.trigtemplate is None and trig is not None:
             raise ValueError("trig values have been inputted, but trigtemplate attribute has not been set, cannot filter the trig values")
         elif trig is not None:
-            # apply the FIR filter to each trace
-            self.trigfilts = np.array([np.correlate(trace, self.trigtemplate, mode="same")/self.trignorm for trace in trig])
+            # apply the FIR filter to all of the trigger traces at once
+            blocksize, trigfft = self._getkernelfft("trig", self.trigtemplate)
+            self.trigfilts = _fftcorrelate(trig, self.trigtemplate, blocksize=blocksize, kernelfft=trigfft, 
+                                           dtype=trigfft.real.dtype)/self.trignorm
 
             # set the filtered values to zero near the edges, so as not to use the padded values in the analysis
             # also so that the traces that will be saved will be equal to the tracelength
             self.trigfilts[:, :cut_len//2] = 0.0
             self.trigfilts[:, -(cut_len//2) + (cut_len+1)%2:] = 0.0
+        else:
+            # the trigger channel was not inputted, so the filtered trigger traces of a previous call are not kept
+            self.trigfilts = None
+
+    def _getkernelfft(self, name, kernel):
+        """
+        Hidden helper method that returns the block length and the FFT of a filter used by filtertraces, 
+        which are only calculated the first time that they are needed. The FFT is calculated at the 
+        precision of the filtering.
+        
+        """
+        
+        blocksize = _fftblocksize(len(kernel), self.blocksize)
+        
+        if (name, blocksize) not in self._kernelffts:
+            dtype, _ = _get_dtypes(self.precision)
+            self._kernelffts[(name, blocksize)] = rfft(np.asarray(kernel[::-1], dtype=dtype), n=blocksize)
+        
+        return blocksize, self._kernelffts[(name, blocksize)]
 
-    def eventtrigger(self, thresh, trigthresh=None, positivepulses=True):
+    def eventtrigger(self, thresh, trigthresh=None, positivepulses=True, lgcevttraces=True):
         """
         Method to detect events in the traces with an optimum amplitude greater than the specified threshold.
         Note that this may return duplicate events, so care should be taken in post-processing to get rid of 
@@ -319,135 +518,319 @@ class OptimumFilt(object):
             Boolean flag for which direction the pulses go in the traces. If they go in the positive direction, 
             then this should be set to True. If they go in the negative direction, then this should be set to False.
             Default is True.
+        lgcevttraces : bool, optional
+            Boolean flag for whether or not to gather the traces of the events into the evttraces attribute. 
+            If False, then evttraces is set to None, and the traces of the events can instead be gathered 
+            straight into a preallocated array with _gatherevttraces. Default is True.
 
         """
 
-        # initialize lists we will save
-        pulseamps = []
-        pulsetimes = []
-        trigamps = []
-        trigtimes = []
-        traces = []
-        trigtypes = []
+        nbins = self.filts.shape[-1]
+        filts = self.filts.ravel()
+        lgctrig = self.trigfilts is not None and trigthresh is not None
+        
+        # find where the filtered traces have an optimum amplitude greater than the specified amplitude,
+        # using the flattened index over all traces
+        if positivepulses:
+            pulse_mask = filts>thresh*self.resolution
+        else:
+            pulse_mask = filts<-thresh*self.resolution
+        
+        if lgctrig:
+            # find where the ttl trigger has an optimum amplitude greater than the specified threshold
+            trigfilts = self.trigfilts.ravel()
+            trig_mask = trigfilts>trigthresh
+            evts = np.flatnonzero(pulse_mask | trig_mask)
+        else:
+            evts = np.flatnonzero(pulse_mask)
+        
+        # detected events within the specified pulse_range from each other (in the same trace) are one range
+        newrange = np.ones(len(evts), dtype=bool)
+        newrange[1:] = (np.diff(evts)>self.pulse_range) | (evts[1:]//nbins != evts[:-1]//nbins)
+        starts = np.flatnonzero(newrange)
+        ends = np.append(starts[1:], len(evts))
+        nevts = len(starts)
+        
+        if nevts == 0:
+            self.pulsetimes = np.zeros(0)
+            self.pulseamps = np.zeros(0)
+            self.trigtimes = np.zeros(0)
+            self.trigamps = np.zeros(0)
+            self.evttraces = np.zeros((0,) + self.traces.shape[1:-1] + (self.tracelength,))
+            self.trigtypes = np.zeros((0, 3), dtype=bool)
+            self.evtinds = np.zeros(0, dtype=int)
+            self._evttraceinds = np.zeros(0, dtype=int)
+            return
+        
+        rangetypes = np.zeros((nevts, 3), dtype=bool)
+        
+        if lgctrig:
+            # determine the trigger type based on if the ranges overlap with the pulse events and/or the ttl 
+            # trigger events, where the ttl trigger takes precedence and the last bin of each range is not used
+            pulsecounts = np.concatenate(([0], np.cumsum(pulse_mask[evts] & ~trig_mask[evts])))
+            trigcounts = np.concatenate(([0], np.cumsum(trig_mask[evts])))
+            rangetypes[:, 1] = pulsecounts[ends-1] > pulsecounts[starts]
+            rangetypes[:, 2] = trigcounts[ends-1] > trigcounts[starts]
+        else:
+            rangetypes[:, 1] = True
+        
+        # for each range, keep only the bin with the largest amplitude
+        if positivepulses:
+            pulse_inds = evts[_segmentargmax(filts[evts], starts, ends)]
+        else:
+            pulse_inds = evts[_segmentargmax(-filts[evts], starts, ends)]
+        
+        if lgctrig:
+            # use ttl as primary trigger
+            trig_inds = evts[_segmentargmax(trigfilts[evts], starts, ends)]
+            evt_inds = np.where(rangetypes[:, 2], trig_inds, pulse_inds)
+        else:
+            trig_inds = pulse_inds
+            evt_inds = pulse_inds
+        
+        traceinds = evt_inds//nbins
+        
+        # save trigger times and amplitudes, which are zero if the corresponding trigger did not fire
+        lgcpulse = rangetypes[:, 1] | ~rangetypes[:, 2]
+        lgcttl = rangetypes[:, 2]
+        
+        self.pulsetimes = np.where(lgcpulse, (pulse_inds%nbins)/self.fs + self.times[traceinds], 0.0)
+        self.pulseamps = np.where(lgcpulse, filts[pulse_inds], 0.0)
+        self.trigtimes = np.where(lgcttl, (trig_inds%nbins)/self.fs + self.times[traceinds], 0.0)
+        self.trigamps = np.where(lgcttl, filts[trig_inds], 0.0)
+        self.trigtypes = rangetypes
+        self.evtinds = evt_inds%nbins
+        self._evttraceinds = traceinds
+        
+        # save the traces that correspond to the detected events, including all channels, also with lengths
+        # specified by the attribute tracelength
+        if lgcevttraces:
+            self.evttraces = self._gatherevttraces()
+        else:
+            self.evttraces = None
+        
+    def _gatherevttraces(self, evts=slice(None), out=None):
+        """
+        Hidden helper method that gathers the traces of the events found by eventtrigger (all channels, with 
+        lengths specified by the attribute tracelength) in a single copy, optionally straight into out.
+        
+        Parameters
+        ----------
+        evts : slice, optional
+            The events to gather the traces of. Default is all of the events.
+        out : NoneType, ndarray, optional
+            The array to gather the traces into, of shape = (# of events, # of channels, tracelength). If 
+            left as None, then a new array is created.
+        
+        Returns
+        -------
+        evttraces : ndarray
+            The traces of the events, which is out if it was inputted.
+        
+        """
+        
+        traceinds = self._evttraceinds[evts]
+        starts = self.evtinds[evts] - self.tracelength//2
+        
+        if self.traces.ndim != 3 or not self.traces.flags.c_contiguous:
+            windows = np.lib.stride_tricks.sliding_window_view(self.traces, self.tracelength, axis=-1)
+            if out is None:
+                return windows[traceinds, ..., starts, :]
+            out[...] = windows[traceinds, ..., starts, :]
+            return out
+        
+        # a view of the traces where the first axis is the flattened start bin of the window of every 
+        # channel, such that the windows of the events are gathered by one np.take along the first axis
+        ntraces, nchan, nbins = self.traces.shape
+        flat = self.traces.reshape(-1)
+        step = flat.strides[0]
+        windows = np.lib.stride_tricks.as_strided(flat, shape=(flat.size - (nchan - 1)*nbins - self.tracelength + 1, 
+                                                              nchan, self.tracelength), 
+                                                  strides=(step, nbins*step, step), writeable=False)
+        
+        # the indices are always in range, and the "clip" mode does not buffer out
+        return np.take(windows, traceinds*nchan*nbins + starts, axis=0, out=out, mode="clip")
+        
+    def streamtrigger(self, traces, time, thresh, trig=None, trigthresh=None, positivepulses=True):
+        """
+        Method to run the trigger on the next block of a contiguous stream of data. The end of each block 
+        is kept as an overlap buffer and prepended to the next block, such that the filtering is seamless 
+        across the boundaries between blocks and only the bins at the start and end of the whole stream 
+        are lost. Events are emitted as soon as they cannot be changed by data that has not been seen yet,
+        and are stored in the same attributes as for eventtrigger. If the block does not start where the 
+        previous block ended, or if the trigger channel is only inputted for one of the two blocks, then the 
+        previous stream is finished (see flushstream) and a new one is started.
 
-        # go through each filtered trace and get the events
-        for ii, filt in enumerate(self.filts):
-            
-            if self.trigfilts is None or trigthresh is None:
+        Parameters
+        ----------
+        traces : ndarray
+            The next block of the stream, of shape = (# of channels, # of bins). Should be in units of Amps.
+        time : float
+            The absolute start time of the block (in s).
+        thresh : float
+            The number of standard deviations of the energy resolution to use as the threshold for which events
+            will be detected as a pulse.
+        trig : NoneType, ndarray, optional
+            The next block of the trigger channel, of shape = (# of bins,). If left as None, then only the 
+            traces are analyzed.
+        trigthresh : NoneType, float, optional
+            The threshold value (in units of the trigger channel) such that any amplitudes higher than this will be 
+            detected as ttl trigger event. If left as None, then only the pulses are analyzed.
+        positivepulses : boolean, optional
+            Boolean flag for which direction the pulses go in the traces. If they go in the positive direction, 
+            then this should be set to True. If they go in the negative direction, then this should be set to False.
+            Default is True.
 
-                # find where the filtered trace has an optimum amplitude greater than the specified amplitude
-                if positivepulses:
-                    evts_mask = filt>thresh*self.resolution
-                else:
-                    evts_mask = filt<-thresh*self.resolution
+        """
+        
+        results = []
+        
+        if self._streamtraces is not None:
+            streamend = self._streamtime + self._streamtraces.shape[-1]/self.fs
+            lgcgap = abs(time - streamend) > 0.5/self.fs
+            # the trigger channel must be in every block of the stream, or in none of them
+            lgcnewtrig = (trig is None) != (self._streamtrig is None)
+            if lgcgap or lgcnewtrig:
+                results.append(self._processstream(thresh, trigthresh, positivepulses, lgcfinal=True))
+        
+        if self._streamtraces is None:
+            self._streamtraces = traces
+            self._streamtrig = trig
+            self._streamtime = time
+        else:
+            self._streamtraces = np.concatenate((self._streamtraces, traces), axis=-1)
+            if trig is not None:
+                self._streamtrig = np.concatenate((self._streamtrig, trig), axis=-1)
+        
+        results.append(self._processstream(thresh, trigthresh, positivepulses, lgcfinal=False))
+        
+        self._setstreamevents(results)
+        
+    def flushstream(self, thresh, trigthresh=None, positivepulses=True):
+        """
+        Method to finish the stream that was run through streamtrigger, which emits the events that are 
+        left in the overlap buffer and resets the state of the stream. The events are stored in the same 
+        attributes as for eventtrigger.
 
-                evts = np.where(evts_mask)[0]
+        Parameters
+        ----------
+        thresh : float
+            The number of standard deviations of the energy resolution to use as the threshold for which events
+            will be detected as a pulse.
+        trigthresh : NoneType, float, optional
+            The threshold value (in units of the trigger channel) such that any amplitudes higher than this will be 
+            detected as ttl trigger event. If left as None, then only the pulses are analyzed.
+        positivepulses : boolean, optional
+            Boolean flag for which direction the pulses go in the traces. If they go in the positive direction, 
+            then this should be set to True. If they go in the negative direction, then this should be set to False.
+            Default is True.
 
-                # check if any left over detected events are within the specified pulse_range from each other
+        """
+        
+        results = []
+        
+        if self._streamtraces is not None:
+            results.append(self._processstream(thresh, trigthresh, positivepulses, lgcfinal=True))
+        
+        self._setstreamevents(results)
+        
+    def _processstream(self, thresh, trigthresh, positivepulses, lgcfinal):
+        """
+        Hidden helper method that triggers on the data in the overlap buffer of the stream, returns the 
+        events that are final, and keeps only the data that is needed to find the rest of the events.
+        
+        """
+        
+        nbins = self._streamtraces.shape[-1]
+        trig = None if self._streamtrig is None else self._streamtrig[np.newaxis]
+        
+        self.filtertraces(self._streamtraces[np.newaxis], np.array([self._streamtime]), trig=trig)
+        self.eventtrigger(thresh, trigthresh=trigthresh, positivepulses=positivepulses)
+        
+        # the bins at the edges of the buffer that are zeroed by filtertraces
+        cut_len = np.max([len(self.phi), self.tracelength])
+        headlen = cut_len//2
+        validend = nbins - (cut_len//2 - (cut_len+1)%2)
+        
+        if lgcfinal:
+            commit = nbins
+        else:
+            if positivepulses:
+                evts_mask = self.filts[0]>thresh*self.resolution
+            else:
+                evts_mask = self.filts[0]<-thresh*self.resolution
+            if self.trigfilts is not None and trigthresh is not None:
+                evts_mask |= self.trigfilts[0]>trigthresh
+            
+            evts = np.where(evts_mask)[0]
+            
+            # the last range of events is still open if the next unseen bin could be added to it
+            if len(evts) > 0 and evts[-1] >= validend - self.pulse_range:
                 ranges = _getchangeslessthanthresh(evts, self.pulse_range)[0]
-
-                # set the trigger type to pulses
-                rangetypes = np.zeros((len(ranges), 3), dtype=bool)
-                rangetypes[:,1] = True
-
-            elif trigthresh is not None:
-                # find where the filtered trace has an optimum amplitude greater than the specified threshold
-                if positivepulses:
-                    pulseevts_mask = filt>thresh*self.resolution
-                else:
-                    pulseevts_mask = filt<-thresh*self.resolution
-
-                pulseevts = np.where(pulseevts_mask)[0]
-
-                # check if any left over detected events are within the specified pulse_range from each other
-                pulseranges, pulsevals = _getchangeslessthanthresh(pulseevts, self.pulse_range)
-
-                # make a boolean mask of the ranges of the events in the trace from the pulse triggering
-                pulse_mask = np.zeros(filt.shape, dtype=bool)
-                for evt_range in pulseranges:
-                    if evt_range[1]>evt_range[0]:
-                        evt_inds = pulseevts[evt_range[0]:evt_range[1]]
-                        pulse_mask[evt_inds] = True
-
-                # find where the ttl trigger has an optimum amplitude greater than the specified threshold
-                trigevts_mask = self.trigfilts[ii]>trigthresh
-
-                # get the mask of the total events, taking the or of the pulse and ttl trigger events
-                tot_mask = np.logical_or(trigevts_mask, pulse_mask)
-                evts = np.where(tot_mask)[0]
-                ranges, totvals = _getchangeslessthanthresh(evts, self.pulse_range)
-
-                tot_types = np.zeros(len(tot_mask), dtype=int)
-                tot_types[pulse_mask] = 1
-                tot_types[trigevts_mask] = 2
-
-                # given the ranges, determine the trigger type based on if the total ranges overlap with
-                # the pulse events and/or the ttl trigger events
-                rangetypes = np.zeros((len(ranges), 3), dtype=bool)
-                for ival, vals in enumerate(totvals):
-                    if np.any(tot_types[vals[0]:vals[1]]==1):
-                        rangetypes[ival, 1] = True
-                    if np.any(tot_types[vals[0]:vals[1]]==2):
-                        rangetypes[ival, 2] = True
-
-            # for each range with changes less than the pulse_range, keep only the bin with the largest amplitude
-            for irange, evt_range in enumerate(ranges):
-                if evt_range[1]>evt_range[0]:
-
-                    evt_inds = evts[evt_range[0]:evt_range[1]]
-
-                    if rangetypes[irange][2]:
-                        # use ttl as primary trigger
-                        evt_ind = evt_inds[np.argmax(self.trigfilts[ii][evt_inds])]
-                    else:
-                        # only pulse was triggered
-                        if positivepulses:
-                            evt_ind = evt_inds[np.argmax(filt[evt_inds])]
-                        else:
-                            evt_ind = evt_inds[np.argmin(filt[evt_inds])]
-
-                    if rangetypes[irange][1] and rangetypes[irange][2]:
-                        # both are triggered
-                        if positivepulses:
-                            pulse_ind = evt_inds[np.argmax(filt[evt_inds])]
-                        else:
-                            pulse_ind = evt_inds[np.argmin(filt[evt_inds])]
-                        # save trigger times and amplitudes
-                        pulsetimes.extend([pulse_ind/self.fs + self.times[ii]])
-                        pulseamps.extend([filt[pulse_ind]])
-                        trigtimes.extend([evt_ind/self.fs + self.times[ii]])
-                        trigamps.extend([filt[evt_ind]])
-                    elif rangetypes[irange][2]:
-                        # only ttl was triggered, save trigger time and amplitudes
-                        pulsetimes.extend([0.0])
-                        pulseamps.extend([0.0])
-                        trigtimes.extend([evt_ind/self.fs + self.times[ii]])
-                        trigamps.extend([filt[evt_ind]])
-                    else:
-                        # only pulse was triggered, save trigger time and amplitudes
-                        pulsetimes.extend([evt_ind/self.fs + self.times[ii]])
-                        pulseamps.extend([filt[evt_ind]])
-                        trigtimes.extend([0.0])
-                        trigamps.extend([0.0])
-
-                    trigtypes.extend([rangetypes[irange]])
-
-                    # save the traces that correspond to the detected event, including all channels, also with lengths
-                    # specified by the attribute tracelength
-                    traces.extend([self.traces[ii, ..., 
-                                              evt_ind - self.tracelength//2:evt_ind + self.tracelength//2 \
-                                              + (self.tracelength)%2]])
-
-        self.pulsetimes = pulsetimes
-        self.pulseamps = pulseamps
-        self.trigtimes = trigtimes
-        self.trigamps = trigamps
-        self.evttraces = traces
-        self.trigtypes = trigtypes
+                commit = evts[ranges[-1][0]]
+            else:
+                commit = validend
+        
+        keep = self.evtinds < commit
+        
+        events = (self.pulsetimes[keep], 
+                  self.pulseamps[keep], 
+                  self.trigtimes[keep], 
+                  self.trigamps[keep], 
+                  self.evttraces[keep], 
+                  self.trigtypes[keep], 
+                  self.evtinds[keep])
+        
+        if lgcfinal:
+            self._resetstream()
+        else:
+            # keep enough history that the next buffer is valid starting from the commit bin
+            tailstart = max(commit - headlen, 0)
+            self._streamtraces = self._streamtraces[..., tailstart:]
+            if self._streamtrig is not None:
+                self._streamtrig = self._streamtrig[..., tailstart:]
+            self._streamtime += tailstart/self.fs
+        
+        return events
+    
+    def _resetstream(self):
+        """
+        Hidden helper method that discards the state of the streaming trigger, such that the next call 
+        of streamtrigger starts a new stream.
+        
+        """
+        
+        self._streamtraces = None
+        self._streamtrig = None
+        self._streamtime = None
+    
+    def _setstreamevents(self, results):
+        """
+        Hidden helper method that stores the events emitted by the stream in the event attributes.
+        
+        """
+        
+        if len(results) == 0:
+            self.pulsetimes = np.zeros(0)
+            self.pulseamps = np.zeros(0)
+            self.trigtimes = np.zeros(0)
+            self.trigamps = np.zeros(0)
+            self.evttraces = np.zeros((0, 0, self.tracelength))
+            self.trigtypes = np.zeros((0, 3), dtype=bool)
+            self.evtinds = np.zeros(0, dtype=int)
+            return
+        
+        self.pulsetimes = np.concatenate([res[0] for res in results])
+        self.pulseamps = np.concatenate([res[1] for res in results])
+        self.trigtimes = np.concatenate([res[2] for res in results])
+        self.trigamps = np.concatenate([res[3] for res in results])
+        self.evttraces = np.concatenate([res[4] for res in results])
+        self.trigtypes = np.concatenate([res[5] for res in results])
+        self.evtinds = np.concatenate([res[6] for res in results])
         
 
 def acquire_randoms(filelist, n, l, datashape=None, iotype="stanford", savepath=None, 
-                    savename=None, dumpnum=1, maxevts=1000):
+                    savename=None, dumpnum=1, maxevts=1000, saveformat="npz"):
     """
     Function for acquiring random traces from a list of files and saving the results
     to a .npz file for later processing.
@@ -480,7 +863,10 @@ def acquire_randoms(filelist, n, l, datashape=None, iotype="stanford", savepath=
     maxevts : int, optional
         The maximum number of events that should be stored in each dump when saving. Default
         is 1000.
-                
+    saveformat : str, optional
+        The format to save each dump in. If "npz", then each dump is saved to a single .npz file. 
+        If "npy", then each dump is saved to a folder with one uncompressed .npy file per array, 
+        which can be memory-mapped when reading (e.g. with rqpy.io.get_traces_npy). Default is "npz".
         
     """
     
@@ -500,94 +886,87 @@ def acquire_randoms(filelist, n, l, datashape=None, iotype="stanford", savepath=
     if datashape is None:
         # get the shape of data from the first dataset, we assume the shape is the same for all files
         if iotype=="stanford":
-            traces = loadstanfordfile(filelist[0])[0]
+            traces = loadstanfordfile(filelist[0], lgcttl=False)[0]
             datashape = (traces.shape[0], traces.shape[-1])
         else:
             raise ValueError("Unrecognized iotype inputted.")
     
     nmax = int(datashape[-1]/l)
-    choicelist = list(range(len(filelist))) * nmax * datashape[0]
-    np.random.shuffle(choicelist)
-    rows = np.array(choicelist[:n])
-    counts = Counter(rows)
-
-    evttimes_list = []
-    res_list = []
     
-    evt_counter = 0
-
-    for key in counts.keys():
-
+    # draw the number of sections from each file, which are the counts of drawing n of the 
+    # nmax*datashape[0] slots in each file without replacement (a multivariate hypergeometric)
+    counts = _filecounts(n, len(filelist), nmax * datashape[0])
+    
+    dumps = None
+    
+    # the sections are taken one file at a time and written straight into the dump buffers
+    for ifile in np.flatnonzero(counts):
+        
         if iotype=="stanford":
-            traces, t, fs, _ = loadstanfordfile(filelist[key])
+            traces, t, fs, _ = loadstanfordfile(filelist[ifile], lgcttl=False)
         else:
             raise ValueError("Unrecognized iotype inputted.")
             
-        et, r = rand_sections(traces, counts[key], l, t=t, fs=fs)
-        
-        evt_counter += len(et)
-
-        evttimes_list.append(et)
-        res_list.append(r)
-
-        if evt_counter >= maxevts:
-            
-            evttimes = np.concatenate(evttimes_list)
-            res = np.vstack(res_list)
-            del evttimes_list
-            del res_list
-            trigtypes = np.zeros((len(evttimes), 3), dtype=bool)
-            trigtypes[:,0] = True
-            
-            for ii in range(len(evttimes)//maxevts):
-                
-                _saveevents(randomstimes=evttimes[:maxevts], 
-                            traces=res[:maxevts], 
-                            trigtypes=trigtypes[:maxevts], 
-                            savepath=savepath, savename=savename, dumpnum=dumpnum)
-                dumpnum+=1
-                
-                evttimes = evttimes[maxevts:]
-                res = res[maxevts:]
-                trigtypes = trigtypes[maxevts:]
-            
-            if len(evttimes)/maxevts>1:
-                evttimes_list = [evttimes]
-                res_list = [res]
-                evt_counter = len(evttimes)
-            else:
-                evttimes_list = []
-                res_list = []
-                evt_counter = 0
-            
-    # clean up the remaining events
-    if evt_counter > 0:
+        et, r = rand_sections(traces, counts[ifile], l, t=t, fs=fs)
         
-        evttimes = np.concatenate(evttimes_list)
-        res = np.vstack(res_list)
+        if dumps is None:
+            dumps = _DumpBuffer({"randomstimes" : ((), float), 
+                                 "traces" : (r.shape[1:], float), 
+                                 "trigtypes" : ((3,), bool)}, 
+                                maxevts, savepath, savename, dumpnum, saveformat)
         
-        del evttimes_list
-        del res_list
-        
-        trigtypes = np.zeros((len(evttimes), 3), dtype=bool)
+        trigtypes = np.zeros((len(et), 3), dtype=bool)
         trigtypes[:,0] = True
-
-        for ii in range(np.ceil(len(evttimes)/maxevts).astype(int)):
-            
-            _saveevents(randomstimes=evttimes[:maxevts], 
-                        traces=res[:maxevts], 
-                        trigtypes=trigtypes[:maxevts], 
-                        savepath=savepath, savename=savename, dumpnum=dumpnum)
-            dumpnum+=1
+        
+        dumps.add(randomstimes=et, traces=r, trigtypes=trigtypes)
             
-            if ii+1!=np.ceil(len(evttimes)/maxevts).astype(int):
-                evttimes = evttimes[maxevts:]
-                res = res[maxevts:]
-                trigtypes = trigtypes[maxevts:]
+    # clean up the remaining events
+    if dumps is not None:
+        dumps.flush()
+
+def _filecounts(n, nfiles, nslots):
+    """
+    Helper function for drawing how many of n random sections are taken from each file, where each
+    file has the same number of slots for sections and the slots are drawn without replacement. The
+    counts are drawn one file at a time from a hypergeometric distribution, such that the memory used
+    does not depend on the total number of slots.
+    
+    Parameters
+    ----------
+    n : int
+        The total number of sections to draw.
+    nfiles : int
+        The number of files.
+    nslots : int
+        The number of slots for sections in each file.
+        
+    Returns
+    -------
+    counts : ndarray
+        The number of sections to take from each file.
+    
+    """
+    
+    if nfiles*nslots < n:
+        raise ValueError("Either n or l is too large, trying to find more random sections than are possible.")
+    
+    counts = np.zeros(nfiles, dtype=int)
+    nleft = n
+    
+    for ii in range(nfiles - 1):
+        if nleft == 0:
+            break
+        counts[ii] = np.random.hypergeometric(nslots, nslots*(nfiles - ii - 1), nleft)
+        nleft -= counts[ii]
+    
+    counts[-1] += nleft
+    
+    return counts
     
 def acquire_pulses(filelist, template, noisepsd, tracelength, thresh, nchan=2, trigtemplate=None, 
                    trigthresh=None, positivepulses=True, iotype="stanford", savepath=None, 
-                   savename=None, dumpnum=1, maxevts=1000):
+                   savename=None, dumpnum=1, maxevts=1000, saveformat="npz", lgcstream=False, nprocess=1, 
+                   precision="float64"):
     """
     Function for running the continuous trigger on many different files and saving the events 
     to .npz files for later processing.
@@ -629,11 +1008,33 @@ def acquire_pulses(filelist, template, noisepsd, tracelength, thresh, nchan=2, t
         The dump number that the file should start saving from and the event number should be 
         determined by when saving. Default is 1.
     maxevts : int, optional
-        The maximum number of events that should be stored in each dump when saving. Default
-        is 1000.
+        The maximum number of events that should be stored in each dump when saving. The last
+        dump only contains the remaining events (it is not padded up to maxevts). Default is 1000.
+    saveformat : str, optional
+        The format to save each dump in. If "npz", then each dump is saved to a single .npz file. 
+        If "npy", then each dump is saved to a folder with one uncompressed .npy file per array, 
+        which can be memory-mapped when reading (e.g. with rqpy.io.get_traces_npy). Default is "npz".
+    lgcstream : bool, optional
+        Boolean flag for whether or not to treat the traces in the files (in the order of filelist) as one
+        contiguous stream of data, see OptimumFilt.streamtrigger. If True, then pulses at the boundaries
+        between traces are not lost, and only the start and end of the stream (or of each contiguous 
+        section, if there are gaps in the data) are not triggered on. If False, then each trace is 
+        triggered on independently. Default is False.
+    nprocess : int, optional
+        The number of processes to use when triggering on the files. If larger than 1, then the files
+        are triggered on concurrently and the events are written to the dumps by this process in the
+        order of filelist, such that the dumps (and thus the event numbers) are the same as when
+        using one process. Cannot be used with lgcstream, as a stream is triggered on in order.
+        Default is 1.
+    precision : str, optional
+        The precision that the traces are filtered in, either "float64" or "float32". See OptimumFilt.
+        Default is "float64".
             
     """
     
+    if lgcstream and nprocess > 1:
+        raise ValueError("lgcstream cannot be used with nprocess > 1, as the stream must be triggered on in order")
+    
     if savepath is None or not savepath:
         savepath = "./"
 
@@ -647,99 +1048,243 @@ def acquire_pulses(filelist, template, noisepsd, tracelength, thresh, nchan=2, t
     if isinstance(filelist, str):
         filelist=[filelist]
     
-    pulsetimes = np.zeros(maxevts)
-    pulseamps = np.zeros(maxevts)
-    trigtimes = np.zeros(maxevts)
-    trigamps = np.zeros(maxevts)
-    evttraces = np.zeros((maxevts, nchan, tracelength))
-    trigtypes = np.zeros((maxevts, 3), dtype=bool)
+    # the events are written straight into the dump buffers, which are saved each time they are full
+    dumps = _DumpBuffer({"pulsetimes" : ((), float), 
+                         "pulseamps" : ((), float), 
+                         "trigtimes" : ((), float), 
+                         "trigamps" : ((), float), 
+                         "traces" : ((nchan, tracelength), float), 
+                         "trigtypes" : ((3,), bool)}, 
+                        maxevts, savepath, savename, dumpnum, saveformat)
     
-    evt_counter = 0
+    pool = None
+    
+    try:
+        if nprocess == 1:
+            # the traces of the events are gathered straight into the dump buffers
+            filts = _triggerfiles(filelist, template, noisepsd, tracelength, thresh, trigtemplate=trigtemplate, 
+                                  trigthresh=trigthresh, positivepulses=positivepulses, iotype=iotype, 
+                                  lgcstream=lgcstream, precision=precision, lgcevttraces=False)
+        else:
+            # the files are triggered on concurrently, but the results are returned in the order of filelist,
+            # where the traces of the events are gathered by the workers and then copied into the dump buffers
+            workerargs = (template, noisepsd, tracelength, thresh, trigtemplate, trigthresh, positivepulses, 
+                          iotype, precision)
+            pool = multiprocessing.Pool(processes=nprocess, initializer=_init_trigger_worker, initargs=workerargs)
+            filts = pool.imap(_trigger_worker, filelist)
+        
+        for filt in filts:
+            dumps.add(pulsetimes=filt.pulsetimes, 
+                      pulseamps=filt.pulseamps, 
+                      trigtimes=filt.trigtimes, 
+                      trigamps=filt.trigamps, 
+                      traces=filt._gatherevttraces if filt.evttraces is None else filt.evttraces, 
+                      trigtypes=filt.trigtypes)
+        
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        # the workers are stopped if the triggering was interrupted by an error
+        if pool is not None:
+            pool.terminate()
+    
+    # clean up the rest of the events
+    dumps.flush()
+    
+
+def _triggerfiles(filelist, template, noisepsd, tracelength, thresh, trigtemplate=None, 
+                  trigthresh=None, positivepulses=True, iotype="stanford", lgcstream=False, precision="float64", 
+                  filt=None, lgcevttraces=True):
+    """
+    Hidden helper generator that runs the continuous trigger on each file, and yields the OptimumFilt 
+    object with the newly detected events stored in its attributes. One OptimumFilt object is used for
+    all of the files, which is only rebuilt if the sample rate changes. See acquire_pulses for the 
+    parameters, filt is an OptimumFilt object to start from (e.g. from a previous call), whose stream 
+    state is discarded, and lgcevttraces is passed to OptimumFilt.eventtrigger when not streaming.
+    
+    """
+    
+    if filt is not None:
+        filt._resetstream()
     
     for f in filelist:
         
         if iotype=="stanford":
-            traces, times, fs, trig = loadstanfordfile(f)
-            if trigtemplate is None:
-                trig = None
+            traces, times, fs, trig = loadstanfordfile(f, lgcttl=trigtemplate is not None)
         else:
             raise ValueError("Unrecognized iotype inputted.")
-            
-        filt = OptimumFilt(fs, template, noisepsd, tracelength, trigtemplate=trigtemplate)
-        filt.filtertraces(traces, times, trig=trig)
-        filt.eventtrigger(thresh, trigthresh=trigthresh, positivepulses=positivepulses)
         
-        numevts = len(filt.pulsetimes)
+        if filt is not None and filt.fs != fs and lgcstream:
+            # the stream cannot continue at a different sample rate, so the events left in it are emitted
+            filt.flushstream(thresh, trigthresh=trigthresh, positivepulses=positivepulses)
+            yield filt
+        
+        if filt is None or filt.fs != fs:
+            filt = OptimumFilt(fs, template, noisepsd, tracelength, trigtemplate=trigtemplate, precision=precision)
+        elif not lgcstream:
+            # nothing of the previous file is carried over when the files are triggered on independently
+            filt._resetstream()
+        
+        if lgcstream:
+            for ii in range(len(traces)):
+                filt.streamtrigger(traces[ii], times[ii], thresh, trig=None if trig is None else trig[ii], 
+                                   trigthresh=trigthresh, positivepulses=positivepulses)
+                yield filt
+        else:
+            filt.filtertraces(traces, times, trig=trig)
+            filt.eventtrigger(thresh, trigthresh=trigthresh, positivepulses=positivepulses, 
+                              lgcevttraces=lgcevttraces)
+            yield filt
+    
+    if lgcstream and filt is not None:
+        filt.flushstream(thresh, trigthresh=trigthresh, positivepulses=positivepulses)
+        yield filt
+        
+_trigger_worker_args = {}
+
+def _init_trigger_worker(template, noisepsd, tracelength, thresh, trigtemplate, trigthresh, positivepulses, iotype, 
+                         precision):
+    """
+    Helper function for initializing a process that runs the continuous trigger. The arguments that 
+    are the same for every file are stored once per process, rather than being sent with every file. 
+    See acquire_pulses for the parameters.
+    
+    """
+    
+    _trigger_worker_args.clear()
+    _trigger_worker_args["args"] = dict(template=template, noisepsd=noisepsd, tracelength=tracelength, 
+                                        thresh=thresh, trigtemplate=trigtemplate, trigthresh=trigthresh, 
+                                        positivepulses=positivepulses, iotype=iotype, precision=precision)
+
+def _trigger_worker(file):
+    """
+    Helper function for running the continuous trigger on a single file in a process that has been
+    initialized with _init_trigger_worker.
+    
+    Parameters
+    ----------
+    file : str
+        Path to the file that should be opened and triggered on.
+        
+    Returns
+    -------
+    events : OptimumFilt
+        A copy of the OptimumFilt object with the detected events stored in its attributes. The traces, 
+        filtered traces, and cached filters are removed, such that only the events are sent back.
+    
+    """
+    
+    # the OptimumFilt object is kept by the process and reused for the next file
+    filt = next(_triggerfiles([file], filt=_trigger_worker_args.get("filt"), **_trigger_worker_args["args"]))
+    _trigger_worker_args["filt"] = filt
+    
+    # only the events are sent back, not the traces or the filters
+    events = copy.copy(filt)
+    events.traces = None
+    events.filts = None
+    events.trig = None
+    events.trigfilts = None
+    events._kernelffts = {}
+    
+    return events
+
+class _DumpBuffer(object):
+    """
+    Hidden helper class that collects events into preallocated buffers with the size of one dump, 
+    and saves the dump with _saveevents each time that the buffers are full. The same buffers are 
+    reused for every dump, where only the write position is reset after each dump, and the leftover 
+    events of a batch go straight to the start of the next dump.
+    
+    Attributes
+    ----------
+    buffers : dict
+        The preallocated buffer of each saved array, keyed by the name used by _saveevents.
+    maxevts : int
+        The number of events in each dump.
+    nevts : int
+        The number of events currently in the buffers.
+    dumpnum : int
+        The dump number of the next dump that will be saved.
+    
+    """
+    
+    def __init__(self, fields, maxevts, savepath, savename, dumpnum, saveformat):
+        """
+        Initialization of the _DumpBuffer class.
+        
+        Parameters
+        ----------
+        fields : dict
+            The shape (of a single event) and dtype of each saved array, keyed by the name used
+            by _saveevents.
+        maxevts : int
+            The number of events in each dump.
+        savepath : str
+            Path to save the dumps to.
+        savename : str
+            Filename to save the dumps as.
+        dumpnum : int
+            The dump number of the first dump.
+        saveformat : str
+            The format to save each dump in, see _saveevents.
+        
+        """
+        
+        self.buffers = {key : np.empty((maxevts,) + shape, dtype=dtype) for key, (shape, dtype) in fields.items()}
+        self.maxevts = maxevts
+        self.nevts = 0
+        self.dumpnum = dumpnum
+        
+        self._savepath = savepath
+        self._savename = savename
+        self._saveformat = saveformat
         
-        evt_counter += numevts
+    def add(self, **events):
+        """
+        Method for adding a batch of events to the buffers, where each keyword argument is the array 
+        of the corresponding field for every event in the batch. A field can instead be a function with 
+        the signature of OptimumFilt._gatherevttraces, which is called to write the events in a slice of 
+        the batch straight into the buffer, such that they are not first copied into an array of the whole 
+        batch. A dump is saved each time that the buffers are full.
+        
+        """
         
-        if evt_counter < maxevts:
-            pulsetimes[evt_counter-numevts:evt_counter] = filt.pulsetimes
-            pulseamps[evt_counter-numevts:evt_counter] = filt.pulseamps
-            trigtimes[evt_counter-numevts:evt_counter] = filt.trigtimes
-            trigamps[evt_counter-numevts:evt_counter] = filt.trigamps
-            evttraces[evt_counter-numevts:evt_counter] = filt.evttraces
-            trigtypes[evt_counter-numevts:evt_counter] = filt.trigtypes
+        nadd = len(next(val for val in events.values() if not callable(val)))
+        start = 0
         
-        elif evt_counter >= maxevts:
+        while start < nadd:
+            ncopy = min(self.maxevts - self.nevts, nadd - start)
             
-            numextra = evt_counter - maxevts
-            numtoadd = maxevts - (evt_counter - numevts)
+            for key, buf in self.buffers.items():
+                if callable(events[key]):
+                    events[key](slice(start, start + ncopy), out=buf[self.nevts:self.nevts + ncopy])
+                else:
+                    buf[self.nevts:self.nevts + ncopy] = events[key][start:start + ncopy]
             
-            pulsetimes[evt_counter-numevts:] = filt.pulsetimes[:numtoadd]
-            pulseamps[evt_counter-numevts:] = filt.pulseamps[:numtoadd]
-            trigtimes[evt_counter-numevts:] = filt.trigtimes[:numtoadd]
-            trigamps[evt_counter-numevts:] = filt.trigamps[:numtoadd]
-            evttraces[evt_counter-numevts:] = filt.evttraces[:numtoadd]
-            trigtypes[evt_counter-numevts:] = filt.trigtypes[:numtoadd]
+            self.nevts += ncopy
+            start += ncopy
             
-            for ii in range(numextra//maxevts + 1):
-                
-                _saveevents(pulsetimes=pulsetimes, 
-                            pulseamps=pulseamps, 
-                            trigtimes=trigtimes, 
-                            trigamps=trigamps, 
-                            traces=evttraces, 
-                            trigtypes=trigtypes, 
-                            savepath=savepath, savename=savename, dumpnum=dumpnum)
-                dumpnum+=1
+            if self.nevts == self.maxevts:
+                self.flush()
                 
-                pulsetimes.fill(0)
-                pulseamps.fill(0)
-                trigtimes.fill(0)
-                trigamps.fill(0)
-                evttraces.fill(0)
-                trigtypes.fill(0)
-                
-                numleft = numevts - (numtoadd + ii*maxevts)
-                
-                if numleft > maxevts:
-                    numleft = maxevts
-                
-                if numleft > 0:
-                    pulsetimes[:numleft] = filt.pulsetimes[numtoadd + ii*maxevts:numtoadd + ii*maxevts + numleft]
-                    pulseamps[:numleft] = filt.pulseamps[numtoadd + ii*maxevts:numtoadd + ii*maxevts + numleft]
-                    trigtimes[:numleft] = filt.trigtimes[numtoadd + ii*maxevts:numtoadd + ii*maxevts + numleft]
-                    trigamps[:numleft] = filt.trigamps[numtoadd + ii*maxevts:numtoadd + ii*maxevts + numleft]
-                    evttraces[:numleft] = filt.evttraces[numtoadd + ii*maxevts:numtoadd + ii*maxevts + numleft]
-                    trigtypes[:numleft] = filt.trigtypes[numtoadd + ii*maxevts:numtoadd + ii*maxevts + numleft]
-                
-            evt_counter = np.sum((pulsetimes!=0) | (trigtimes!=0))
-    
-    # clean up the rest of the events
-    if evt_counter > 0:
-        _saveevents(pulsetimes=pulsetimes, 
-                    pulseamps=pulseamps, 
-                    trigtimes=trigtimes, 
-                    trigamps=trigamps, 
-                    traces=evttraces, 
-                    trigtypes=trigtypes, 
-                    savepath=savepath, savename=savename, dumpnum=dumpnum)
+    def flush(self):
+        """
+        Method for saving the events in the buffers as a dump (if there are any), after which the 
+        buffers are reused for the next dump.
         
-    
+        """
+        
+        if self.nevts > 0:
+            _saveevents(savepath=self._savepath, savename=self._savename, dumpnum=self.dumpnum, 
+                        saveformat=self._saveformat, 
+                        **{key : buf[:self.nevts] for key, buf in self.buffers.items()})
+            self.dumpnum += 1
+            self.nevts = 0
+
 def _saveevents(pulsetimes=None, pulseamps=None, trigtimes=None,
                trigamps=None, randomstimes=None, traces=None, trigtypes=None, 
-               savepath=None, savename=None, dumpnum=None):
+               savepath=None, savename=None, dumpnum=None, saveformat="npz"):
     """
     Hidden helper function for simple saving of events to .npz file.
     
@@ -766,6 +1311,10 @@ def _saveevents(pulsetimes=None, pulseamps=None, trigtimes=None,
         Filename to save the events as.
     dumpnum : int, optional
         The dump number of the current file.
+    saveformat : str, optional
+        The format to save the events in. If "npz", then the events are saved to a single .npz
+        file. If "npy", then the events are saved to a folder with one uncompressed .npy file per 
+        array and an index.json file, which can be memory-mapped when reading. Default is "npz".
         
     """
     
@@ -778,7 +1327,24 @@ def _saveevents(pulsetimes=None, pulseamps=None, trigtimes=None,
         trigtimes = np.zeros_like(randomstimes)
         trigamps = np.zeros_like(randomstimes)
     
-    filename = f"{savepath}{savename}_{dumpnum}.npz"
-    np.savez(filename, pulsetimes=pulsetimes, pulseamps=pulseamps, 
-             trigtimes=trigtimes, trigamps=trigamps, randomstimes=randomstimes, 
-             traces=traces, trigtypes=trigtypes)
+    if saveformat == "npz":
+        filename = f"{savepath}{savename}_{dumpnum}.npz"
+        np.savez(filename, pulsetimes=pulsetimes, pulseamps=pulseamps, 
+                 trigtimes=trigtimes, trigamps=trigamps, randomstimes=randomstimes, 
+                 traces=traces, trigtypes=trigtypes)
+    elif saveformat == "npy":
+        folder = f"{savepath}{savename}_{dumpnum}"
+        os.makedirs(folder, exist_ok=True)
+        
+        arrays = dict(pulsetimes=pulsetimes, pulseamps=pulseamps, trigtimes=trigtimes, trigamps=trigamps, 
+                      randomstimes=randomstimes, traces=traces, trigtypes=trigtypes)
+        for key, arr in arrays.items():
+            np.save(os.path.join(folder, f"{key}.npy"), arr)
+        
+        # the index is written last, so that its existence marks a complete dump
+        index = {"seriesnumber": f"{savename}_{dumpnum}", "dumpnum": int(dumpnum), "nevents": len(traces), 
+                 "arrays": list(arrays.keys())}
+        with open(os.path.join(folder, "index.json"), "w") as f:
+            json.dump(index, f)
+    else:
+        raise ValueError("saveformat should be set to 'npz' or 'npy'")
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from scipy.io import savemat
+
+import rqpy as rp
+from rqpy.io import _io
+from rqpy.process import _process_rq
+from rqpy.process._trigger import _saveevents
+
+
+@pytest.fixture
+def save_dumps():
+    """
+    Fixture that returns a function for saving dumps of random events with _saveevents, in the
+    format written by acquire_pulses and acquire_randoms.
+
+    """
+
+    def _save_dumps(path, saveformat="npz", nevts=(7, 12, 5), nbins=64, template=0, savename="09180101_0101"):
+        """
+        Saves one dump of random traces (plus the template) per value of nevts, and returns the
+        path to each dump and the saved traces of each dump.
+
+        """
+
+        rng = np.random.default_rng(len(nevts))
+        files = []
+        traces = []
+
+        for dumpnum, n in enumerate(nevts, start=1):
+            traces.append(rng.normal(size=(n, 2, nbins)) + template)
+            _saveevents(pulsetimes=rng.uniform(size=n), pulseamps=rng.uniform(size=n), trigtimes=np.zeros(n),
+                        trigamps=np.zeros(n), traces=traces[-1], trigtypes=rng.uniform(size=(n, 3)) > 0.5,
+                        savepath=f"{path}/", savename=savename, dumpnum=dumpnum, saveformat=saveformat)
+
+            if saveformat == "npz":
+                files.append(f"{path}/{savename}_{dumpnum}.npz")
+            else:
+                files.append(f"{path}/{savename}_{dumpnum}")
+
+        return files, traces
+
+    return _save_dumps
+
+
+@pytest.fixture
+def save_stanford_file():
+    """
+    Fixture that returns a function for saving a minimal Stanford DAQ .mat file.
+
+    """
+
+    def _save_stanford_file(filename, data, lgcprop=True):
+        """
+        Saves the inputted data_post, and returns the filename.
+
+        """
+
+        mdict = {"data_post" : data}
+        if lgcprop:
+            mdict["exp_prop"] = {"SRS" : np.array([[1.0, 2.0]]),
+                                 "Rfb" : np.array([[5000.0, 5000.0]]),
+                                 "turn_ratio" : np.array([[10.0, 10.0]]),
+                                 "sample_rate" : np.array([[625e3]])}
+        savemat(filename, mdict)
+
+        return str(filename)
+
+    return _save_stanford_file
+
+
+@pytest.fixture
+def fake_midgz(monkeypatch):
+    """
+    Fixture that replaces the mid.gz reader and the detector settings of scdmsPyTools with ones that
+    return the raw traces of dumps that are registered with the returned function, such that the mid.gz
+    code paths can be tested without scdmsPyTools. The conversion factor of the nth channel of each dump
+    is 1e-7*(n + 1).
+
+    """
+
+    dumps = {}
+
+    def _getRawEvents(filepath, files_series, channelList, detectorList, skipEmptyEvents, outputFormat):
+        raw = np.concatenate([dumps[f] for f in files_series])
+        nevts = len(raw)
+        events = {"Z1" : {"p" : raw, "pChan" : [f"PS{ii + 1}" for ii in range(raw.shape[1])]}, 
+                  "event" : [{"EventNumber" : 10001 + ii, "SeriesNumber" : 9180101, "EventTime" : 1e9 + ii,
+                              "TriggerType" : 1, "PollingEndTime" : 0.0} for ii in range(nevts)], 
+                  "trigger" : [{"TriggerTime" : 0.1*ii, "TriggerAmplitude" : 1.0} for ii in range(nevts)], 
+                  "trigger_veto" : [{"Z1" : {"ReadoutStatus" : 1}} for ii in range(nevts)]}
+
+        return events
+
+    def _get_trace_gain(path, chan, det):
+        return 1e-7*int(chan[2:]), 1.0, 1.0
+
+    monkeypatch.setattr(_io, "HAS_SCDMSPYTOOLS", True)
+    monkeypatch.setattr(_io, "getRawEvents", _getRawEvents, raising=False)
+    monkeypatch.setattr(_process_rq, "HAS_SCDMSPYTOOLS", True)
+    monkeypatch.setattr(rp.io, "get_trace_gain", _get_trace_gain)
+
+    def _add_dump(path, raw):
+        """
+        Registers the raw traces (in ADC bins) of the dump at the inputted path, and returns the path.
+
+        """
+
+        dumps[str(path)] = raw
+
+        return str(path)
+
+    return _add_dump
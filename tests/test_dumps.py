@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from rqpy.io import EventIndex, getrandevents, get_traces_npz, get_traces_npy, iter_traces_npy
+
+
+def test_npy_dumps_match_npz(tmp_path, save_dumps):
+    (tmp_path / "npz").mkdir()
+    (tmp_path / "npy").mkdir()
+    save_dumps(tmp_path / "npz", "npz")
+    save_dumps(tmp_path / "npy", "npy")
+
+    names = [f"09180101_0101_{ii}" for ii in [1, 2, 3]]
+
+    traces_npz, info_npz = get_traces_npz([f"{tmp_path}/npz/{name}.npz" for name in names])
+    traces_npy, info_npy = get_traces_npy([f"{tmp_path}/npy/{name}" for name in names])
+
+    assert np.array_equal(traces_npy, traces_npz)
+    assert info_npy.keys() == info_npz.keys()
+    for key in info_npz:
+        assert np.array_equal(info_npy[key], info_npz[key]), key
+
+    # a subset of the events of a single dump
+    evtinds = np.array([8, 0, 3])
+    traces, info = get_traces_npy(f"{tmp_path}/npy/{names[1]}", evtinds=evtinds)
+    assert np.array_equal(traces, traces_npz[7 + evtinds])
+    assert np.array_equal(info["eventnumber"], 20001 + evtinds)
+
+    # chunks of every dump, which are views of the memory-mapped traces
+    chunks = list(iter_traces_npy([f"{tmp_path}/npy/{name}" for name in names], chunksize=5))
+    assert [len(chunk[0]) for chunk in chunks] == [5, 2, 5, 5, 2, 5]
+    assert isinstance(chunks[0][0], np.memmap)
+    assert np.array_equal(np.concatenate([chunk[0] for chunk in chunks]), traces_npz)
+    assert np.array_equal(np.concatenate([chunk[1]["eventnumber"] for chunk in chunks]), info_npz["eventnumber"])
+
+
+def _dump_events(traces, savename="09180101_0101"):
+    seriesnums = np.concatenate([[f"{savename}_{ii}"]*len(t) for ii, t in enumerate(traces, start=1)])
+    evtnums = np.concatenate([10000*ii + 1 + np.arange(len(t)) for ii, t in enumerate(traces, start=1)])
+
+    return evtnums, seriesnums
+
+
+@pytest.mark.parametrize("filetype", ["npz", "npy"])
+def test_eventindex_read_traces(tmp_path, filetype, save_dumps):
+    datapath = tmp_path / "data"
+    datapath.mkdir()
+    _, traces = save_dumps(datapath, filetype)
+    evtnums, seriesnums = _dump_events(traces)
+
+    index = EventIndex.build(str(datapath), filetype=filetype)
+    index.save(str(tmp_path / "index.npz"))
+    index = EventIndex.load(str(tmp_path / "index.npz"))
+
+    assert len(index) == len(evtnums)
+    # uncompressed dumps are read through the byte offset of the traces
+    assert np.all(index.offsets >= 0)
+
+    rng = np.random.default_rng(0)
+    inds = rng.choice(len(evtnums), size=10, replace=False)
+    locs = index.locate(evtnums[inds], seriesnums[inds])
+
+    alltraces = np.concatenate(traces)
+    assert np.array_equal(locs, inds)
+    assert np.array_equal(index.read_traces(evtnums[inds], seriesnums[inds]), alltraces[inds])
+
+    # the traces are exactly what np.load gives for each event
+    for evtnum, snum, trace in zip(evtnums[inds], seriesnums[inds], index.read_traces(evtnums[inds], seriesnums[inds])):
+        if filetype == "npz":
+            with np.load(datapath / f"{snum}.npz") as data:
+                ref = data["traces"][evtnum % 10000 - 1]
+        else:
+            ref = np.load(datapath / snum / "traces.npy")[evtnum % 10000 - 1]
+        assert np.array_equal(trace, ref)
+
+    with pytest.raises(ValueError):
+        index.locate([10000*9 + 1], ["09180101_0101_9"])
+
+
+def test_eventindex_unmappable_npz(tmp_path):
+    rng = np.random.default_rng(1)
+    traces = [rng.normal(size=(6, 2, 64)), np.asfortranarray(rng.normal(size=(4, 2, 64)))]
+
+    np.savez_compressed(tmp_path / "09180101_0101_1.npz", traces=traces[0])
+    np.savez(tmp_path / "09180101_0101_2.npz", traces=traces[1])
+
+    index = EventIndex.build(str(tmp_path), filetype="npz")
+
+    # compressed and Fortran ordered traces cannot be memory-mapped, and are loaded instead
+    assert np.array_equal(index.offsets, [-1, -1])
+
+    evtnums = np.array([10005, 20002, 10001])
+    seriesnums = np.array(["09180101_0101_1", "09180101_0101_2", "09180101_0101_1"])
+    assert np.array_equal(index.read_traces(evtnums, seriesnums),
+                          np.stack([traces[0][4], traces[1][1], traces[0][0]]))
+
+
+@pytest.mark.parametrize("filetype", ["npz", "npy"])
+def test_getrandevents_eventindex(tmp_path, filetype, save_dumps):
+    _, traces = save_dumps(tmp_path, filetype)
+    evtnums, seriesnums = _dump_events(traces)
+    index = EventIndex.build(str(tmp_path), filetype=filetype)
+
+    t, x, crand = getrandevents(str(tmp_path), evtnums, seriesnums, ntraces=8, seed=2, filetype=filetype)
+    t_ind, x_ind, crand_ind = getrandevents(str(tmp_path), evtnums, seriesnums, ntraces=8, seed=2,
+                                            filetype=filetype, eventindex=index)
+
+    assert np.array_equal(crand_ind, crand)
+    assert np.array_equal(x_ind, x)
+    assert np.array_equal(x, np.concatenate(traces)[crand])
+
+    # the path to a saved event index
+    index.save(str(tmp_path / "index.npz.idx"))
+    x_path = getrandevents(str(tmp_path), evtnums, seriesnums, ntraces=8, seed=2, filetype=filetype, 
+                           eventindex=str(tmp_path / "index.npz.idx"))[1]
+    assert np.array_equal(x_path, x)
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from rqpy.io import loadstanfordfile, get_traces_midgz, iter_traces_midgz
+from rqpy.io._io import _get_info_dict_midgz
+
+
+def test_loadstanford_files_matches_single_files(tmp_path, save_stanford_file):
+    rng = np.random.default_rng(0)
+    files = [save_stanford_file(tmp_path / f"f{ii}.mat", rng.normal(size=(nevts, 64, 3)))
+             for ii, nevts in enumerate([3, 5, 2])]
+
+    traces, times, fs, ttl = loadstanfordfile(files, nthreads=2)
+    single = [loadstanfordfile(f) for f in files]
+
+    assert fs == 625e3
+    assert np.array_equal(traces, np.concatenate([res[0] for res in single]))
+    assert np.array_equal(times, np.concatenate([res[1] for res in single]))
+    assert np.array_equal(ttl, np.concatenate([res[3] for res in single]))
+
+
+def test_loadstanford_files_single_channel(tmp_path, save_stanford_file):
+    rng = np.random.default_rng(1)
+    data = [rng.normal(size=(nevts, 64)) for nevts in [4, 2]]
+    files = [save_stanford_file(tmp_path / f"f{ii}.mat", d) for ii, d in enumerate(data)]
+
+    traces, times, fs, ttl = loadstanfordfile(files, channels=["A"])
+
+    assert traces.shape == (6, 1, 64)
+    assert ttl is None
+    assert np.allclose(traces[:, 0], np.concatenate(data)/(1.0*5000.0*10.0)/1024)
+
+
+def test_loadstanford_files_warns_on_failed_files(tmp_path, save_stanford_file):
+    rng = np.random.default_rng(2)
+    data = [rng.normal(size=(nevts, 64, 3)) for nevts in [3, 4, 2, 5]]
+    files = [save_stanford_file(tmp_path / f"f{ii}.mat", d, lgcprop=ii!=1) for ii, d in enumerate(data)]
+    files.append(save_stanford_file(tmp_path / "f4.mat", rng.normal(size=(2, 32, 3))))
+
+    with pytest.warns(UserWarning, match="2 of 5 files failed") as record:
+        traces, times, fs, ttl = loadstanfordfile(files)
+
+    message = str(record[0].message)
+    assert files[1] in message and files[4] in message
+
+    good = [files[0], files[2], files[3]]
+    assert np.array_equal(traces, loadstanfordfile(good)[0])
+    assert np.array_equal(times, np.concatenate([loadstanfordfile(f)[1] for f in good]))
+    assert np.array_equal(ttl, np.concatenate([loadstanfordfile(f)[3] for f in good]))
+
+
+def test_get_info_dict_midgz():
+    rng = np.random.default_rng(3)
+    nevts = 20
+    det = ["Z1", "Z2", "Z1"]
+
+    trigvetofields = ["ReadoutStatus", "DeadTime0", "LiveTime0", "TriggerVetoReadoutTime0", "SeriesTime", 
+                      "WaveformReadEndTime", "WaveformReadStartTime"]
+
+    events = {"event" : [], "trigger" : [], "trigger_veto" : []}
+    for ii in range(nevts):
+        events["event"].append({"EventNumber" : 10001 + ii, "SeriesNumber" : 91801010101, 
+                                "EventTime" : 1e9 + ii, "TriggerType" : int(rng.integers(1, 4)), 
+                                "PollingEndTime" : rng.uniform()})
+        events["trigger"].append({"TriggerTime" : rng.uniform(), "TriggerAmplitude" : rng.normal()})
+
+        # the trigger veto of a detector can be missing, or be missing some of the fields
+        trigv = {}
+        for d in ["Z1", "Z2"]:
+            if rng.uniform() < 0.8:
+                trigv[d] = {field : rng.uniform() for field in trigvetofields if rng.uniform() < 0.9}
+        events["trigger_veto"].append(trigv)
+    events["trigger_veto"][3] = []
+
+    info_dict = _get_info_dict_midgz(events, det)
+
+    for key, field in [("eventnumber", "EventNumber"), ("seriesnumber", "SeriesNumber"), ("eventtime", "EventTime"),
+                       ("triggertype", "TriggerType"), ("pollingendtime", "PollingEndTime")]:
+        assert np.array_equal(info_dict[key], [ev[field] for ev in events["event"]])
+
+    assert np.array_equal(info_dict["triggertime"], [trig["TriggerTime"] for trig in events["trigger"]])
+    assert np.array_equal(info_dict["triggeramp"], [trig["TriggerAmplitude"] for trig in events["trigger"]])
+
+    for key, field in zip(["readoutstatus", "deadtime", "livetime", "triggervetoreadouttime", "seriestime", 
+                           "waveformreadendtime", "waveformreadstarttime"], trigvetofields):
+        for d in ["Z1", "Z2"]:
+            ref = []
+            for trigv in events["trigger_veto"]:
+                try:
+                    ref.append(trigv[d][field])
+                except (KeyError, TypeError):
+                    ref.append(-999999.0)
+
+            assert isinstance(info_dict[f"{key}{d}"], np.ndarray)
+            assert np.array_equal(info_dict[f"{key}{d}"], ref)
+
+
+def test_loadstanford_fullrtn_warns_on_failed_files(tmp_path, save_stanford_file):
+    rng = np.random.default_rng(4)
+    data = [rng.normal(size=(nevts, 64, 3)) for nevts in [3, 4, 2]]
+    files = [save_stanford_file(tmp_path / f"f{ii}.mat", d, lgcprop=ii!=1) for ii, d in enumerate(data)]
+
+    with pytest.warns(UserWarning, match="1 of 3 files failed") as record:
+        traces, times, fs, ttl, res = loadstanfordfile(files, lgcfullrtn=True)
+
+    message = next(str(w.message) for w in record if "failed to load" in str(w.message))
+    assert files[1] in message
+    assert np.allclose(traces, loadstanfordfile([files[0], files[2]])[0])
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.int16, np.int32])
+def test_get_traces_midgz_dtype(fake_midgz, dtype):
+    rng = np.random.default_rng(5)
+    raw = rng.integers(-2**15, 2**15, size=(9, 2, 128)).astype(np.int16)
+    path = fake_midgz("/data/09180101_0101/09180101_0101_F0001.mid.gz", raw)
+    convtoamps = [1e-7, 2e-7]
+
+    x = get_traces_midgz(path, ["PS1", "PS2"], "Z1", convtoamps=convtoamps)
+    x_typed, info = get_traces_midgz(path, ["PS1", "PS2"], "Z1", convtoamps=convtoamps, lgcreturndict=True, 
+                                     dtype=dtype)
+
+    assert x.dtype == np.float64
+    assert x_typed.dtype == dtype
+    assert np.array_equal(info["eventnumber"], 10001 + np.arange(9))
+
+    if np.issubdtype(dtype, np.floating):
+        assert np.allclose(x_typed, x, rtol=1e-6, atol=0)
+    else:
+        # integer types keep the raw traces in ADC bins
+        assert np.array_equal(x_typed, raw)
+        assert np.allclose(x_typed*np.array(convtoamps)[:, np.newaxis], x, rtol=1e-15, atol=0)
+
+    # the chunks of the generator match the whole dump
+    chunks = list(iter_traces_midgz(path, ["PS1", "PS2"], "Z1", convtoamps=convtoamps, chunksize=4, dtype=dtype))
+    assert [chunk[0].dtype for chunk in chunks] == [np.dtype(dtype)]*3
+    assert np.array_equal(np.concatenate([chunk[0] for chunk in chunks]), x_typed)
@@ -0,0 +1,261 @@
+import pickle
+import numpy as np
+import pytest
+import qetpy as qp
+
+from rqpy.process import OFKernel, SpectralContext, SetupRQ
+from rqpy.process import ofamp_batch, ofamp_shifted_batch, ofamp_pileup_batch, chi2_nopulse_batch, chi2lowfreq_batch
+from rqpy.process._process_rq import _calc_rq
+
+
+FS = 625e3
+
+
+def _make_template(nbins, tau_r=5e-6, tau_f=40e-6):
+    t = np.arange(nbins)/FS
+    template = np.roll(np.exp(-t/tau_f) - np.exp(-t/tau_r), nbins//2)
+
+    return template/template.max()
+
+
+def _make_psd(rng, nbins, kind):
+    """
+    Helper function that makes a random noise PSD, either two-sided and symmetric in frequency,
+    two-sided and asymmetric, or symmetric and folded over to the frequencies of a real FFT.
+
+    """
+
+    psd = rng.uniform(0.5, 2.0, size=nbins)*1e-20
+
+    if kind == "asymmetric":
+        return psd
+
+    psd = (psd + psd[-np.arange(nbins) % nbins])/2
+
+    if kind == "folded":
+        # the PSD that the folded over one is compared against
+        return psd, qp.foldpsd(psd, FS)[1]
+
+    return psd
+
+
+def _make_signal(rng, template, ntraces=8):
+    nbins = len(template)
+    shifts = rng.integers(-30, 30, size=ntraces)
+    amps = rng.uniform(0.5, 2.0, size=ntraces)*1e-8
+
+    pulses = np.array([amp*np.roll(template, shift) for amp, shift in zip(amps, shifts)])
+
+    # a smaller pileup pulse far from the center of each trace
+    pileups = np.array([0.3*amp*np.roll(template, nbins//3) for amp in amps])
+
+    return pulses + pileups + rng.normal(scale=1e-10, size=(ntraces, nbins))
+
+
+@pytest.fixture(params=[(256, "symmetric"), (256, "asymmetric"), (255, "symmetric"), (255, "asymmetric"),
+                        (256, "folded"), (255, "folded")],
+                ids=lambda p: f"{p[0]}-{p[1]}")
+def ofinputs(request):
+    nbins, kind = request.param
+    rng = np.random.default_rng(nbins)
+
+    template = _make_template(nbins)
+    psd = _make_psd(rng, nbins, kind)
+    signal = _make_signal(rng, template)
+
+    if kind == "folded":
+        # the kernel is built from the folded over PSD, and the reference uses the two-sided one
+        psd, kernelpsd = psd
+    else:
+        kernelpsd = psd
+
+    return signal, template, psd, OFKernel(template, kernelpsd, FS)
+
+
+@pytest.mark.parametrize("withdelay,nconstrain", [(False, None), (True, None), (True, 80), (True, 81)])
+def test_ofamp_batch(ofinputs, withdelay, nconstrain):
+    signal, template, psd, kernel = ofinputs
+
+    amp, t0, chi2 = ofamp_batch(signal, kernel, withdelay=withdelay, nconstrain=nconstrain)
+    ref = np.array([qp.ofamp(s, template, psd, FS, withdelay=withdelay, nconstrain=nconstrain) for s in signal])
+
+    assert np.allclose(amp, ref[:, 0], rtol=1e-10, atol=0)
+    assert np.array_equal(t0, ref[:, 1])
+    assert np.allclose(chi2, ref[:, 2], rtol=1e-9, atol=0)
+
+
+def test_chi2_nopulse_batch(ofinputs):
+    signal, template, psd, kernel = ofinputs
+
+    chi0 = chi2_nopulse_batch(signal, kernel)
+    ref = np.array([qp.chi2_nopulse(s, psd, FS) for s in signal])
+
+    assert np.allclose(chi0, ref, rtol=1e-10, atol=0)
+
+
+@pytest.mark.parametrize("fcutoff", [10000, 50000])
+def test_chi2lowfreq_batch(ofinputs, fcutoff):
+    signal, template, psd, kernel = ofinputs
+
+    amp, t0, _ = ofamp_batch(signal, kernel, nconstrain=80)
+    chi2low = chi2lowfreq_batch(signal, kernel, amp, t0, fcutoff=fcutoff)
+    ref = np.array([qp.chi2lowfreq(s, template, a, t, psd, FS, fcutoff=fcutoff) for s, a, t in zip(signal, amp, t0)])
+
+    assert np.allclose(chi2low, ref, rtol=1e-10, atol=0)
+
+
+@pytest.mark.parametrize("nconstrain2", [None, 80])
+def test_ofamp_pileup_batch(ofinputs, nconstrain2):
+    signal, template, psd, kernel = ofinputs
+
+    amp1, t01, _ = ofamp_batch(signal, kernel, nconstrain=80)
+    amp2, t02, chi2 = ofamp_pileup_batch(signal, kernel, amp1, t01, nconstrain2=nconstrain2)
+    ref = np.array([qp.ofamp_pileup(s, template, psd, FS, a1=a, t1=t, nconstrain2=nconstrain2)
+                    for s, a, t in zip(signal, amp1, t01)])
+
+    assert np.allclose(amp2, ref[:, 2], rtol=1e-9, atol=1e-12*np.max(np.abs(amp1)))
+    assert np.array_equal(t02, ref[:, 3])
+    assert np.allclose(chi2, ref[:, 4], rtol=1e-9, atol=0)
+
+
+def test_ofamp_shifted_batch(ofinputs):
+    signal, template, psd, kernel = ofinputs
+
+    shifts = np.arange(len(signal)) - len(signal)//2
+    amp, chi2 = ofamp_shifted_batch(signal, kernel, shifts/FS)
+
+    # the template is shifted circularly
+    ref = np.array([qp.ofamp(s, np.roll(template, shift), psd, FS, withdelay=False)
+                    for s, shift in zip(signal, shifts)])
+
+    assert np.allclose(amp, ref[:, 0], rtol=1e-10, atol=0)
+    assert np.allclose(chi2, ref[:, 2], rtol=1e-9, atol=0)
+
+
+def test_spectralcontext_shared_fft(ofinputs):
+    signal, template, psd, kernel = ofinputs
+
+    spec = SpectralContext(signal, kernel)
+
+    # every fit of one context gives the same result as a separate batch call
+    for withdelay, nconstrain in [(False, None), (True, None), (True, 80)]:
+        for val, ref in zip(spec.ofamp(withdelay=withdelay, nconstrain=nconstrain),
+                            ofamp_batch(signal, kernel, withdelay=withdelay, nconstrain=nconstrain)):
+            assert np.array_equal(val, ref)
+
+    amp1, t01, _ = spec.ofamp(nconstrain=80)
+    for val, ref in zip(spec.ofamp_pileup(amp1, t01, nconstrain2=80),
+                        ofamp_pileup_batch(signal, kernel, amp1, t01, nconstrain2=80)):
+        assert np.array_equal(val, ref)
+
+
+def test_ofkernel_float32(ofinputs):
+    signal, template, psd, kernel = ofinputs
+
+    kernel32 = OFKernel(template, psd, FS, precision="float32")
+    spec = SpectralContext(signal, kernel32)
+
+    assert spec.v.dtype == np.complex64
+
+    amp, t0, _ = ofamp_batch(signal, kernel, nconstrain=80)
+    amp32, t032, _ = spec.ofamp(nconstrain=80)
+
+    assert np.allclose(amp32, amp, rtol=1e-4, atol=0)
+    assert np.array_equal(t032, t0)
+
+
+def _calc_rq_reference(traces, setup, channels, det):
+    """
+    Helper function that calculates the optimum filter RQs of each trace separately with QETpy,
+    as the RQ processing did before the batched engine.
+
+    """
+
+    rq_dict = {}
+
+    for ii, chan in enumerate(channels):
+        template = setup.templates[ii]
+        psd = setup.psds[ii]
+        fcutoff = setup.chi2_lowfreq_fcutoff[ii]
+        name = f"{chan}{det}"
+
+        nodelay = np.array([qp.ofamp(s, template, psd, FS, withdelay=False) for s in traces[:, ii]])
+        rq_dict[f"ofamp_nodelay_{name}"] = nodelay[:, 0]
+        rq_dict[f"chi2_nodelay_{name}"] = nodelay[:, 2]
+
+        rq_dict[f"chi2_nopulse_{name}"] = np.array([qp.chi2_nopulse(s, psd, FS) for s in traces[:, ii]])
+
+        for fit, nconstrain in [("unconstrain", None), ("constrain", setup.ofamp_constrained_nconstrain[ii])]:
+            res = np.array([qp.ofamp(s, template, psd, FS, nconstrain=nconstrain) for s in traces[:, ii]])
+            rq_dict[f"ofamp_{fit}_{name}"] = res[:, 0]
+            rq_dict[f"t0_{fit}_{name}"] = res[:, 1]
+            rq_dict[f"chi2_{fit}_{name}"] = res[:, 2]
+
+        rq_dict[f"chi2lowfreq_constrain_{name}"] = np.array([
+            qp.chi2lowfreq(s, template, a, t, psd, FS, fcutoff=fcutoff)
+            for s, a, t in zip(traces[:, ii], rq_dict[f"ofamp_constrain_{name}"], rq_dict[f"t0_constrain_{name}"])
+        ])
+
+        pileup = np.array([
+            qp.ofamp_pileup(s, template, psd, FS, a1=a, t1=t, nconstrain2=setup.ofamp_pileup_nconstrain[ii])
+            for s, a, t in zip(traces[:, ii], rq_dict[f"ofamp_constrain_{name}"], rq_dict[f"t0_constrain_{name}"])
+        ])
+        rq_dict[f"ofamp_pileup_{name}"] = pileup[:, 2]
+        rq_dict[f"t0_pileup_{name}"] = pileup[:, 3]
+        rq_dict[f"chi2_pileup_{name}"] = pileup[:, 4]
+
+    # the shifted fit of the non-trigger channel, using the time of the constrained fit of the trigger channel
+    shifts = np.rint(rq_dict[f"t0_constrain_{channels[0]}{det}"]*FS).astype(int)
+    shifted = np.array([qp.ofamp(s, np.roll(setup.templates[1], shift), setup.psds[1], FS, withdelay=False)
+                        for s, shift in zip(traces[:, 1], shifts)])
+    rq_dict[f"ofamp_shifted_{channels[1]}{det}"] = shifted[:, 0]
+    rq_dict[f"chi2_shifted_{channels[1]}{det}"] = shifted[:, 2]
+
+    return rq_dict
+
+
+def test_calc_rq_matches_per_trace():
+    rng = np.random.default_rng(3)
+    nbins = 256
+    templates = [_make_template(nbins), _make_template(nbins, tau_f=60e-6)]
+    psds = [_make_psd(rng, nbins, "asymmetric"), _make_psd(rng, nbins, "symmetric")]
+
+    traces = np.stack([_make_signal(rng, template, ntraces=10) for template in templates], axis=1)
+    readout_inds = np.ones(len(traces), dtype=bool)
+    readout_inds[[2, 7]] = False
+
+    setup = SetupRQ(templates, psds, FS, trigger=0)
+    setup.adjust_ofamp_shifted(lgcrun=True, which_fit="constrained")
+
+    rq_dict = _calc_rq(traces, ["PAS1", "PBS1"], ["Z1"]*2, setup, readout_inds=readout_inds)
+    ref = _calc_rq_reference(traces[readout_inds], setup, ["PAS1", "PBS1"], "Z1")
+
+    for key, val in ref.items():
+        assert np.all(rq_dict[key][~readout_inds] == -999999.0), key
+        assert np.allclose(rq_dict[key][readout_inds], val, rtol=1e-9, atol=1e-12*np.max(np.abs(val))), key
+
+
+def test_setuprq_kernel_cache():
+    rng = np.random.default_rng(4)
+    nbins = 256
+    templates = [_make_template(nbins)]*2
+    psds = [_make_psd(rng, nbins, "symmetric")]*2
+
+    setup = SetupRQ(templates, psds, FS, summed_template=templates[0], summed_psd=psds[0])
+    setup.build_kernels()
+
+    assert set(setup.kernels) == {(0, nbins), (1, nbins), ("sum", nbins)}
+    assert setup.get_kernel(0, nbins) is setup.kernels[(0, nbins)]
+    assert 10000 in setup.kernels[(0, nbins)].lowfreq_cache
+
+    # the kernels are kept when the setup is sent to other processes
+    setup_copy = pickle.loads(pickle.dumps(setup))
+    assert set(setup_copy.kernels) == set(setup.kernels)
+    assert np.array_equal(setup_copy.kernels[(0, nbins)].phi, setup.kernels[(0, nbins)].phi)
+
+    with pytest.raises(ValueError):
+        setup.get_kernel(0, nbins + 1)
+
+    setup.adjust_precision("float32")
+    assert setup.kernels == {}
+    assert setup.get_kernel(0, nbins).dtype == np.float32
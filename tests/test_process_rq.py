@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rqpy.process import SetupRQ, rq, validate_precision
+from rqpy.process._process_rq import _calc_rq
+
+
+NBINS = 256
+
+
+def _make_setup():
+    template = np.zeros(NBINS)
+    template[NBINS//2:] = np.exp(-np.arange(NBINS//2)/20)
+    psd = np.ones(NBINS)
+
+    return SetupRQ([template, template], [psd, psd], 1e3), template
+
+
+@pytest.mark.parametrize("filetype", ["npz", "npy"])
+def test_rq_chunksize_matches_whole_file(tmp_path, save_dumps, filetype):
+    setup, template = _make_setup()
+    files, _ = save_dumps(tmp_path, filetype, nevts=(7, 12), nbins=NBINS, template=template)
+
+    rq_df = rq(files, ["PAS1", "PBS1"], setup, filetype=filetype)
+    assert len(rq_df) == 19
+
+    # chunks that do not line up with the number of events in each dump
+    for chunksize in [1, 5, 12]:
+        pd.testing.assert_frame_equal(rq(files, ["PAS1", "PBS1"], setup, filetype=filetype, chunksize=chunksize),
+                                      rq_df)
+
+
+def test_rq_skips_corrupt_dumps(tmp_path, save_dumps):
+    setup, template = _make_setup()
+    files, _ = save_dumps(tmp_path, nevts=(7, 12, 5, 4), nbins=NBINS, template=template)
+
+    rq_good = rq([files[0], files[3]], ["PAS1", "PBS1"], setup, filetype="npz")
+
+    # a truncated dump raises zipfile.BadZipFile, and a dump that is not a zip file raises ValueError
+    with open(files[1], "rb") as f:
+        data = f.read()
+    with open(files[1], "wb") as f:
+        f.write(data[:len(data)//2])
+    with open(files[2], "wb") as f:
+        f.write(b"not a dump")
+
+    rq_df = rq(files, ["PAS1", "PBS1"], setup, filetype="npz")
+    pd.testing.assert_frame_equal(rq_df, rq_good)
+
+    # errors from the arguments are still raised
+    with pytest.raises(IndexError):
+        rq(files, ["PAS1", "PBS1", "PCS1"], setup, filetype="npz")
+
+
+def _make_midgz_dumps(fake_midgz, ndumps=2, nevts=6):
+    rng = np.random.default_rng(9)
+    setup, template = _make_setup()
+    files = []
+
+    for ii in range(1, ndumps + 1):
+        raw = 2000*rng.uniform(size=(nevts, 2, 1))*template + rng.normal(scale=20, size=(nevts, 2, NBINS))
+        files.append(fake_midgz(f"/data/09180101_0101/09180101_0101_F000{ii}.mid.gz", np.rint(raw).astype(np.int16)))
+
+    return files, setup
+
+
+def test_rq_midgz_float32(fake_midgz):
+    files, setup = _make_midgz_dumps(fake_midgz)
+
+    rq_df = rq(files, ["PS1", "PS2"], setup, filetype="mid.gz")
+    rq_32 = rq(files, ["PS1", "PS2"], setup, filetype="mid.gz", dtype=np.float32, chunksize=4)
+
+    assert len(rq_df) == 12
+    assert list(rq_32.columns) == list(rq_df.columns)
+    for col in rq_df.columns:
+        assert np.allclose(rq_32[col], rq_df[col], rtol=1e-4, atol=1e-4*np.max(np.abs(rq_df[col]))), col
+
+
+def test_validate_precision():
+    rng = np.random.default_rng(10)
+    setup, template = _make_setup()
+    traces = rng.uniform(0.5, 2, size=(20, 2, 1))*template + rng.normal(scale=0.05, size=(20, 2, NBINS))
+    readout_inds = np.ones(len(traces), dtype=bool)
+    readout_inds[[3, 11]] = False
+
+    deviations = validate_precision(traces, ["PAS1", "PBS1"], setup, readout_inds=readout_inds)
+    assert setup.precision == "float64"
+
+    setup_32 = SetupRQ(setup.templates, setup.psds, setup.fs)
+    setup_32.adjust_precision("float32")
+    rq_64 = _calc_rq(traces, ["PAS1", "PBS1"], ["Z1"]*2, setup, readout_inds=readout_inds)
+    rq_32 = _calc_rq(traces, ["PAS1", "PBS1"], ["Z1"]*2, setup_32, readout_inds=readout_inds)
+
+    assert set(deviations.index) == set(rq_64)
+    for key in rq_64:
+        dev = np.abs(rq_32[key] - rq_64[key])
+        assert np.isclose(np.max(dev), deviations.loc[key, "max_abs_dev"], rtol=1e-12, atol=0), key
+        # the float32 RQs stay within the reported tolerance of the float64 RQs
+        assert np.all(dev <= deviations.loc[key, "max_rel_dev"]*np.max(np.abs(rq_64[key][readout_inds]))*(1 + 1e-12)), key
+
+    assert deviations["max_rel_dev"].max() < 1e-4
+    assert deviations["max_rel_dev"].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+def test_calc_rq_raw_int16(precision):
+    rng = np.random.default_rng(11)
+    setup, template = _make_setup()
+    setup = SetupRQ(setup.templates, setup.psds, setup.fs, summed_template=template, summed_psd=setup.psds[0])
+    setup.adjust_precision(precision)
+
+    raw = np.rint(2000*rng.uniform(size=(10, 2, 1))*template + rng.normal(scale=20, size=(10, 2, NBINS)))
+    raw = raw.astype(np.int16)
+    convtoamps = [1e-7, 2e-7]
+    traces = raw*np.array(convtoamps)[:, np.newaxis]
+
+    # the raw traces are converted to Amps at the precision of the setup
+    rq_float = _calc_rq(traces.astype(precision), ["PAS1", "PBS1"], ["Z1"]*2, setup)
+    rq_raw = _calc_rq(raw, ["PAS1", "PBS1"], ["Z1"]*2, setup, convtoamps=convtoamps)
+
+    rtol = 1e-12 if precision == "float64" else 1e-4
+    assert rq_raw.keys() == rq_float.keys()
+    for key in rq_float:
+        assert np.allclose(rq_raw[key], rq_float[key], rtol=rtol, atol=rtol*np.max(np.abs(rq_float[key]))), key
+
+
+def test_rq_midgz_int16(fake_midgz):
+    files, setup = _make_midgz_dumps(fake_midgz)
+
+    rq_df = rq(files, ["PS1", "PS2"], setup, filetype="mid.gz")
+    rq_16 = rq(files, ["PS1", "PS2"], setup, filetype="mid.gz", dtype=np.int16, chunksize=5)
+
+    pd.testing.assert_frame_equal(rq_16, rq_df, check_exact=False, rtol=1e-12)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from qetpy import calc_psd
+from scipy.signal import decimate
+
+import rqpy as rp
+
+
+@pytest.fixture
+def fft_backend():
+    backend = rp.get_fft_backend()
+    yield
+    rp.set_fft_backend(backend[0], workers=backend[1])
+
+
+@pytest.mark.parametrize("backend", ["scipy", "numpy"])
+def test_ds_trunc(backend, fft_backend):
+    rp.set_fft_backend(backend)
+
+    rng = np.random.default_rng(0)
+    fs, trunc, ds = 625e3, 1000, 4
+    traces = rng.normal(size=(5, 1200))
+    template = rp.make_ideal_template(np.arange(1200)/fs, 20e-6, 100e-6)
+
+    traces_ds, template_ds, psd_ds, fs_ds = rp.ds_trunc(traces, fs, trunc, ds, template=template)
+
+    assert fs_ds == fs/ds
+    assert traces_ds.shape == (5, trunc//ds)
+    assert template_ds.shape == (trunc//ds,)
+    assert np.allclose(traces_ds, decimate(traces[:, :trunc], ds, zero_phase=True))
+    assert np.allclose(psd_ds, calc_psd(traces_ds, fs=fs_ds, folded_over=False)[1])
+
+    # a single trace, without a template
+    trace_ds, psd_ds, fs_ds = rp.ds_trunc(traces[0], fs, trunc, ds)
+
+    assert fs_ds == fs/ds
+    assert np.allclose(trace_ds, traces_ds[0])
+    assert np.allclose(psd_ds, calc_psd(trace_ds, fs=fs_ds, folded_over=False)[1])
@@ -0,0 +1,123 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from rqpy import HAS_PYARROW
+from rqpy.io import RQWriter, load_rq
+from rqpy.process import _process_rq
+from rqpy.process import SetupRQ, rq
+
+pytestmark = pytest.mark.skipif(not HAS_PYARROW, reason="pyarrow is not installed")
+
+
+def test_rqwriter_load_rq_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    written = []
+
+    for seriesnum in ["09180101_0101", "09180102_0101"]:
+        for dump in [1, 2]:
+            with RQWriter(str(tmp_path), seriesnum, dump) as writer:
+                # several chunks per dump, which are appended as row groups
+                for nevts in [3, 4]:
+                    df = pd.DataFrame({"eventnumber" : np.arange(nevts) + writer.nrows,
+                                       "seriesnumber" : [seriesnum]*nevts,
+                                       "ofamp" : rng.normal(size=nevts),
+                                       "chi2" : rng.normal(size=nevts)})
+                    writer.write(df)
+                    written.append(df)
+
+            assert writer.nrows == 7
+            assert (tmp_path / seriesnum / f"rq_d{dump}.parquet").exists()
+            assert not (tmp_path / seriesnum / f"rq_d{dump}.parquet.tmp").exists()
+
+    expected = pd.concat(written, ignore_index=True)
+
+    rq_df = load_rq(str(tmp_path), columns=["seriesnumber", "ofamp"])
+    assert list(rq_df.columns) == ["seriesnumber", "ofamp"]
+    pd.testing.assert_frame_equal(rq_df, expected[["seriesnumber", "ofamp"]])
+
+    rq_df = load_rq(str(tmp_path), columns=["chi2"], series="09180102_0101")
+    pd.testing.assert_frame_equal(rq_df, expected[["chi2"]][14:].reset_index(drop=True))
+
+
+def test_rqwriter_removes_partial_dump(tmp_path):
+    with pytest.raises(RuntimeError):
+        with RQWriter(str(tmp_path), "09180101_0101", 1) as writer:
+            writer.write(pd.DataFrame({"ofamp" : np.ones(3)}))
+            raise RuntimeError("interrupted")
+
+    assert list((tmp_path / "09180101_0101").iterdir()) == []
+
+    with pytest.raises(ValueError):
+        load_rq(str(tmp_path))
+
+
+def test_rq_resume_from_manifest(tmp_path, monkeypatch, save_dumps):
+    nbins = 256
+    template = np.zeros(nbins)
+    template[nbins//2:] = np.exp(-np.arange(nbins//2)/20)
+    psd = np.ones(nbins)
+
+    files, _ = save_dumps(tmp_path, nevts=(5, 5), nbins=nbins, template=template, savename="test")
+    savepath = f"{tmp_path}/rqs/"
+
+    setup = SetupRQ([template, template], [psd, psd], 1e3)
+    kwargs = dict(filetype="npz", savepath=savepath, lgcsavedumps=True, saveformat="parquet")
+
+    rq_df = rq(files, ["PAS1", "PBS1"], setup, **kwargs)
+
+    with open(f"{savepath}rq_manifest.json") as f:
+        manifest = json.load(f)
+    assert sorted(manifest) == sorted(str((tmp_path / f"test_{ii}.npz").resolve()) for ii in [1, 2])
+    assert all(entry["status"] == "done" for entry in manifest.values())
+
+    pd.testing.assert_frame_equal(load_rq(savepath), rq_df)
+
+    # dumps that are done with the same configuration are loaded, not reprocessed
+    processed = []
+    rq_single = _process_rq._rq
+    def _rq_spy(file, *args, **kwargs):
+        processed.append(file)
+        return rq_single(file, *args, **kwargs)
+    monkeypatch.setattr(_process_rq, "_rq", _rq_spy)
+
+    files.append(f"{tmp_path}/test_3.npz")
+    resumed = rq(files, ["PAS1", "PBS1"], setup, lgcresume=True, **kwargs)
+    pd.testing.assert_frame_equal(resumed, rq_df)
+
+    # the missing dump is retried, then recorded as failed and skipped
+    assert processed == [files[2]]*2
+    with open(f"{savepath}rq_manifest.json") as f:
+        manifest = json.load(f)
+    assert manifest[str((tmp_path / "test_3.npz").resolve())]["status"] == "failed"
+
+    # a different configuration reprocesses every dump
+    processed.clear()
+    setup.adjust_baseline(indbasepre=64)
+    rq(files[:2], ["PAS1", "PBS1"], setup, lgcresume=True, **kwargs)
+    assert processed == files[:2]
+
+
+def test_rq_resume_switch_saveformat(tmp_path, save_dumps):
+    nbins = 256
+    template = np.zeros(nbins)
+    template[nbins//2:] = np.exp(-np.arange(nbins//2)/20)
+    psd = np.ones(nbins)
+
+    files, _ = save_dumps(tmp_path, nevts=(5, 5), nbins=nbins, template=template, savename="test")
+    savepath = f"{tmp_path}/rqs/"
+    (tmp_path / "rqs").mkdir()
+
+    setup = SetupRQ([template, template], [psd, psd], 1e3)
+    rq_df = rq(files, ["PAS1", "PBS1"], setup, filetype="npz", savepath=savepath, lgcsavedumps=True, saveformat="pkl")
+
+    # the pickled dumps are not loaded as Parquet, they are reprocessed into the Parquet store
+    resumed = rq(files, ["PAS1", "PBS1"], setup, filetype="npz", savepath=savepath, lgcsavedumps=True, 
+                 saveformat="parquet", lgcresume=True)
+    pd.testing.assert_frame_equal(resumed, rq_df)
+    pd.testing.assert_frame_equal(load_rq(savepath), rq_df)
+
+    with open(f"{savepath}rq_manifest.json") as f:
+        manifest = json.load(f)
+    assert all(entry["output"].endswith(".parquet") for entry in manifest.values())
@@ -0,0 +1,506 @@
+import glob
+import numpy as np
+import pytest
+from scipy.signal import correlate
+
+from rqpy.process import _trigger
+from rqpy.process._trigger import _DumpBuffer, OptimumFilt
+
+
+def test_dumpbuffer_final_dump_length(tmp_path):
+    nchan, tracelength, maxevts = 2, 16, 4
+    fields = {"pulsetimes" : ((), float), 
+              "pulseamps" : ((), float), 
+              "trigtimes" : ((), float), 
+              "trigamps" : ((), float), 
+              "traces" : ((nchan, tracelength), float), 
+              "trigtypes" : ((3,), bool)}
+    dumps = _DumpBuffer(fields, maxevts, f"{tmp_path}/", "test", 1, "npz")
+
+    rng = np.random.default_rng(0)
+    pulsetimes = []
+    traces = []
+
+    # batches that do not line up with the dump size, 11 events in total
+    for nevts in [3, 6, 2]:
+        pulsetimes.append(rng.uniform(size=nevts))
+        traces.append(rng.normal(size=(nevts, nchan, tracelength)))
+        dumps.add(pulsetimes=pulsetimes[-1], 
+                  pulseamps=np.ones(nevts), 
+                  trigtimes=np.zeros(nevts), 
+                  trigamps=np.zeros(nevts), 
+                  traces=traces[-1], 
+                  trigtypes=np.ones((nevts, 3), dtype=bool))
+    dumps.flush()
+
+    files = sorted(glob.glob(f"{tmp_path}/test_*.npz"))
+    assert [f.split("_")[-1] for f in files] == ["1.npz", "2.npz", "3.npz"]
+
+    saved = [np.load(f) for f in files]
+
+    # the last dump only has the remaining events, it is not padded to maxevts
+    assert [len(d["pulsetimes"]) for d in saved] == [4, 4, 3]
+    assert [d["traces"].shape for d in saved] == [(4, nchan, tracelength)]*2 + [(3, nchan, tracelength)]
+
+    assert np.array_equal(np.concatenate([d["pulsetimes"] for d in saved]), np.concatenate(pulsetimes))
+    assert np.array_equal(np.concatenate([d["traces"] for d in saved]), np.concatenate(traces))
+
+
+def test_dumpbuffer_no_empty_dump(tmp_path):
+    dumps = _DumpBuffer({"pulsetimes" : ((), float)}, 4, f"{tmp_path}/", "test", 1, "npz")
+    dumps.add(pulsetimes=np.arange(8.0))
+    dumps.flush()
+
+    files = sorted(glob.glob(f"{tmp_path}/test_*.npz"))
+    assert len(files) == 2
+    assert all(len(np.load(f)["pulsetimes"]) == 4 for f in files)
+
+
+def _make_trigger_data(rng, ntraces, nbins, template, pulseinds, trigtemplate=None, trigpulseinds=()):
+    """
+    Helper function that makes traces of white noise with pulses of the template added at the
+    specified indices of the flattened traces, and the corresponding trigger channel traces.
+    
+    """
+    
+    traces = rng.normal(scale=0.01, size=(ntraces, 2, nbins))
+    for ind in pulseinds:
+        ii, jj = divmod(ind, nbins)
+        traces[ii, :, jj:jj + len(template)] += template[:nbins - jj]
+    
+    if trigtemplate is None:
+        return traces, None
+    
+    trig = rng.normal(scale=0.01, size=(ntraces, nbins))
+    for ind in trigpulseinds:
+        ii, jj = divmod(ind, nbins)
+        trig[ii, jj:jj + len(trigtemplate)] += trigtemplate[:nbins - jj]
+    
+    return traces, trig
+
+
+def _make_filter_inputs(nbins=256):
+    t = np.arange(nbins)
+    template = np.exp(-t/20.0) - np.exp(-t/2.0)
+    template /= template.max()
+    trigtemplate = np.zeros(32)
+    trigtemplate[:16] = 1.0
+    noisepsd = np.ones(nbins)*0.01**2/1e3
+    
+    return template, trigtemplate, noisepsd
+
+
+def test_filtertraces_clears_trigger_without_ttl():
+    rng = np.random.default_rng(1)
+    fs, nbins, tracelength = 1e3, 4096, 256
+    template, trigtemplate, noisepsd = _make_filter_inputs()
+    filt = OptimumFilt(fs, template, noisepsd, tracelength, trigtemplate=trigtemplate)
+    
+    traces, trig = _make_trigger_data(rng, 2, nbins, template*0.0, [], trigtemplate=trigtemplate, 
+                                      trigpulseinds=[1000, 3000, 5000, 7000])
+    filt.filtertraces(traces, np.arange(2)*nbins/fs, trig=trig)
+    filt.eventtrigger(100, trigthresh=0.5)
+    assert filt.trigtypes[:, 2].sum() == 4
+    
+    # the same filter on a file without the trigger channel does not report the previous ttl events
+    traces, _ = _make_trigger_data(rng, 2, nbins, template, [])
+    filt.filtertraces(traces, np.arange(2)*nbins/fs)
+    assert filt.trigfilts is None
+    filt.eventtrigger(100, trigthresh=0.5)
+    assert len(filt.pulsetimes) == 0
+
+
+def test_triggerfiles_ttl_then_no_ttl(monkeypatch):
+    rng = np.random.default_rng(2)
+    fs, nbins, tracelength = 1e3, 4096, 256
+    template, trigtemplate, noisepsd = _make_filter_inputs()
+    
+    ttltraces, ttltrig = _make_trigger_data(rng, 2, nbins, template, [], trigtemplate=trigtemplate, 
+                                            trigpulseinds=[1000, 3000, 5000, 7000])
+    traces, _ = _make_trigger_data(rng, 2, nbins, template, [])
+    files = {"ttl" : (ttltraces, np.arange(2)*nbins/fs, fs, ttltrig), 
+             "nottl" : (traces, (2 + np.arange(2))*nbins/fs, fs, None)}
+    
+    monkeypatch.setattr(_trigger, "loadstanfordfile", lambda f, lgcttl=False: files[f])
+    
+    for lgcstream in [False, True]:
+        ntrig = []
+        for filt in _trigger._triggerfiles(["ttl", "nottl"], template, noisepsd, tracelength, 100, 
+                                           trigtemplate=trigtemplate, trigthresh=0.5, lgcstream=lgcstream):
+            ntrig.append(filt.trigtypes[:, 2].sum())
+            if filt.times[0] >= 2*nbins/fs:
+                # the events of the file without ttl never have a ttl trigger
+                assert not np.any(filt.trigtypes[:, 2])
+        
+        assert sum(ntrig) == 4
+
+
+@pytest.mark.parametrize("nbins", [1, 50, 257, 1000, 4096])
+@pytest.mark.parametrize("nkernel,blocksize", [(64, None), (64, 64), (64, 100), (63, None), (63, 128), (1, 8)])
+def test_fftcorrelate_matches_correlate(nbins, nkernel, blocksize):
+    rng = np.random.default_rng(nbins + nkernel)
+    x = rng.normal(size=(3, 2, nbins))
+    kernel = rng.normal(size=nkernel)
+
+    filts = _trigger._fftcorrelate(x, kernel, blocksize=blocksize)
+    ref = np.array([[correlate(trace, kernel, mode="same") for trace in chans] for chans in x])
+
+    assert filts.shape == x.shape
+    assert np.allclose(filts, ref, rtol=0, atol=1e-10)
+
+
+def _eventtrigger_reference(filt, thresh, trigthresh=None, positivepulses=True):
+    """
+    Helper function that finds the events in the filtered traces of an OptimumFilt object one trace 
+    and one range at a time, as OptimumFilt.eventtrigger did before it was vectorized.
+    
+    """
+    
+    pulseamps = []
+    pulsetimes = []
+    trigamps = []
+    trigtimes = []
+    traces = []
+    trigtypes = []
+    
+    for ii, filts in enumerate(filt.filts):
+        if positivepulses:
+            pulse_mask = filts>thresh*filt.resolution
+        else:
+            pulse_mask = filts<-thresh*filt.resolution
+        
+        if filt.trigfilts is None or trigthresh is None:
+            evts = np.where(pulse_mask)[0]
+            ranges = _trigger._getchangeslessthanthresh(evts, filt.pulse_range)[0]
+            rangetypes = np.zeros((len(ranges), 3), dtype=bool)
+            rangetypes[:, 1] = True
+        else:
+            trig_mask = filt.trigfilts[ii]>trigthresh
+            evts = np.where(pulse_mask | trig_mask)[0]
+            ranges, totvals = _trigger._getchangeslessthanthresh(evts, filt.pulse_range)
+            
+            tot_types = np.zeros(len(filts), dtype=int)
+            tot_types[pulse_mask] = 1
+            tot_types[trig_mask] = 2
+            
+            # the last bin of each range is not used to determine the trigger type
+            rangetypes = np.zeros((len(ranges), 3), dtype=bool)
+            for ival, vals in enumerate(totvals):
+                rangetypes[ival, 1] = np.any(tot_types[vals[0]:vals[1]]==1)
+                rangetypes[ival, 2] = np.any(tot_types[vals[0]:vals[1]]==2)
+        
+        for irange, evt_range in enumerate(ranges):
+            if evt_range[1] <= evt_range[0]:
+                continue
+            
+            evt_inds = evts[evt_range[0]:evt_range[1]]
+            
+            if positivepulses:
+                pulse_ind = evt_inds[np.argmax(filts[evt_inds])]
+            else:
+                pulse_ind = evt_inds[np.argmin(filts[evt_inds])]
+            
+            if rangetypes[irange][2]:
+                evt_ind = evt_inds[np.argmax(filt.trigfilts[ii][evt_inds])]
+            else:
+                evt_ind = pulse_ind
+            
+            if rangetypes[irange][1] or not rangetypes[irange][2]:
+                pulsetimes.append(pulse_ind/filt.fs + filt.times[ii])
+                pulseamps.append(filts[pulse_ind])
+            else:
+                pulsetimes.append(0.0)
+                pulseamps.append(0.0)
+            
+            if rangetypes[irange][2]:
+                trigtimes.append(evt_ind/filt.fs + filt.times[ii])
+                trigamps.append(filts[evt_ind])
+            else:
+                trigtimes.append(0.0)
+                trigamps.append(0.0)
+            
+            trigtypes.append(rangetypes[irange])
+            traces.append(filt.traces[ii, ..., evt_ind - filt.tracelength//2:evt_ind + filt.tracelength//2 \
+                                      + filt.tracelength%2])
+    
+    return pulsetimes, pulseamps, trigtimes, trigamps, traces, trigtypes
+
+
+def _assert_events_equal(filt, ref):
+    for val, refval in zip([filt.pulsetimes, filt.pulseamps, filt.trigtimes, filt.trigamps, 
+                            filt.evttraces, filt.trigtypes], ref):
+        assert len(val) == len(refval)
+        if len(refval) > 0:
+            assert np.array_equal(val, np.array(refval))
+
+
+@pytest.mark.parametrize("positivepulses", [True, False])
+@pytest.mark.parametrize("lgcttl", [False, True])
+@pytest.mark.parametrize("tracelength", [256, 255])
+def test_eventtrigger_matches_reference(positivepulses, lgcttl, tracelength):
+    rng = np.random.default_rng(5)
+    fs, nbins, ntraces = 1e3, 4096, 4
+    template, trigtemplate, noisepsd = _make_filter_inputs()
+    sign = 1 if positivepulses else -1
+    
+    # pulses with and without ttl pulses, some of which are close together, and one at the edge of a trace
+    pulseinds = rng.choice(ntraces*nbins - len(template), size=30, replace=False)
+    pulseinds = np.concatenate((pulseinds, pulseinds[:5] + 40, [nbins - 50]))
+    trigpulseinds = np.concatenate((pulseinds[:10] + 3, rng.choice(ntraces*nbins - 32, size=10, replace=False)))
+    
+    traces, trig = _make_trigger_data(rng, ntraces, nbins, sign*template, pulseinds, trigtemplate=trigtemplate, 
+                                      trigpulseinds=trigpulseinds)
+    
+    filt = OptimumFilt(fs, template, noisepsd, tracelength, trigtemplate=trigtemplate)
+    filt.filtertraces(traces, np.arange(ntraces)*nbins/fs, trig=trig if lgcttl else None)
+    
+    for thresh, trigthresh in [(10, 0.5), (100, 0.5), (1e6, 0.5), (10, None)]:
+        filt.eventtrigger(thresh, trigthresh=trigthresh, positivepulses=positivepulses)
+        ref = _eventtrigger_reference(filt, thresh, trigthresh=trigthresh, positivepulses=positivepulses)
+        
+        assert len(filt.pulsetimes) > 0 or thresh == 1e6
+        _assert_events_equal(filt, ref)
+        
+        if lgcttl and trigthresh is not None:
+            assert np.any(filt.trigtypes[:, 2])
+
+
+@pytest.mark.parametrize("positivepulses", [True, False])
+def test_eventtrigger_matches_reference_random_masks(positivepulses):
+    rng = np.random.default_rng(7)
+    fs, nbins, ntraces, tracelength = 1e3, 2000, 5, 256
+    template, trigtemplate, noisepsd = _make_filter_inputs()
+    
+    filt = OptimumFilt(fs, template, noisepsd, tracelength, trigtemplate=trigtemplate)
+    filt.traces = rng.normal(size=(ntraces, 2, nbins))
+    filt.times = np.arange(ntraces)*nbins/fs
+    
+    # sparse random amplitudes, such that there are many short ranges of pulse and ttl events that
+    # touch, overlap, and end with a single bin of either type
+    filt.filts = np.where(rng.uniform(size=(ntraces, nbins)) < 0.05, 
+                          rng.normal(size=(ntraces, nbins)), 0.0)*filt.resolution*20
+    filt.trigfilts = np.where(rng.uniform(size=(ntraces, nbins)) < 0.03, rng.uniform(size=(ntraces, nbins)), 0.0)
+    filt.filts[:, :tracelength] = 0.0
+    filt.filts[:, -tracelength:] = 0.0
+    filt.trigfilts[:, :tracelength] = 0.0
+    filt.trigfilts[:, -tracelength:] = 0.0
+    
+    for trigthresh in [0.5, None]:
+        filt.eventtrigger(5, trigthresh=trigthresh, positivepulses=positivepulses)
+        ref = _eventtrigger_reference(filt, 5, trigthresh=trigthresh, positivepulses=positivepulses)
+        
+        assert len(ref[0]) > 50
+        _assert_events_equal(filt, ref)
+
+
+@pytest.mark.parametrize("contiguous", [True, False])
+def test_gatherevttraces_into_dumpbuffer(tmp_path, contiguous):
+    rng = np.random.default_rng(8)
+    fs, nbins, ntraces, tracelength = 1e3, 4096, 3, 255
+    template, _, noisepsd = _make_filter_inputs()
+    
+    pulseinds = rng.choice(ntraces*nbins - len(template), size=20, replace=False)
+    traces, _ = _make_trigger_data(rng, ntraces, nbins, template, pulseinds)
+    if not contiguous:
+        traces = np.asfortranarray(traces)
+    
+    filt = OptimumFilt(fs, template, noisepsd, tracelength)
+    filt.filtertraces(traces, np.arange(ntraces)*nbins/fs)
+    filt.eventtrigger(10)
+    evttraces = filt.evttraces
+    
+    filt.eventtrigger(10, lgcevttraces=False)
+    assert filt.evttraces is None
+    assert np.array_equal(filt._gatherevttraces(), evttraces)
+    
+    # the traces are gathered straight into the buffers, in batches that do not line up with the dumps
+    dumps = _DumpBuffer({"pulsetimes" : ((), float), "traces" : ((2, tracelength), float)}, 7, 
+                        f"{tmp_path}/", "test", 1, "npz")
+    dumps.add(pulsetimes=filt.pulsetimes, traces=filt._gatherevttraces)
+    dumps.flush()
+    
+    files = sorted(glob.glob(f"{tmp_path}/test_*.npz"), key=lambda f: int(f.split("_")[-1][:-4]))
+    assert len(evttraces) > 7
+    assert np.array_equal(np.concatenate([np.load(f)["traces"] for f in files]), evttraces)
+
+
+@pytest.mark.parametrize("lgcttl", [False, True])
+@pytest.mark.parametrize("blocklength", [1000, 4096, 5000])
+def test_streamtrigger_matches_whole_stream(lgcttl, blocklength):
+    rng = np.random.default_rng(6)
+    fs, nbins, tracelength = 1e3, 20000, 256
+    template, trigtemplate, noisepsd = _make_filter_inputs()
+    
+    # pulses everywhere, including across the boundaries between the blocks
+    pulseinds = np.concatenate((rng.choice(nbins - len(template), size=40, replace=False), 
+                                np.arange(1, nbins//blocklength)*blocklength - 10))
+    traces, trig = _make_trigger_data(rng, 1, nbins, template, pulseinds, trigtemplate=trigtemplate, 
+                                      trigpulseinds=pulseinds[::3] + 2)
+    if not lgcttl:
+        trig = None
+    
+    filt = OptimumFilt(fs, template, noisepsd, tracelength, trigtemplate=trigtemplate)
+    filt.filtertraces(traces, np.array([0.0]), trig=trig)
+    filt.eventtrigger(10, trigthresh=0.5)
+    ref = (filt.pulsetimes, filt.pulseamps, filt.trigtimes, filt.trigamps, filt.evttraces, filt.trigtypes)
+    
+    stream = OptimumFilt(fs, template, noisepsd, tracelength, trigtemplate=trigtemplate)
+    events = []
+    for start in range(0, nbins, blocklength):
+        stop = min(start + blocklength, nbins)
+        stream.streamtrigger(traces[0, :, start:stop], start/fs, 10, trig=None if trig is None else trig[0, start:stop], 
+                             trigthresh=0.5)
+        events.append((stream.pulsetimes, stream.pulseamps, stream.trigtimes, stream.trigamps, 
+                       stream.evttraces, stream.trigtypes))
+    stream.flushstream(10, trigthresh=0.5)
+    events.append((stream.pulsetimes, stream.pulseamps, stream.trigtimes, stream.trigamps, 
+                   stream.evttraces, stream.trigtypes))
+    
+    assert len(ref[0]) > 20
+    
+    for ii, refval in enumerate(ref):
+        val = np.concatenate([evts[ii] for evts in events if len(evts[0]) > 0])
+        assert val.shape == refval.shape
+        assert np.allclose(val, refval, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("lgcttl", [False, True])
+def test_acquire_pulses_nprocess_matches_serial(tmp_path, save_stanford_file, lgcttl):
+    rng = np.random.default_rng(7)
+    fs, nbins, tracelength = 625e3, 4096, 256
+    template, trigtemplate, _ = _make_filter_inputs()
+    noisepsd = np.ones(tracelength)*0.01**2/fs
+    
+    # the traces in Amps are converted back to the units of the Stanford DAQ, see loadstanfordfile
+    toamps = np.array([1/(10.0*5000.0*1.0), 1/(10.0*5000.0*2.0)])/1024
+    files = []
+    for ii in range(4):
+        pulseinds = rng.choice(3*nbins - len(template), size=6, replace=False)
+        traces, trig = _make_trigger_data(rng, 3, nbins, template, pulseinds, trigtemplate=trigtemplate, 
+                                          trigpulseinds=pulseinds[:3])
+        data = np.concatenate([traces/toamps[:, np.newaxis], trig[:, np.newaxis]*1024], axis=1)
+        files.append(save_stanford_file(tmp_path / f"f{ii}.mat", data.transpose(0, 2, 1)))
+    
+    kwargs = dict(trigtemplate=trigtemplate if lgcttl else None, trigthresh=0.5 if lgcttl else None, 
+                  savename="test", maxevts=5)
+    
+    dumps = {}
+    for nprocess in [1, 2]:
+        savepath = tmp_path / f"nprocess{nprocess}"
+        savepath.mkdir()
+        _trigger.acquire_pulses(files, template, noisepsd, tracelength, 10, savepath=str(savepath), 
+                                nprocess=nprocess, **kwargs)
+        dumps[nprocess] = sorted(glob.glob(f"{savepath}/test_*.npz"))
+    
+    # the dumps are split across the files, and are written in the same order
+    assert len(dumps[1]) > 2
+    with np.load(dumps[1][0]) as d:
+        assert len(d["pulsetimes"]) == 5
+        assert np.any(d["trigtypes"][:, 2]) == lgcttl
+    assert [f.split("/")[-1] for f in dumps[2]] == [f.split("/")[-1] for f in dumps[1]]
+    
+    for f1, f2 in zip(dumps[1], dumps[2]):
+        with np.load(f1) as d1, np.load(f2) as d2:
+            assert d1.files == d2.files
+            for key in d1.files:
+                assert np.array_equal(d1[key], d2[key]), key
+
+
+def _assert_sections_valid(x, res, evttimes, l, t, fs):
+    # every section is a contiguous window of x, which is identified by its first value
+    starts = res[:, 0].astype(int)
+    assert np.array_equal(res, starts[:, np.newaxis] + np.arange(l))
+    
+    rows, inds = divmod(starts, x.shape[-1])
+    assert np.all(inds + l <= x.shape[-1])
+    assert np.allclose(evttimes, np.asarray(t)[rows] + (inds + l//2)/fs)
+    
+    # the sections in the same row do not overlap
+    order = np.lexsort((inds, rows))
+    samerow = rows[order][1:] == rows[order][:-1]
+    assert np.all(np.diff(inds[order])[samerow] >= l)
+
+
+@pytest.mark.parametrize("n,l", [(1, 50), (10, 50), (40, 50), (100, 20), (1, 2000)])
+def test_rand_sections_1d(n, l):
+    np.random.seed(0)
+    fs, t = 1e3, 5.0
+    x = np.arange(2000.0)
+    
+    evttimes, res = _trigger.rand_sections(x, n, l, t=t, fs=fs)
+    
+    assert res.shape == (n, l)
+    assert evttimes.shape == (n,)
+    _assert_sections_valid(x[np.newaxis], res, evttimes, l, [t], fs)
+
+
+@pytest.mark.parametrize("n,l", [(1, 50), (10, 50), (20, 50), (35, 20), (50, 20), (12, 64)])
+def test_rand_sections_2d(n, l):
+    np.random.seed(1)
+    fs = 1e3
+    x = np.arange(5*200.0).reshape(5, 200)
+    t = np.arange(5)*10.0
+    
+    evttimes, res = _trigger.rand_sections(x, n, l, t=t, fs=fs)
+    
+    assert res.shape == (n, l)
+    assert evttimes.shape == (n,)
+    _assert_sections_valid(x, res, evttimes, l, t, fs)
+    
+    # the sections of a 3-dimensional array include every channel
+    x3 = np.stack((x, -x), axis=1)
+    np.random.seed(1)
+    evttimes3, res3 = _trigger.rand_sections(x3, n, l, t=t, fs=fs)
+    assert res3.shape == (n, 2, l)
+    assert np.array_equal(res3[:, 0], res)
+    assert np.array_equal(res3[:, 1], -res)
+    assert np.array_equal(evttimes3, evttimes)
+
+
+def test_rand_sections_too_many():
+    with pytest.raises(ValueError):
+        _trigger.rand_sections(np.zeros(100), 3, 40)
+    with pytest.raises(ValueError):
+        _trigger.rand_sections(np.zeros((2, 100)), 5, 40, t=np.zeros(2))
+
+
+def test_randdistinct():
+    np.random.seed(2)
+    # groups that are sparse, dense, full, and empty
+    sizes = np.array([1000, 10, 7, 5, 1])
+    counts = np.array([50, 8, 7, 0, 1])
+    
+    groups, vals = _trigger._randdistinct(sizes, counts)
+    
+    assert np.array_equal(groups, np.repeat(np.arange(len(sizes)), counts))
+    assert np.all((vals >= 0) & (vals < sizes[groups]))
+    for group in range(len(sizes)):
+        assert len(np.unique(vals[groups==group])) == counts[group]
+        assert np.all(np.diff(vals[groups==group]) > 0)
+
+
+@pytest.mark.parametrize("n,nfiles,nslots", [(0, 3, 10), (1, 1, 5), (25, 4, 10), (40, 4, 10), (500, 20, 100)])
+def test_filecounts(n, nfiles, nslots):
+    np.random.seed(3)
+    counts = _trigger._filecounts(n, nfiles, nslots)
+    
+    assert counts.shape == (nfiles,)
+    assert counts.sum() == n
+    assert np.all((counts >= 0) & (counts <= nslots))
+    
+    # the same seed gives the same counts
+    np.random.seed(3)
+    assert np.array_equal(_trigger._filecounts(n, nfiles, nslots), counts)
+
+
+def test_filecounts_too_many():
+    with pytest.raises(ValueError):
+        _trigger._filecounts(41, 4, 10)
+
+
+def test_filecounts_mean():
+    np.random.seed(4)
+    counts = np.array([_trigger._filecounts(25, 4, 10) for _ in range(2000)])
+    
+    # every slot is equally likely, so each file gets n*nslots/(nfiles*nslots) sections on average
+    assert np.allclose(counts.mean(axis=0), 25/4, atol=0.1)